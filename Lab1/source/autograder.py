@@ -1,9 +1,17 @@
-
+import itertools
 import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+
+import search
+import solution
 
 # import student's functions
 from solution import *
 from snowman import snowman_goal_state
+from heuristic_profiler import effective_branching_factor
 
 #Select what to test
 test_time_astar = True
@@ -13,64 +21,309 @@ test_fval_function = True
 test_anytime_gbfs = True
 test_alternate = True
 test_anytime_weighted_astar = True
+test_incremental_heuristics = True
+test_beam_stack = True
+test_heuristic_profiler = True
+test_checkpoint = True
 
 TIMEOUT = 5 #timeout to impose
+TIME_TEST_BOUND = 3 #timebound given to the anytime searches in the timing tests
+TIME_TEST_FUDGE = 0.25 #1/4 second of fudge
+
+#Correct Manhattan distances for the initial states of the provided problem set
+correct_man_dist = [14,9,4,11,5,5,6,7,9,5,9,9,4,24,17,5,16,25,14,14]
+
+#Benchmark path lengths (-99 means the benchmark did not solve the problem)
+alternate_lengths = [54, 82, 30, 49, 71, 68, 29, 47, 38, 30, 68, 76, 53, -99, -99, 117, -99, -99, 64, -99]
+anytime_gbfs_benchmark = [44, 47, 19, 36, 35, 60, 18, 22, 34, 28, 32, 43, 35, -99, -99, 40, -99, -99, 44, -99]
+anytime_weighted_astar_benchmark = [44, 43, 20, 36, 35, 34, 18, 22, 34, 28, 32, 43, 35, -99, -99, 40, -99, -99, 46, -99]
+
+#Problems beam_stack search must solve optimally, their optimal costs and the beam widths tried
+beam_stack_problems = [2, 6, 7]
+beam_stack_optimal = [19, 18, 22]
+beam_stack_widths = [1, 3, 10]
+
+#(nodes generated, solution depth) pairs the profiler's effective branching factor must solve,
+#long solutions included
+ebf_cases = [(31, 4), (1000, 3), (10**5, 100), (10**6, 400), (10**7, 1000)]
+
+#Problems anytime_weighted_astar is interrupted on and then resumed from a checkpoint. Both runs read a
+#clock that advances CHECKPOINT_TICK seconds per reading, so where the search stops does not depend on
+#the machine. With weight 11 the weight has dropped to 1 when the search is interrupted.
+checkpoint_problems = [2, 6, 7]
+CHECKPOINT_WEIGHT = 11
+CHECKPOINT_INTERRUPT = 0.2
+CHECKPOINT_TICK = 0.001
+
+fval_test_state = SnowmanState("START", 6, None, 8, 10, (2, 2), {(2, 1): 0, (4, 3): 1, (1, 8): 2}, frozenset(((2, 3), (3, 0), (5, 1), (1, 3), (1, 2), (4, 5))), (4, 1))
+fval_weights = [0., .5, 1.]
+correct_fvals = [6, 11, 16]
+
+##############################################################
+# CHECKS: each one runs a single problem of a section and returns a picklable result,
+# so they can be run in this process or by parallel_autograder.py.
+
+def time_astar(i):
+  anytime_weighted_astar(PROBLEMS[i], heur_alternate, 10, TIME_TEST_BOUND)
+
+def time_gbfs(i):
+  anytime_gbfs(PROBLEMS[i], heur_alternate, TIME_TEST_BOUND)
+
+def check_manhattan(i):
+  return heur_manhattan_distance(PROBLEMS[i])
+
+def check_alternate(i):
+  se = SearchEngine('best_first', 'full')
+  se.init_search(PROBLEMS[i], goal_fn=snowman_goal_state, heur_fn=heur_alternate)
+  final = se.search(TIMEOUT)
+  return final.gval if final else False
+
+def check_fval_function(i):
+  test_node = sNode(fval_test_state, hval=10, fval_function=fval_function)
+  return fval_function(test_node, fval_weights[i])
+
+def check_anytime_gbfs(i):
+  final = anytime_gbfs(PROBLEMS[i], heur_fn=heur_alternate, timebound=TIMEOUT)
+  return final.gval if final else False
+
+def check_anytime_weighted_astar(i):
+  weight = 100 #we will start with a large weight so you can experiment with rate at which it decrements
+  final = anytime_weighted_astar(PROBLEMS[i], heur_fn=heur_alternate, weight=weight, timebound=TIMEOUT)
+  return final.gval if final else False
+
+def check_incremental_heuristics(i):
+  random.seed(384 + i)
+  checked = 0; mismatches = 0
+  for walk in range(20):
+    state = PROBLEMS[i]
+    manhattan = heur_manhattan_incremental.evaluate(state)
+    alternate = heur_alternate_incremental.evaluate(state)
+    for step in range(50):
+      successors = state.successors()
+      if not successors:
+        break
+      state = random.choice(successors)
+      manhattan = heur_manhattan_incremental.update(manhattan[1], state)
+      alternate = heur_alternate_incremental.update(alternate[1], state)
+      checked += 1
+      if manhattan[0] != heur_manhattan_distance(state) or alternate[0] != heur_alternate(state):
+        mismatches += 1
+  return checked, mismatches
+
+def check_beam_stack(k):
+  '''[(best cost found, proved optimal)] of beam_stack search on problem beam_stack_problems[k], for each width'''
+  results = []
+  for width in beam_stack_widths:
+    se = SearchEngine('beam_stack', 'full')
+    se.set_beam_width(width)
+    se.init_search(PROBLEMS[beam_stack_problems[k]], goal_fn=snowman_goal_state, heur_fn=heur_manhattan_distance)
+    best = False; proved = False
+    time_left = TIMEOUT
+    while time_left > 0:
+      start_time = search_clock()
+      final = se.search(time_left)
+      time_left -= search_clock() - start_time
+      if not final:
+        proved = time_left > 0 #the search ran out of solutions, not of time
+        break
+      best = final.gval
+    results.append((best, proved))
+  return results
+
+def check_heuristic_profiler(k):
+  '''Relative error of the tree size of the effective branching factor of ebf_cases[k], None if it raised'''
+  nodes, depth = ebf_cases[k]
+  try:
+    b = effective_branching_factor(nodes, depth)
+  except (OverflowError, ValueError):
+    return None
+  return abs(sum(b ** i for i in range(depth + 1)) / nodes - 1)
+
+def check_checkpoint(k):
+  '''(checkpoint saved when interrupted, heuristic evaluations of the start state when resumed,
+     checkpoint removed once completed, cost found) of anytime_weighted_astar on problem checkpoint_problems[k]'''
+  problem = PROBLEMS[checkpoint_problems[k]]
+  start = problem.hashable_state()
+  start_evaluations = [0]
+  def counting_heur(state):
+    if state.hashable_state() == start:
+      start_evaluations[0] += 1
+    return heur_alternate(state)
+
+  directory = tempfile.mkdtemp(prefix='checkpoint_')
+  path = os.path.join(directory, 'search.gz')
+  clock = search.search_clock
+  ticks = itertools.count(1)
+  search.search_clock = solution.search_clock = lambda: next(ticks) * CHECKPOINT_TICK
+  try:
+    anytime_weighted_astar(problem, counting_heur, CHECKPOINT_WEIGHT, CHECKPOINT_INTERRUPT, checkpoint=path)
+    saved = os.path.exists(path)
+    start_evaluations[0] = 0
+    final = anytime_weighted_astar(problem, counting_heur, CHECKPOINT_WEIGHT, TIMEOUT, checkpoint=path)
+    removed = not os.path.exists(path)
+  finally:
+    search.search_clock = solution.search_clock = clock
+    shutil.rmtree(directory, ignore_errors=True)
+  return saved, start_evaluations[0], removed, final.gval if final else False
+
+##############################################################
+# SUMMARIES: each takes the list of results of a section, in problem order.
+# A result of None means the check was killed before it finished.
+
+def report_time_astar(killed):
+  if killed:
+    print('Process killed. anytime_weighted_astar() not keeping track of time properly.')
+  else:
+    print('anytime_weighted_astar did not exceed timebound')
+
+def report_time_gbfs(killed):
+  if killed:
+    print('Process killed. anytime_gbfs() not keeping track of time properly')
+  else:
+    print('anytime_gbfs did not exceed timebound')
+
+def report_manhattan(results):
+  solved = 0; unsolved = [];
+  for i in range(len(results)):
+    if results[i] == correct_man_dist[i]:
+      solved += 1
+    else:
+      unsolved.append(i)
+
+  print("*************************************")
+  print("In the problem set provided, you calculated the correct Manhattan distance for {} states out of 20.".format(solved))
+  print("States that were incorrect: {}".format(unsolved))
+  print("*************************************\n")
+
+def report_alternate(results):
+  solved = 0; unsolved = []; benchmark = 15; timebound = TIMEOUT
+  for i in range(len(results)):
+    if results[i]:
+      solved += 1
+    else:
+      unsolved.append(i)
+
+  print("\n*************************************")
+  print("Of {} initial problems, {} were solved in less than {} seconds by this solver.".format(len(PROBLEMS), solved, timebound))
+  print("Problems that remain unsolved in the set are Problems: {}".format(unsolved))
+  print("The benchmark implementation solved {} out of {} practice problems given {} seconds.".format(benchmark,len(PROBLEMS),timebound))
+  print("*************************************\n")
+
+def report_fval_function(results):
+  solved = 0
+  for i in range(len(results)):
+    if results[i] == correct_fvals[i]:
+      solved +=1
+
+  print("\n*************************************")
+  print("Your fval_function calculated the correct fval for {} out of {} tests.".format(solved, len(correct_fvals)))
+  print("*************************************\n")
+
+def report_anytime(results, len_benchmark):
+  solved = 0; unsolved = []; benchmark = 0; timebound = TIMEOUT
+  for i in range(len(results)):
+    if results[i]:
+      if i < len(len_benchmark):
+        index = i
+      else:
+        index = 0
+      if results[i] <= len_benchmark[index] or len_benchmark[index] == -99:
+        benchmark += 1
+      solved += 1
+    else:
+      unsolved.append(i)
+
+  print("\n*************************************")
+  print("Of {} initial problems, {} were solved in less than {} seconds by this solver.".format(len(PROBLEMS), solved, timebound))
+  print("Of the {} problems that were solved, the cost of {} matched or outperformed the benchmark.".format(solved, benchmark))
+  print("Problems that remain unsolved in the set are Problems: {}".format(unsolved))
+  print("The benchmark implementation solved {} out of the 20 practice problems given {} seconds.".format(15, timebound))
+  print("*************************************\n")
+
+def report_anytime_gbfs(results):
+  report_anytime(results, anytime_gbfs_benchmark)
+
+def report_anytime_weighted_astar(results):
+  report_anytime(results, anytime_weighted_astar_benchmark)
+
+def report_incremental_heuristics(results):
+  checked = 0; mismatches = 0
+  for result in results:
+    if result is None:
+      continue
+    checked += result[0]
+    mismatches += result[1]
+
+  print("*************************************")
+  print("Incremental heuristics matched the full recomputation on {} of {} states.".format(checked - mismatches, checked))
+  print("*************************************\n")
+
+def report_beam_stack(results):
+  solved = 0; wrong = []
+  for k in range(len(results)):
+    for width, result in zip(beam_stack_widths, results[k] or [(False, False)] * len(beam_stack_widths)):
+      if result == (beam_stack_optimal[k], True):
+        solved += 1
+      else:
+        wrong.append((beam_stack_problems[k], width))
+
+  print("*************************************")
+  print("beam_stack found and proved the optimal cost in {} of {} searches.".format(solved, len(results) * len(beam_stack_widths)))
+  print("(problem, beam width) pairs that failed: {}".format(wrong))
+  print("*************************************\n")
+
+def report_heuristic_profiler(results):
+  wrong = [ebf_cases[k] for k in range(len(results)) if results[k] is None or results[k] > 1e-9]
+
+  print("*************************************")
+  print("The effective branching factor was solved for {} of {} (nodes, depth) pairs.".format(len(results) - len(wrong), len(results)))
+  print("Pairs that failed: {}".format(wrong))
+  print("*************************************\n")
+
+def report_checkpoint(results):
+  wrong = []
+  for k in range(len(results)):
+    i = checkpoint_problems[k]
+    if results[k] is None or results[k][:3] != (True, 0, True) or not results[k][3] or results[k][3] > anytime_weighted_astar_benchmark[i]:
+      wrong.append(i)
+
+  print("*************************************")
+  print("anytime_weighted_astar resumed its checkpoint without starting over in {} of {} problems.".format(len(results) - len(wrong), len(results)))
+  print("Problems that failed: {}".format(wrong))
+  print("*************************************\n")
+
+def run_timed(target, name, i):
+  '''Run a timing test in its own process, returns True if it had to be killed'''
+  p = multiprocessing.Process(target=target, name=name, args=(i,))
+  p.start()
+  p.join(TIME_TEST_BOUND + TIME_TEST_FUDGE)
+  if p.is_alive():
+    p.terminate()
+    p.join()
+    return True
+  return False
 
 if __name__ == '__main__':
   if test_time_astar:
-
-    time_bound = 3
-    p = multiprocessing.Process(target=anytime_weighted_astar, name="Anytime A star", args=(PROBLEMS[19],heur_alternate,10,time_bound))
-    p.start()
-    p.join(3.25) #1/4 second of fudge
-    if p.is_alive():
-      print('Process killed. anytime_weighted_astar() not keeping track of time properly.')
-      p.terminate()
-      p.join()
-    else:
-      print('anytime_weighted_astar did not exceed timebound')
+    report_time_astar(run_timed(time_astar, "Anytime A star", 19))
 
   if test_time_gbfs:
-
-    time_bound = 3
-    q = multiprocessing.Process(target=anytime_gbfs, name="Anytime GBFS", args=(PROBLEMS[19],heur_alternate,time_bound))
-    q.start()
-    q.join(3.25) #1/4 second of fudge
-    if q.is_alive():
-      print('Process killed. anytime_gbfs() not keeping track of time properly')
-      q.terminate()
-      q.join()
-    else:
-      print('anytime_gbfs did not exceed timebound')
-
+    report_time_gbfs(run_timed(time_gbfs, "Anytime GBFS", 19))
 
   if test_manhattan:
       ##############################################################
       # TEST MANHATTAN DISTANCE
       print('Testing Manhattan Distance')
 
-      #Correct Manhattan distances for the initial states of the provided problem set
-      correct_man_dist = [14,9,4,11,5,5,6,7,9,5,9,9,4,24,17,5,16,25,14,14]
-
-      solved = 0; unsolved = [];
-
+      results = []
       for i in range(0,20):
-
-          s0 = PROBLEMS[i]
-
-          man_dist = heur_manhattan_distance(s0)
+          man_dist = check_manhattan(i)
           print('calculated man_dist:', str(man_dist))
           #To see state uncomment
-          #print(s0.state_string())
-          if man_dist == correct_man_dist[i]:
-              solved += 1
-          else:
-              unsolved.append(i)
+          #print(PROBLEMS[i].state_string())
+          results.append(man_dist)
 
-      print("*************************************")
-      print("In the problem set provided, you calculated the correct Manhattan distance for {} states out of 20.".format(solved))
-      print("States that were incorrect: {}".format(unsolved))
-      print("*************************************\n")
+      report_manhattan(results)
       ##############################################################
 
   if test_alternate:
@@ -79,124 +332,97 @@ if __name__ == '__main__':
     # TEST ALTERNATE HEURISTIC
     print('Testing alternate heuristic with best_first search')
 
-    solved = 0; unsolved = []; benchmark = 15; timebound = TIMEOUT #time limit
-    lengths = [54, 82, 30, 49, 71, 68, 29, 47, 38, 30, 68, 76, 53, -99, -99, 117, -99, -99, 64, -99]
+    results = []
     for i in range(0, len(PROBLEMS)):
 
       print("*************************************")
       print("PROBLEM {}".format(i))
 
-      s0 = PROBLEMS[i] #Final problems are hardest
-      se = SearchEngine('best_first', 'full')
-      se.init_search(s0, goal_fn=snowman_goal_state, heur_fn=heur_alternate)
-      final = se.search(timebound)
-
-      if final:
-        solved += 1
-      else:
-        unsolved.append(i)
+      results.append(check_alternate(i)) #Final problems are hardest
 
-    print("\n*************************************")
-    print("Of {} initial problems, {} were solved in less than {} seconds by this solver.".format(len(PROBLEMS), solved, timebound))
-    print("Problems that remain unsolved in the set are Problems: {}".format(unsolved))
-    print("The benchmark implementation solved {} out of {} practice problems given {} seconds.".format(benchmark,len(PROBLEMS),timebound))
-    print("*************************************\n")
+    report_alternate(results)
     ##############################################################
 
   if test_fval_function:
 
-    test_state = SnowmanState("START", 6, None, 8, 10, (2, 2), {(2, 1): 0, (4, 3): 1, (1, 8): 2}, frozenset(((2, 3), (3, 0), (5, 1), (1, 3), (1, 2), (4, 5))), (4, 1))
-
-    correct_fvals = [6, 11, 16]
-
     ##############################################################
     # TEST fval_function
     print("*************************************")
     print('Testing fval_function')
 
-    solved = 0
-    weights = [0., .5, 1.]
-    for i in range(len(weights)):
-
-      test_node = sNode(test_state, hval=10, fval_function=fval_function)
-
-      fval = fval_function(test_node, weights[i])
+    results = []
+    for i in range(len(fval_weights)):
+      fval = check_fval_function(i)
       print ('Test', str(i), 'calculated fval:', str(fval), 'correct:', str(correct_fvals[i]))
+      results.append(fval)
 
-      if fval == correct_fvals[i]:
-        solved +=1
-
-    print("\n*************************************")
-    print("Your fval_function calculated the correct fval for {} out of {} tests.".format(solved, len(correct_fvals)))
-    print("*************************************\n")
+    report_fval_function(results)
     ##############################################################
 
 
   if test_anytime_gbfs:
 
-    len_benchmark = [44, 47, 19, 36, 35, 60, 18, 22, 34, 28, 32, 43, 35, -99, -99, 40, -99, -99, 44, -99]
     ##############################################################
     # TEST ANYTIME GBFS
     print('Testing Anytime GBFS')
 
-    solved = 0; unsolved = []; benchmark = 0; timebound = TIMEOUT #time limit
+    results = []
     for i in range(0, len(PROBLEMS)):
       print("*************************************")
       print("PROBLEM {}".format(i))
 
-      s0 = PROBLEMS[i] #Final problems are hardest
-      final = anytime_gbfs(s0, heur_fn=heur_alternate, timebound=timebound)
+      results.append(check_anytime_gbfs(i)) #Final problems are hardest
 
-      if final:
-        if i < len(len_benchmark):
-          index = i
-        else:
-          index = 0
-        if final.gval <= len_benchmark[index] or len_benchmark[index] == -99:
-          benchmark += 1
-        solved += 1
-      else:
-        unsolved.append(i)
-
-    print("\n*************************************")
-    print("Of {} initial problems, {} were solved in less than {} seconds by this solver.".format(len(PROBLEMS), solved, timebound))
-    print("Of the {} problems that were solved, the cost of {} matched or outperformed the benchmark.".format(solved, benchmark))
-    print("Problems that remain unsolved in the set are Problems: {}".format(unsolved))
-    print("The benchmark implementation solved {} out of the 20 practice problems given {} seconds.".format(15, timebound))
-    print("*************************************\n")
+    report_anytime_gbfs(results)
 
   if test_anytime_weighted_astar:
 
-    len_benchmark = [44, 43, 20, 36, 35, 34, 18, 22, 34, 28, 32, 43, 35, -99, -99, 40, -99, -99, 46, -99]
-
     ##############################################################
     # TEST ANYTIME WEIGHTED A STAR
     print('Testing Anytime Weighted A Star')
 
-    solved = 0; unsolved = []; benchmark = 0; timebound = TIMEOUT #time limit
+    results = []
     for i in range(0, len(PROBLEMS)):
       print("*************************************")
       print("PROBLEM {}".format(i))
 
-      s0 = PROBLEMS[i] #Final problems are hardest
-      weight = 100 #we will start with a large weight so you can experiment with rate at which it decrements
-      final = anytime_weighted_astar(s0, heur_fn=heur_alternate, weight=weight, timebound=timebound)
-
-      if final:
-        if i < len(len_benchmark):
-          index = i
-        else:
-          index = 0
-        if final.gval <= len_benchmark[index] or len_benchmark[index] == -99:
-          benchmark += 1
-        solved += 1
-      else:
-        unsolved.append(i)
-
-    print("\n*************************************")
-    print("Of {} initial problems, {} were solved in less than {} seconds by this solver.".format(len(PROBLEMS), solved, timebound))
-    print("Of the {} problems that were solved, the cost of {} matched or outperformed the benchmark.".format(solved, benchmark))
-    print("Problems that remain unsolved in the set are Problems: {}".format(unsolved))
-    print("The benchmark implementation solved {} out of the 20 practice problems given {} seconds.".format(15, timebound))
-    print("*************************************\n")
+      results.append(check_anytime_weighted_astar(i)) #Final problems are hardest
+
+    report_anytime_weighted_astar(results)
+    ##############################################################
+
+  if test_incremental_heuristics:
+
+    ##############################################################
+    # TEST INCREMENTAL HEURISTICS AGAINST FULL RECOMPUTATION
+    print('Testing incremental heuristics')
+
+    report_incremental_heuristics([check_incremental_heuristics(i) for i in range(0, len(PROBLEMS))])
+    ##############################################################
+
+  if test_beam_stack:
+
+    ##############################################################
+    # TEST BEAM STACK SEARCH REACHES AND PROVES THE OPTIMUM
+    print('Testing beam_stack search')
+
+    report_beam_stack([check_beam_stack(k) for k in range(len(beam_stack_problems))])
+    ##############################################################
+
+  if test_heuristic_profiler:
+
+    ##############################################################
+    # TEST THE PROFILER'S EFFECTIVE BRANCHING FACTOR, UP TO LONG SOLUTIONS
+    print('Testing the heuristic profiler')
+
+    report_heuristic_profiler([check_heuristic_profiler(k) for k in range(len(ebf_cases))])
+    ##############################################################
+
+  if test_checkpoint:
+
+    ##############################################################
+    # TEST AN INTERRUPTED ANYTIME WEIGHTED A STAR RESUMES FROM ITS CHECKPOINT
+    print('Testing checkpoints of Anytime Weighted A Star')
+
+    report_checkpoint([check_checkpoint(k) for k in range(len(checkpoint_problems))])
     ##############################################################
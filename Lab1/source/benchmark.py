@@ -0,0 +1,299 @@
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+# import student's functions
+from solution import *
+from test_problems import generate_multi_snowman_problem
+from learned_heuristic import LearnedHeuristic
+from realtime import RealTimeAgent
+import heuristic_profiler
+
+#Select what to benchmark
+bench_multi_snowman = True
+bench_external_bfs = True
+bench_solve_many = True
+bench_closed_set = True
+bench_beam = True
+bench_learned_heuristic = True
+bench_realtime = True
+bench_partial_expansion = True
+bench_compact_paths = True
+bench_heuristic_profile = True
+
+TIMEOUT = 10 #timeout to impose
+BEAM_WIDTH = 500
+STEP_BUDGET = 0.005 #seconds per real-time action
+
+if __name__ == '__main__':
+  if bench_multi_snowman:
+
+    ##############################################################
+    # SCALING WITH THE NUMBER OF SNOWMEN
+    print('Benchmarking best_first search with heur_multi_snowman on N snowmen')
+
+    timebound = TIMEOUT
+    print("{:>3} {:>8} {:>10} {:>12} {:>12}".format("N", "cost", "time (s)", "expanded", "generated"))
+    for n in range(1, 5):
+      s0 = generate_multi_snowman_problem(n)
+      se = SearchEngine('best_first', 'full')
+      se.init_search(s0, goal_fn=snowman_goal_state, heur_fn=heur_multi_snowman)
+
+      start_time = os.times()[0]
+      final = se.search(timebound)
+      end_time = os.times()[0]
+
+      cost = final.gval if final else -99
+      print("{:>3} {:>8} {:>10.2f} {:>12} {:>12}".format(n, cost, end_time - start_time, se.nodes_generated, se.states_generated))
+    print("*************************************\n")
+    ##############################################################
+
+  if bench_external_bfs:
+
+    ##############################################################
+    # IN-MEMORY VERSUS EXTERNAL MEMORY BREADTH FIRST SEARCH
+    print('Benchmarking breadth_first search with the closed set in RAM and on disk')
+
+    timebound = 60
+    print("{:>8} {:>10} {:>8} {:>10} {:>14}".format("problem", "mode", "cost", "time (s)", "peak RAM (MB)"))
+    for i in [2, 7, 8, 10]:
+      for external in [False, True]:
+        se = SearchEngine('breadth_first', 'full')
+        if external:
+          se.set_external_memory(run_size=20000)
+        se.init_search(PROBLEMS[i], goal_fn=snowman_goal_state)
+
+        tracemalloc.start()
+        start_time = os.times()[0]
+        final = se.search(timebound)
+        end_time = os.times()[0]
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        if external:
+          se.remove_external_files()
+
+        cost = final.gval if final else -99
+        mode = "external" if external else "in-memory"
+        print("{:>8} {:>10} {:>8} {:>10.2f} {:>14.1f}".format(i, mode, cost, end_time - start_time, peak / 2**20))
+    print("*************************************\n")
+    ##############################################################
+
+  if bench_solve_many:
+
+    ##############################################################
+    # THROUGHPUT OF solve_many ON THE FULL TEST SET
+    print('Benchmarking solve_many with best_first search and heur_alternate on all {} problems'.format(len(PROBLEMS)))
+
+    config = SearchConfig(snowman_goal_state, 'best_first', 'full', heur_fn=heur_alternate, timebound=TIMEOUT)
+    print("{:>8} {:>8} {:>8} {:>10} {:>16}".format("pool", "workers", "solved", "wall (s)", "problems / sec"))
+    for processes, workers in [(False, 4), (True, 1), (True, 2), (True, 4), (True, 8)]:
+      start_time = time.time()
+      solved = sum(1 for index, final, stats in solve_many(PROBLEMS, config, workers, processes) if final)
+      wall = time.time() - start_time
+      pool = "process" if processes else "thread"
+      print("{:>8} {:>8} {:>8} {:>10.2f} {:>16.2f}".format(pool, workers, solved, wall, len(PROBLEMS) / wall))
+    print("*************************************\n")
+    ##############################################################
+
+  if bench_closed_set:
+
+    ##############################################################
+    # DICTIONARY VERSUS PACKED CLOSED SET
+    print('Benchmarking astar search with heur_alternate and the closed set in a dict or a PackedClosedSet')
+
+    print("{:>8} {:>8} {:>8} {:>10} {:>10} {:>12} {:>16}".format("problem", "closed", "cost", "time (s)", "states", "bytes/state", "states / GB"))
+    for i in [2, 3, 7, 8]:
+      for kind in ['dict', 'packed']:
+        se = SearchEngine('astar', 'full')
+        se.set_closed_set(kind)
+        se.init_search(PROBLEMS[i], goal_fn=snowman_goal_state, heur_fn=heur_alternate)
+
+        start_time = os.times()[0]
+        final = se.search(TIMEOUT)
+        end_time = os.times()[0]
+
+        #measure the closed set alone, after the search
+        closed = se.cc_dictionary
+        if kind == 'packed':
+          size = closed.nbytes()
+        else:
+          #the hash table plus the int keys; g-values are small cached ints
+          size = sys.getsizeof(closed) + sum(sys.getsizeof(key) for key in closed)
+
+        cost = final.gval if final else -99
+        print("{:>8} {:>8} {:>8} {:>10.2f} {:>10} {:>12.1f} {:>16.0f}".format(i, kind, cost, end_time - start_time,
+              len(closed), size / len(closed), 2**30 * len(closed) / size))
+    print("*************************************\n")
+    ##############################################################
+
+  if bench_beam:
+
+    ##############################################################
+    # ANYTIME GBFS VERSUS BEAM AND BEAM STACK SEARCH ON THE HARDEST PROBLEMS
+    print('Benchmarking anytime best_first, beam and beam_stack (width {}) search with heur_alternate'.format(BEAM_WIDTH))
+    print('Times are taken with tracemalloc running')
+
+    print("{:>8} {:>11} {:>11} {:>15} {:>10} {:>14}".format("problem", "strategy", "first cost", "first time (s)", "best cost", "peak RAM (MB)"))
+    for i in range(13, 20):
+      for strategy in ['best_first', 'beam', 'beam_stack']:
+        se = SearchEngine(strategy, 'full')
+        se.set_beam_width(BEAM_WIDTH)
+        se.init_search(PROBLEMS[i], goal_fn=snowman_goal_state, heur_fn=heur_alternate)
+
+        #keep searching for cheaper solutions, as anytime_gbfs does
+        tracemalloc.start()
+        first_cost = -99; first_time = -1; best_cost = -99
+        costbound = None
+        time_left = TIMEOUT
+        while time_left > 0:
+          start_time = search_clock()
+          final = se.search(time_left, costbound)
+          time_left -= search_clock() - start_time
+          if not final:
+            break
+          if first_cost == -99:
+            first_cost = final.gval
+            first_time = TIMEOUT - time_left
+          best_cost = final.gval
+          costbound = (final.gval - 1, float("inf"), float("inf"))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        print("{:>8} {:>11} {:>11} {:>15.2f} {:>10} {:>14.1f}".format(i, strategy, first_cost, first_time, best_cost, peak / 2**20))
+    print("*************************************\n")
+    ##############################################################
+
+  if bench_learned_heuristic:
+
+    ##############################################################
+    # LEARNED HEURISTIC VERSUS heur_alternate
+    print('Benchmarking best_first search with heur_alternate and the learned heuristic on all {} problems'.format(len(PROBLEMS)))
+
+    heuristics = [('alternate', heur_alternate), ('learned', LearnedHeuristic())]
+    print("{:>8} {:>10} {:>8} {:>10} {:>12}".format("problem", "heuristic", "cost", "time (s)", "expanded"))
+    totals = {name: [0, 0] for name, heur in heuristics}
+    for i in range(len(PROBLEMS)):
+      for name, heur in heuristics:
+        se = SearchEngine('best_first', 'full')
+        se.init_search(PROBLEMS[i], goal_fn=snowman_goal_state, heur_fn=heur)
+
+        start_time = os.times()[0]
+        final = se.search(TIMEOUT)
+        end_time = os.times()[0]
+
+        cost = final.gval if final else -99
+        totals[name][0] += 1 if final else 0
+        totals[name][1] += end_time - start_time
+        print("{:>8} {:>10} {:>8} {:>10.2f} {:>12}".format(i, name, cost, end_time - start_time, se.nodes_generated))
+    for name, heur in heuristics:
+      print("{} solved {} problems in {:.2f} s".format(name, totals[name][0], totals[name][1]))
+
+    #cost of evaluating the heuristic alone, on the successors of the initial states
+    states = [succ for problem in PROBLEMS for succ in problem.successors()] * 200
+    learned = heuristics[1][1]
+    start_time = time.perf_counter()
+    for state in states:
+      heur_alternate(state)
+    alternate_time = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    for state in states:
+      learned(state)
+    single_time = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    for k in range(0, len(states), 4):
+      learned.evaluate_batch(states[k:k + 4])
+    batch_time = time.perf_counter() - start_time
+    print("Per state: heur_alternate {:.2f} us, learned one at a time {:.2f} us, learned in batches of 4 {:.2f} us".format(
+          1e6 * alternate_time / len(states), 1e6 * single_time / len(states), 1e6 * batch_time / len(states)))
+    print("*************************************\n")
+    ##############################################################
+
+  if bench_realtime:
+
+    ##############################################################
+    # REAL-TIME AGENTS: PER-ACTION LATENCY AND CONVERGENCE OVER TRIALS
+    print('Benchmarking real-time agents with a {} ms budget per action over 20 trials'.format(1000 * STEP_BUDGET))
+
+    agents = [('lrta', 1), ('rtaa', 16), ('rtaa', 64)]
+    print("{:>8} {:>6} {:>9} {:>8} {:>8} {:>8} {:>8} {:>7}  {}".format("problem", "agent", "lookahead", "p50 ms", "p90 ms", "p99 ms", "max ms", "solved", "cost per trial"))
+    for i in [2, 7, 9]:
+      for algorithm, lookahead in agents:
+        agent = RealTimeAgent(algorithm=algorithm, lookahead=lookahead, budget=STEP_BUDGET)
+        latencies = []; costs = []
+        for trial in range(20):
+          final, trial_latencies = agent.run_trial(PROBLEMS[i], 2000)
+          latencies.extend(trial_latencies)
+          costs.append(final.gval if final else -99)
+        latencies.sort()
+        percentile = lambda p: 1000 * latencies[int(p * (len(latencies) - 1))]
+        print("{:>8} {:>6} {:>9} {:>8.3f} {:>8.3f} {:>8.3f} {:>8.3f} {:>7}  {}".format(i, algorithm, lookahead, percentile(.5), percentile(.9),
+              percentile(.99), percentile(1), sum(1 for cost in costs if cost != -99), costs))
+    print("*************************************\n")
+    ##############################################################
+
+  if bench_partial_expansion:
+
+    ##############################################################
+    # ASTAR VERSUS PARTIAL EXPANSION ASTAR
+    print('Benchmarking astar search with heur_alternate, with and without partial expansion')
+
+    print("{:>8} {:>8} {:>8} {:>10} {:>12} {:>12} {:>14}".format("problem", "partial", "cost", "time (s)", "nodes", "states", "peak RAM (MB)"))
+    for i in [2, 7, 8, 3]:
+      for partial in [False, True]:
+        se = SearchEngine('astar', 'full')
+        se.set_partial_expansion(partial)
+        se.init_search(PROBLEMS[i], goal_fn=snowman_goal_state, heur_fn=heur_alternate)
+
+        tracemalloc.start()
+        start_time = os.times()[0]
+        final = se.search(60)
+        end_time = os.times()[0]
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        cost = final.gval if final else -99
+        print("{:>8} {:>8} {:>8} {:>10.2f} {:>12} {:>12} {:>14.1f}".format(i, str(partial), cost, end_time - start_time,
+              se.nodes_generated, se.states_generated, peak / 2**20))
+    print("*************************************\n")
+    ##############################################################
+
+  if bench_compact_paths:
+
+    ##############################################################
+    # PARENT POINTERS VERSUS A COMPACT PATH STORE
+    print('Benchmarking searches with heur_alternate, keeping paths in parent pointers or a PathStore')
+
+    print("{:>8} {:>11} {:>8} {:>8} {:>10} {:>14}".format("problem", "strategy", "compact", "cost", "time (s)", "peak RAM (MB)"))
+    for strategy, i in [('astar', 8), ('astar', 3), ('best_first', 11), ('best_first', 13)]:
+      for compact in [False, True]:
+        se = SearchEngine(strategy, 'full')
+        se.set_compact_paths(compact)
+        se.init_search(PROBLEMS[i], goal_fn=snowman_goal_state, heur_fn=heur_alternate)
+
+        tracemalloc.start()
+        start_time = os.times()[0]
+        final = se.search(60)
+        end_time = os.times()[0]
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        cost = final.gval if final else -99
+        print("{:>8} {:>11} {:>8} {:>8} {:>10.2f} {:>14.1f}".format(i, strategy, str(compact), cost, end_time - start_time, peak / 2**20))
+    print("*************************************\n")
+    ##############################################################
+
+  if bench_heuristic_profile:
+
+    ##############################################################
+    # HEURISTIC QUALITY PROFILE, SAVED FOR COMPARISON BETWEEN RUNS
+    print('Profiling the heuristics on problems {}'.format(heuristic_profiler.DEFAULT_PROBLEMS))
+
+    report = heuristic_profiler.profile()
+    with open(heuristic_profiler.REPORT_FILE, 'w') as f:
+      json.dump(report, f, indent=2)
+    heuristic_profiler.print_report(report)
+    print("Report written to {}".format(heuristic_profiler.REPORT_FILE))
+    print("*************************************\n")
+    ##############################################################
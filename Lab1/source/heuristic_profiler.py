@@ -0,0 +1,179 @@
+"""
+Profiles the quality and cost of the snowman heuristics.
+
+For every problem of the set, breadth_first search finds an optimal solution,
+which gives the true distance to the goal h* of every state on it. For each
+heuristic the profiler then measures:
+
+  ns_per_call                  mean time of one call, over those states and their successors
+  mean_h_over_hstar            mean of h/h* over the states on the optimal paths with h* > 0
+  admissibility_violations     states on the optimal paths with h > h*
+  consistency_violations       moves s -> s' out of those states with h(s) > cost + h(s')
+  effective_branching_factor   b such that 1 + b + ... + b^d equals the nodes generated by
+                               astar with the heuristic, root included, d being the cost of
+                               its solution
+
+The report is written as JSON so that successive runs can be compared, by
+default to heuristic_profile.json next to this script.
+
+Usage: python heuristic_profiler.py [-p problem,problem,...] [-t timebound] [-o report file]
+"""
+import getopt
+import json
+import os
+import platform
+import sys
+import time
+
+from solution import *
+
+HEURISTICS = {'heur_manhattan_distance': heur_manhattan_distance,
+              'heur_alternate': heur_alternate,
+              'trivial_heuristic': trivial_heuristic}
+
+DEFAULT_PROBLEMS = [2, 3, 6, 7, 9, 10, 12, 15] #solved by breadth_first in a few seconds
+REPORT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'heuristic_profile.json')
+
+def optimal_path(state, timebound):
+  '''States of an optimal solution of state, initial state first, or None if none was found in time'''
+  se = SearchEngine('breadth_first', 'full')
+  se.init_search(state, goal_fn=snowman_goal_state)
+  final = se.search(timebound)
+  if not final:
+    return None
+  path = []
+  while final:
+    path.append(final)
+    final = final.parent
+  path.reverse()
+  return path
+
+def effective_branching_factor(nodes, depth):
+  '''Solve 1 + b + b^2 + ... + b^depth = nodes for b by bisection, nodes counting the root'''
+  if depth <= 0:
+    return None
+  low, high = 1.0, float(nodes)
+  for _ in range(100):
+    b = (low + high) / 2
+    #add up the terms only until the sum passes nodes, so none of them overflows
+    total = 0.0; term = 1.0
+    for _ in range(depth + 1):
+      total += term
+      if total > nodes:
+        break
+      term *= b
+    if total > nodes:
+      high = b
+    else:
+      low = b
+  return (low + high) / 2
+
+def time_heuristic(heur_fn, states, repeat = 20):
+  '''Mean nanoseconds per call of heur_fn on states'''
+  start_time = time.perf_counter_ns()
+  for _ in range(repeat):
+    for state in states:
+      heur_fn(state)
+  return (time.perf_counter_ns() - start_time) / (repeat * len(states))
+
+def profile_problem(heur_fn, path, timebound):
+  '''Measures of heur_fn on one problem, given the optimal path of the problem'''
+  cost = path[-1].gval
+  ratios = []; admissibility = 0; consistency = 0; edges = 0
+  timed = []
+  for state in path:
+    hstar = cost - state.gval
+    h = heur_fn(state)
+    timed.append(state)
+    if h > hstar:
+      admissibility += 1
+    if hstar > 0 and h != float("inf"):
+      ratios.append(h / hstar)
+    for succ in state.successors():
+      timed.append(succ)
+      edges += 1
+      succ_h = heur_fn(succ)
+      if h != float("inf") and h > (succ.gval - state.gval) + succ_h:
+        consistency += 1
+      elif h == float("inf") and succ_h != float("inf"):
+        consistency += 1
+
+  se = SearchEngine('astar', 'full')
+  se.init_search(path[0], goal_fn=snowman_goal_state, heur_fn=heur_fn)
+  final = se.search(timebound)
+  return {'optimal_cost': cost,
+          'states_checked': len(path),
+          'edges_checked': edges,
+          'ns_per_call': time_heuristic(heur_fn, timed),
+          'mean_h_over_hstar': sum(ratios) / len(ratios) if ratios else None,
+          'admissibility_violations': admissibility,
+          'consistency_violations': consistency,
+          'astar_cost': final.gval if final else None,
+          'astar_nodes_generated': se.nodes_generated,
+          'effective_branching_factor': effective_branching_factor(se.nodes_generated, final.gval) if final else None}
+
+def profile(heuristics = HEURISTICS, problems = DEFAULT_PROBLEMS, timebound = 20):
+  '''The report, a dictionary ready for json.dump'''
+  paths = {}
+  for i in problems:
+    path = optimal_path(PROBLEMS[i], timebound)
+    if path:
+      paths[i] = path
+
+  report = {'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'timebound': timebound,
+            'problems': sorted(paths),
+            'unsolved_problems': [i for i in problems if i not in paths],
+            'heuristics': {}}
+  for name, heur_fn in heuristics.items():
+    per_problem = {str(i): profile_problem(heur_fn, path, timebound) for i, path in paths.items()}
+    results = list(per_problem.values())
+    ratios = [r['mean_h_over_hstar'] for r in results if r['mean_h_over_hstar'] is not None]
+    factors = [r['effective_branching_factor'] for r in results if r['effective_branching_factor'] is not None]
+    report['heuristics'][name] = {
+      'ns_per_call': sum(r['ns_per_call'] for r in results) / len(results) if results else None,
+      'mean_h_over_hstar': sum(ratios) / len(ratios) if ratios else None,
+      'admissibility_violations': sum(r['admissibility_violations'] for r in results),
+      'consistency_violations': sum(r['consistency_violations'] for r in results),
+      'states_checked': sum(r['states_checked'] for r in results),
+      'edges_checked': sum(r['edges_checked'] for r in results),
+      'effective_branching_factor': sum(factors) / len(factors) if factors else None,
+      'astar_solved': sum(1 for r in results if r['astar_cost'] is not None),
+      'problems': per_problem}
+  return report
+
+def print_report(report):
+  print("{:>24} {:>10} {:>9} {:>14} {:>13} {:>6}".format("heuristic", "ns/call", "h/h*", "inadmissible", "inconsistent", "EBF"))
+  for name, summary in report['heuristics'].items():
+    ratio = summary['mean_h_over_hstar']
+    factor = summary['effective_branching_factor']
+    print("{:>24} {:>10.0f} {:>9} {:>14} {:>13} {:>6}".format(name, summary['ns_per_call'],
+          "{:.3f}".format(ratio) if ratio is not None else "-",
+          "{}/{}".format(summary['admissibility_violations'], summary['states_checked']),
+          "{}/{}".format(summary['consistency_violations'], summary['edges_checked']),
+          "{:.3f}".format(factor) if factor is not None else "-"))
+
+def main(argv):
+  problems = DEFAULT_PROBLEMS; timebound = 20; report_file = REPORT_FILE
+  try:
+    opts, args = getopt.getopt(argv, "p:t:o:")
+  except getopt.GetoptError:
+    print('Usage: python heuristic_profiler.py [-p problem,problem,...] [-t timebound] [-o report file]')
+    sys.exit(2)
+  for opt, arg in opts:
+    if opt == '-p':
+      problems = [int(i) for i in arg.split(',')]
+    elif opt == '-t':
+      timebound = float(arg)
+    elif opt == '-o':
+      report_file = arg
+
+  report = profile(HEURISTICS, problems, timebound)
+  with open(report_file, 'w') as f:
+    json.dump(report, f, indent=2)
+  print_report(report)
+  print("Report written to {}".format(report_file))
+
+if __name__ == '__main__':
+  main(sys.argv[1:])
@@ -0,0 +1,136 @@
+"""
+A snowman heuristic learned offline from optimal solutions.
+
+The trainer takes random boards (test_problems.generate_random_problem) and
+finds the true distance to the goal of states of their solutions with astar
+and heur_manhattan_distance (see optimal_examples); those states are the
+training examples.
+A linear model over the features of features() is fit by least squares and
+saved as a NumPy weight table (np.save).
+
+LearnedHeuristic loads the weight table. It is a BatchHeuristic, so the
+search engine hands it all the successors of a node at once and their
+h-values come out of one matrix product. The learned heuristic is not
+admissible; it is meant for best_first and the anytime searches.
+
+Usage: python learned_heuristic.py [-n boards] [-s seed] [-t timebound] [-o weight file]
+"""
+import getopt
+import os
+import random
+import sys
+
+import numpy as np
+
+from solution import *
+from test_problems import generate_random_problem
+
+WEIGHTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'learned_heuristic.npy')
+
+FEATURE_NAMES = ['bias', 'manhattan', 'alternate', 'robot to nearest snowball', 'snowballs to place',
+                 'snowball spread', 'snowballs on the edge', 'destination taken']
+
+def features(state):
+  '''Feature vector of a single snowman state, None if heur_alternate proves it is a dead end'''
+  positions = [None] * 7
+  for snowball, code in state.snowballs.items():
+    if code < 7:
+      positions[code] = snowball
+  manhattan = heur_manhattan_distance(state)
+  alternate = alternate_from_positions(positions, state.robot, state.destination, manhattan)
+  if alternate == float("inf"):
+    return None
+
+  dest = state.destination
+  loose = [ball for ball in state.snowballs if ball != dest]
+  nearest = min((abs(x - state.robot[0]) + abs(y - state.robot[1]) for x, y in loose), default=0)
+  spread = sum(abs(a[0] - b[0]) + abs(a[1] - b[1]) for a in loose for b in loose) // 2
+  edge = sum(1 for x, y in loose if x in (0, state.width - 1) or y in (0, state.height - 1))
+  placed = 1 if dest in state.snowballs else 0
+  to_place = sum(SNOWBALL_COUNTS[state.snowballs[ball]] for ball in loose)
+  return [1, manhattan, alternate, nearest, to_place, spread, edge, placed]
+
+def optimal_examples(state, timebound, step = 3):
+  '''(features, distance to goal) of states whose distance to the goal was found by astar.
+     best_first first finds some solution of state. Going back from its goal, astar is run
+     from every step-th state on that path until one is not solved within timebound; all
+     the states on the optimal paths found are examples.'''
+  se = SearchEngine('best_first', 'full')
+  se.init_search(state, goal_fn=snowman_goal_state, heur_fn=heur_alternate)
+  final = se.search(timebound)
+  path = []
+  while final:
+    path.append(final)
+    final = final.parent
+
+  examples = {}
+  for start in path[::step]:
+    se = SearchEngine('astar', 'full')
+    se.init_search(start, goal_fn=snowman_goal_state, heur_fn=heur_manhattan_distance)
+    final = se.search(timebound)
+    if not final:
+      break
+    s = final
+    while s is not start.parent:
+      f = features(s)
+      if f is not None:
+        examples[s.hashable_state()] = (f, final.gval - s.gval)
+      s = s.parent
+  return list(examples.values())
+
+def train(boards, seed = 0, timebound = 1):
+  '''Fit the weight table on boards random boards, returns (weights, number of examples, boards solved)'''
+  rng = random.Random(seed)
+  X = []; y = []; solved = 0
+  for _ in range(boards):
+    examples = optimal_examples(generate_random_problem(rng), timebound)
+    if examples:
+      solved += 1
+    for f, distance in examples:
+      X.append(f)
+      y.append(distance)
+  weights = np.linalg.lstsq(np.array(X, dtype=float), np.array(y, dtype=float), rcond=None)[0]
+  return weights, len(y), solved
+
+class LearnedHeuristic(BatchHeuristic):
+  '''Linear heuristic over features(), with weights loaded from a weight table'''
+
+  def __init__(self, weights = WEIGHTS_FILE):
+    if isinstance(weights, str):
+      weights = np.load(weights)
+    self.weights = np.asarray(weights, dtype=float)
+
+  def evaluate_batch(self, states):
+    rows = [features(state) for state in states]
+    live = [row for row in rows if row is not None]
+    hvals = np.full(len(rows), float("inf"))
+    if live:
+      estimates = np.maximum(np.array(live, dtype=float) @ self.weights, 0)
+      hvals[[row is not None for row in rows]] = estimates
+    return hvals.tolist()
+
+def main(argv):
+  boards = 200; seed = 0; timebound = 1; weight_file = WEIGHTS_FILE
+  try:
+    opts, args = getopt.getopt(argv, "n:s:t:o:")
+  except getopt.GetoptError:
+    print('Usage: python learned_heuristic.py [-n boards] [-s seed] [-t timebound] [-o weight file]')
+    sys.exit(2)
+  for opt, arg in opts:
+    if opt == '-n':
+      boards = int(arg)
+    elif opt == '-s':
+      seed = int(arg)
+    elif opt == '-t':
+      timebound = float(arg)
+    elif opt == '-o':
+      weight_file = arg
+
+  weights, examples, solved = train(boards, seed, timebound)
+  np.save(weight_file, weights)
+  print("Trained on {} states from {} of {} boards, weights saved to {}".format(examples, solved, boards, weight_file))
+  for name, weight in zip(FEATURE_NAMES, weights):
+    print("{:>28} {:>10.3f}".format(name, weight))
+
+if __name__ == '__main__':
+  main(sys.argv[1:])
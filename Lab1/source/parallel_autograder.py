@@ -0,0 +1,130 @@
+"""
+Runs the autograder sections in parallel.
+
+Every (section, problem) pair of autograder.py is a job. Jobs are spread over
+a pool of worker processes, one process per job, and a job that runs past its
+deadline is killed and counted as unsolved. Results and timings are collected
+here and the sections are summarized exactly as autograder.py does.
+
+Usage: python parallel_autograder.py [-j workers]
+"""
+import getopt
+import multiprocessing
+import os
+import sys
+import time
+from multiprocessing.connection import wait
+
+from autograder import *
+
+GRACE = 1 #seconds on top of a search timebound before a job is killed
+
+#(section name, flag, check, problems, deadline per job, heading, summary)
+SECTIONS = [
+  ('time_astar', test_time_astar, time_astar, [19], TIME_TEST_BOUND + TIME_TEST_FUDGE, None, None),
+  ('time_gbfs', test_time_gbfs, time_gbfs, [19], TIME_TEST_BOUND + TIME_TEST_FUDGE, None, None),
+  ('manhattan', test_manhattan, check_manhattan, range(len(PROBLEMS)), GRACE, 'Testing Manhattan Distance', report_manhattan),
+  ('alternate', test_alternate, check_alternate, range(len(PROBLEMS)), TIMEOUT + GRACE, 'Testing alternate heuristic with best_first search', report_alternate),
+  ('fval_function', test_fval_function, check_fval_function, range(len(fval_weights)), GRACE, 'Testing fval_function', report_fval_function),
+  ('anytime_gbfs', test_anytime_gbfs, check_anytime_gbfs, range(len(PROBLEMS)), TIMEOUT + GRACE, 'Testing Anytime GBFS', report_anytime_gbfs),
+  ('anytime_weighted_astar', test_anytime_weighted_astar, check_anytime_weighted_astar, range(len(PROBLEMS)), TIMEOUT + GRACE, 'Testing Anytime Weighted A Star', report_anytime_weighted_astar),
+  ('incremental_heuristics', test_incremental_heuristics, check_incremental_heuristics, range(len(PROBLEMS)), TIMEOUT + GRACE, 'Testing incremental heuristics', report_incremental_heuristics),
+  ('beam_stack', test_beam_stack, check_beam_stack, range(len(beam_stack_problems)), len(beam_stack_widths) * TIMEOUT + GRACE, 'Testing beam_stack search', report_beam_stack),
+  ('heuristic_profiler', test_heuristic_profiler, check_heuristic_profiler, range(len(ebf_cases)), TIMEOUT + GRACE, 'Testing the heuristic profiler', report_heuristic_profiler),
+  ('checkpoint', test_checkpoint, check_checkpoint, range(len(checkpoint_problems)), TIMEOUT + GRACE, 'Testing checkpoints of Anytime Weighted A Star', report_checkpoint),
+]
+
+def _run_job(check, i, conn):
+  start_time = time.time()
+  result = check(i)
+  conn.send((result, time.time() - start_time))
+  conn.close()
+
+def run_jobs(jobs, workers):
+  '''
+  Run jobs, a list of (key, check, problem, deadline) tuples, with at most workers
+  processes at a time. Returns a dictionary key -> (result, seconds, killed).
+  '''
+  pending = list(jobs)
+  pending.reverse()
+  running = {} #reader connection -> (key, process, start time, deadline)
+  results = {}
+  while pending or running:
+    while pending and len(running) < workers:
+      key, check, i, deadline = pending.pop()
+      reader, writer = multiprocessing.Pipe(duplex=False)
+      p = multiprocessing.Process(target=_run_job, name=str(key), args=(check, i, writer))
+      p.start()
+      writer.close()
+      running[reader] = (key, p, time.time(), deadline)
+
+    #sleep until a job sends its result or the earliest deadline passes
+    now = time.time()
+    timeout = max(0, min(start + deadline for _, _, start, deadline in running.values()) - now)
+    for reader in wait(list(running), timeout):
+      key, p, start, deadline = running.pop(reader)
+      try:
+        result, seconds = reader.recv()
+        results[key] = (result, seconds, False)
+      except EOFError: #the job died without a result
+        results[key] = (None, time.time() - start, True)
+      reader.close()
+      p.join()
+
+    now = time.time()
+    for reader in [r for r, (_, _, start, deadline) in running.items() if now > start + deadline]:
+      key, p, start, deadline = running.pop(reader)
+      p.terminate()
+      p.join()
+      reader.close()
+      results[key] = (None, now - start, True)
+  return results
+
+def main(argv):
+  workers = os.cpu_count()
+  try:
+    opts, args = getopt.getopt(argv, "j:")
+  except getopt.GetoptError:
+    print('Usage: python parallel_autograder.py [-j workers]')
+    sys.exit(2)
+  for opt, arg in opts:
+    if opt == '-j':
+      workers = int(arg)
+
+  jobs = []
+  for name, flag, check, problems, deadline, heading, report in SECTIONS:
+    if flag:
+      jobs.extend(((name, i), check, i, deadline) for i in problems)
+
+  print("Running {} jobs on {} workers".format(len(jobs), workers))
+  start_time = time.time()
+  results = run_jobs(jobs, workers)
+  wall = time.time() - start_time
+
+  for name, flag, check, problems, deadline, heading, report in SECTIONS:
+    if not flag:
+      continue
+    if name == 'time_astar':
+      report_time_astar(results[(name, 19)][2])
+    elif name == 'time_gbfs':
+      report_time_gbfs(results[(name, 19)][2])
+    else:
+      print(heading)
+      report([results[(name, i)][0] for i in problems])
+
+  ##############################################################
+  # TIMINGS
+  print("{:>24} {:>6} {:>10} {:>10} {:>8}".format("section", "jobs", "total (s)", "max (s)", "killed"))
+  cpu = 0
+  for name, flag, check, problems, deadline, heading, report in SECTIONS:
+    if not flag:
+      continue
+    timings = [results[(name, i)] for i in problems]
+    total = sum(seconds for _, seconds, _ in timings)
+    cpu += total
+    print("{:>24} {:>6} {:>10.2f} {:>10.2f} {:>8}".format(name, len(timings), total,
+          max(seconds for _, seconds, _ in timings), sum(1 for _, _, killed in timings if killed)))
+  print("Grading took {:.2f} s of wall time for {:.2f} s of jobs.".format(wall, cpu))
+
+if __name__ == '__main__':
+  main(sys.argv[1:])
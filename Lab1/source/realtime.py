@@ -0,0 +1,154 @@
+'''Real-time search for the snowman domain.
+
+   A RealTimeAgent picks one robot action at a time, within a fixed
+   lookahead and time budget per action, instead of planning a full
+   solution. It learns as it moves: the h-values it improves are kept in
+   a table that persists across trials, so repeated trials from the same
+   (or similar) boards get cheaper until the table converges.
+
+   Two update rules are provided:
+
+   'lrta'  LRTA* (Korf, 1990). Look one action ahead, set h(s) to the
+           cheapest cost + h of a successor, move to that successor.
+   'rtaa'  RTAA* (Koenig and Likhachev, 2006). Run A* from s for up to
+           lookahead expansions, set h(x) = f - g(x) for every expanded
+           state x, where f is the f-value of the best state left on
+           OPEN, and move one action along the path to that state.
+
+   An agent cannot undo pushing a snowball into a corner, so it is given
+   heur_realtime by default, which adds that dead end test to
+   heur_alternate. States proven to be dead ends get an infinite h-value
+   and later trials steer clear of them.
+'''
+import gc
+import heapq
+import itertools
+import pickle
+import time
+
+from solution import *
+
+def _blocked(state, x, y):
+    return x < 0 or y < 0 or x >= state.width or y >= state.height or (x, y) in state.obstacles
+
+def heur_realtime(state):
+    '''heur_alternate, or infinity if a snowball off the destination is stuck in a corner'''
+    for x, y in state.snowballs:
+        if (x, y) != state.destination:
+            if (_blocked(state, x - 1, y) or _blocked(state, x + 1, y)) and (
+                _blocked(state, x, y - 1) or _blocked(state, x, y + 1)):
+                return float("inf")
+    return heur_alternate(state)
+
+class RealTimeAgent:
+    '''A real-time agent with a persistent table of learned h-values'''
+
+    def __init__(self, heur_fn = heur_realtime, goal_fn = snowman_goal_state, algorithm = 'lrta', lookahead = 32, budget = None):
+        '''heur_fn gives the initial h-value of states not in the table.
+           lookahead is the number of A* expansions per action of RTAA*
+           (LRTA* always looks one action ahead) and budget, if not None,
+           the time in seconds allowed per action. When the budget runs
+           out RTAA* acts on the states it has expanded so far.'''
+        if not algorithm in ['lrta', 'rtaa']:
+            print('Unknown real-time algorithm specified:', algorithm)
+            print("Must be one of 'lrta' or 'rtaa'")
+        self.heur_fn = heur_fn
+        self.goal_fn = goal_fn
+        self.algorithm = algorithm
+        self.lookahead = lookahead
+        self.budget = budget
+        self.h = {} #hashable_state -> learned h-value
+
+    def heuristic(self, state):
+        '''Learned h-value of state, heur_fn if it was never updated'''
+        key = state.hashable_state()
+        return self.h[key] if key in self.h else self.heur_fn(state)
+
+    def act(self, state):
+        '''Update the table and return the successor of state to move to,
+           or None if every successor is a dead end'''
+        if self.algorithm == 'rtaa':
+            return self._act_rtaa(state)
+        return self._act_lrta(state)
+
+    def _act_lrta(self, state):
+        best = None; best_f = float("inf")
+        for succ in state.successors():
+            f = (succ.gval - state.gval) + self.heuristic(succ)
+            if f < best_f:
+                best, best_f = succ, f
+        self.h[state.hashable_state()] = max(best_f, self.heuristic(state))
+        return best
+
+    def _act_rtaa(self, state):
+        deadline = time.perf_counter() + self.budget if self.budget else None
+        tie = itertools.count()
+        frontier = [(self.heuristic(state), 0, next(tie), state, None)]
+        g = {state.hashable_state(): 0}
+        closed = []
+        while frontier and len(closed) < self.lookahead:
+            f, neg_g, _, s, first = frontier[0]
+            if self.goal_fn(s) or (closed and deadline and time.perf_counter() > deadline):
+                break
+            heapq.heappop(frontier)
+            key = s.hashable_state()
+            if -neg_g > g[key]:
+                continue #reached by a cheaper path later
+            closed.append((key, -neg_g))
+            for succ in s.successors():
+                succ_key = succ.hashable_state()
+                succ_g = -neg_g + succ.gval - s.gval
+                if succ_key in g and g[succ_key] <= succ_g:
+                    continue
+                g[succ_key] = succ_g
+                h = self.heuristic(succ)
+                if h == float("inf"):
+                    continue
+                #remember the first action on the path, i.e., the successor of state
+                heapq.heappush(frontier, (succ_g + h, -succ_g, next(tie), succ, first or succ))
+
+        if not frontier:
+            for key, gval in closed:
+                self.h[key] = float("inf")
+            return None
+        f, neg_g, _, s, first = frontier[0]
+        for key, gval in closed:
+            self.h[key] = max(self.h.get(key, 0), f - gval)
+        if first is None:
+            #state is a goal, nothing to do
+            return None
+        return first
+
+    def run_trial(self, initial_state, max_steps = 1000):
+        '''Move from initial_state until a goal is reached, the agent is
+           stuck or max_steps actions were taken. Returns the goal state
+           reached (with its path) or False, and the list of seconds
+           taken by each action. The cyclic garbage collector is paused
+           during the trial so that its pauses don't land on an action.'''
+        state = initial_state
+        latencies = []
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for _ in range(max_steps):
+                if self.goal_fn(state):
+                    return state, latencies
+                start_time = time.perf_counter()
+                succ = self.act(state)
+                latencies.append(time.perf_counter() - start_time)
+                if succ is None:
+                    return False, latencies
+                state = succ
+            return (state if self.goal_fn(state) else False), latencies
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    def save_table(self, filename):
+        '''Save the learned h-values, e.g., to carry them over to another run'''
+        with open(filename, 'wb') as f:
+            pickle.dump(self.h, f, pickle.HIGHEST_PROTOCOL)
+
+    def load_table(self, filename):
+        with open(filename, 'rb') as f:
+            self.h = pickle.load(f)
@@ -36,16 +36,67 @@
       search (using the init_search method) and resume the search after
       a goal is found (using searchOpen). See the implementation for details. 
 
+      Each SearchEngine keeps its strategy and counters to itself, so
+      several engines can run in one process. solve_many runs a batch of
+      problems over a pool of threads or processes. The counters are
+      read with get_stats; the old class attributes sNode.n and
+      StateSpace.n still hold those of the last search that returned.
+
+      Time bounds are measured with search_clock, the CPU time of the
+      calling thread. Code that splits a time bound over several calls of
+      search, such as the anytime searches, must measure with it too.
+
+      Breadth first and ucs searches can also keep their frontier layers
+      and closed set in sorted files of packed state keys instead of RAM
+      (using the set_external_memory method).
+
+      The frontier, closed set and counters of a search can be saved to
+      a checkpoint file (save_checkpoint) and the search resumed later,
+      possibly in another process, with a fresh time budget
+      (load_checkpoint).
+
+      Full cycle checking keeps the cheapest g-value found for each state
+      in a dictionary keyed by hashable_state, or, after
+      set_closed_set('packed'), in a PackedClosedSet keyed by the exact
+      packed_state of each state.
+
+      The beam and beam_stack strategies search layer by layer and keep
+      only the best beam width nodes of each layer (see set_beam_width).
+      Beam stack search backtracks to the nodes a beam left out, so that
+      calling search again returns ever cheaper solutions and finally
+      proves the last one optimal.
+
+      With set_partial_expansion astar puts only the children of a node
+      whose f-value equals the node's on OPEN, and puts the node back
+      with the f-value of its next best child.
+
+      With set_compact_paths the states on OPEN drop their parent
+      pointers; a PathStore keeps the back pointers as a parent number and
+      an action code per state, and paths are rebuilt on demand.
+
     '''
 import heapq
+import itertools
 from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from array import array
+import copy
+import gzip
 import os
+import pickle
+import time
+import shutil
+import tempfile
+
+#The clock of the time bounds: CPU time of the calling thread, so engines
+#running in other threads don't use up each other's time.
+search_clock = time.thread_time
 
 class StateSpace:
     #represents a node in the state space of a generic search problem. The base class deﬁnes a fixed interface that is used by the SearchEngine class to perform a search in that state space.
     #For the Snowperson Puzzle problem, we will deﬁne a concrete subclass that inherits from StateSpace. This concrete sub-class will inherit some of the utility methods that are implemented in the base class.
     '''Abstract class for defining State spaces for search routines'''
-    n = 0
+    n = 0 #states generated by the last search, see SearchEngine.get_stats
     
     def __init__(self, action, gval, parent):
         '''Problem specific state space objects must always include the data items
@@ -63,8 +114,10 @@ class StateSpace:
         
         self.parent = parent #the parent StateSpace object of s, i.e., the StateSpace object that has s as a successor. Will be None if s is the initial state.
         
-        self.index = StateSpace.n
-        StateSpace.n = StateSpace.n + 1
+        self.index = next(_state_ids) #a unique number for the state, used when tracing
+
+        self.path_store = None #the PathStore that holds the path to s instead of parent, if any
+        self.path_id = None #the number of s in that PathStore
 
     def successors(self):
         '''This method when invoked on a state space object must return a
@@ -74,6 +127,11 @@ class StateSpace:
            Also any problem specific data must be specified property.'''        
         raise Exception("Must be overridden in subclass.")
 
+    def iter_successors(self):
+        '''Optional. Iterate over the successors of self, building each
+           one only when it is asked for. Used by partial expansion.'''
+        return iter(self.successors())
+
     def hashable_state(self):
         '''This method must return an immutable and unique representation
            of the state represented by self. The return value, e.g., a
@@ -82,6 +140,25 @@ class StateSpace:
            if and only if obj1 and obj2 represent the same problem state.'''
         raise Exception("Must be overridden in subclass.")
 
+    def packed_state(self):
+        '''Optional. This method must return a non-negative integer that
+           exactly encodes the problem state represented by self, using
+           at most packed_bits() bits. Unlike hashable_state distinct
+           states must never share a key. It is used by the external
+           memory search, which writes states to disk as packed keys.'''
+        raise Exception("Must be overridden in subclass.")
+
+    def packed_bits(self):
+        '''Optional. Number of bits needed by packed_state() for the
+           states of this problem instance.'''
+        raise Exception("Must be overridden in subclass.")
+
+    def unpacked_state(self, key, action, gval, parent):
+        '''Optional. Inverse of packed_state: return the state of the same
+           problem instance as self that is encoded by key, with the
+           given action, gval and parent.'''
+        raise Exception("Must be overridden in subclass.")
+
     def print_state(self):
         '''Print a representation of the state'''
         raise Exception("Must be overridden in subclass.")
@@ -89,11 +166,15 @@ class StateSpace:
     def print_path(self):
         '''print the sequence of actions used to reach self'''
         #can be over ridden to print problem specific information
-        s = self
-        states = []
-        while s:
-            states.append(s)
-            s = s.parent
+        if self.path_store is not None:
+            states = self.path_store.path_states(self.path_id)
+            states.reverse()
+        else:
+            s = self
+            states = []
+            while s:
+                states.append(s)
+                s = s.parent
         states.pop().print_state()
         while states:
             print(" ==> ", end="")
@@ -110,6 +191,71 @@ class StateSpace:
             s = s.parent
         return False
 
+class PathStore:
+    '''Back pointers of the states put on OPEN by a search, in place of
+       their parent pointers: for each state the number of its parent
+       (array of 32 bit ints, -1 for the initial state) and the code of
+       the action that generated it (array of bytes), i.e., 5 bytes per
+       state. States no longer keep their whole path alive. A path is
+       rebuilt by replaying its actions from the initial state, matching
+       each action against the names of the successors generated.'''
+
+    def __init__(self, root):
+        self.root = root
+        self.parents = array('i', [-1])
+        self.actions = array('B', [0])
+        self.action_names = [root.action]
+        self.action_codes = {root.action: 0}
+        root.path_store = self
+        root.path_id = 0
+
+    def add(self, state, parent_id):
+        '''Record state as a child of state number parent_id and cut its
+           parent pointer; returns its number'''
+        code = self.action_codes.get(state.action)
+        if code is None:
+            code = len(self.action_names)
+            self.action_names.append(state.action)
+            self.action_codes[state.action] = code
+        self.parents.append(parent_id)
+        self.actions.append(code)
+        state.path_store = self
+        state.path_id = len(self.parents) - 1
+        state.parent = None
+        return state.path_id
+
+    def path_actions(self, path_id):
+        '''Names of the actions leading from the initial state to state
+           number path_id'''
+        actions = []
+        while path_id > 0:
+            actions.append(self.action_names[self.actions[path_id]])
+            path_id = self.parents[path_id]
+        actions.reverse()
+        return actions
+
+    def path_states(self, path_id):
+        '''States on the path to state number path_id, rebuilt with their
+           parent pointers, initial state first'''
+        states = [self.root]
+        for action in self.path_actions(path_id):
+            states.append(next(succ for succ in states[-1].successors() if succ.action == action))
+        return states
+
+    def rebuild(self, state):
+        '''A copy of state with its whole parent chain'''
+        return self.path_states(state.path_id)[-1]
+
+    def __len__(self):
+        return len(self.parents)
+
+    def nbytes(self):
+        return self.parents.itemsize * len(self.parents) + self.actions.itemsize * len(self.actions)
+
+#Source of StateSpace index numbers. next() on a count is atomic, so states
+#can be created by several threads.
+_state_ids = itertools.count()
+
 #Constants to denote the search strategy. 
 _DEPTH_FIRST = 0
 _BREADTH_FIRST = 1
@@ -117,6 +263,8 @@ _BEST_FIRST = 2
 _ASTAR = 3
 _UCS = 4
 _CUSTOM = 5
+_BEAM = 6
+_BEAM_STACK = 7
 
 #For best first and astar we use a priority queue. This requires
 #a comparison function for nodes. These constants indicate if we use
@@ -143,23 +291,229 @@ def _fval_function(state):
   '''default fval function results in Best First Search'''  
   return state.hval 
 
+class IncrementalHeuristic:
+    '''Base class for heuristics that compute the h-value of a child
+       state from the evaluation of its parent and the change made by
+       the move, i.e., h(child) = update(h(parent), delta), instead of
+       from scratch. Besides the h-value each evaluation returns some
+       heuristic specific data that the search engine keeps in the
+       search node and hands to update for the node's children. The
+       StateSpace subclass must describe the move in the children it
+       generates (e.g., SnowmanState.delta).
+
+       An IncrementalHeuristic can be called like any heuristic
+       function, which evaluates the state from scratch.'''
+
+    def evaluate(self, state):
+        '''Full evaluation of state, returns a tuple (hval, data)'''
+        raise Exception("Must be overridden in subclass.")
+
+    def update(self, data, state):
+        '''Return the tuple (hval, data) of state, given the data of the
+           evaluation of its parent and the move delta stored in state'''
+        raise Exception("Must be overridden in subclass.")
+
+    def __call__(self, state):
+        return self.evaluate(state)[0]
+
+class BatchHeuristic:
+    '''Base class for heuristics that are cheaper per state when they
+       evaluate many states in one call, e.g., with NumPy. The search
+       engine hands all the successors of a node to evaluate_batch at
+       once. A BatchHeuristic can be called like any heuristic function
+       on a single state.'''
+
+    def evaluate_batch(self, states):
+        '''Return the list of h-values of the states'''
+        raise Exception("Must be overridden in subclass.")
+
+    def __call__(self, state):
+        return self.evaluate_batch([state])[0]
+
+#External memory search stores states as fixed width big-endian records of
+#their packed keys, so byte order of the files equals numeric key order.
+_RECORDS_PER_READ = 4096
+
+def _write_keys(path, keys, nbytes):
+    '''Write an iterable of packed keys to path, return the number written'''
+    count = 0
+    with open(path, 'wb') as f:
+        chunk = []
+        for key in keys:
+            chunk.append(key.to_bytes(nbytes, 'big'))
+            count += 1
+            if len(chunk) == _RECORDS_PER_READ:
+                f.write(b''.join(chunk))
+                chunk = []
+        f.write(b''.join(chunk))
+    return count
+
+def _read_keys(path, nbytes):
+    '''Stream the packed keys stored in path'''
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(nbytes * _RECORDS_PER_READ)
+            if not data:
+                return
+            for i in range(0, len(data), nbytes):
+                yield int.from_bytes(data[i:i + nbytes], 'big')
+
+def _unique(sorted_keys):
+    '''Drop repeated keys from a sorted stream'''
+    last = None
+    for key in sorted_keys:
+        if key != last:
+            yield key
+            last = key
+
+def _subtract(sorted_keys, sorted_removed):
+    '''Keys of the first sorted stream that are not in the second one'''
+    removed = next(sorted_removed, None)
+    for key in sorted_keys:
+        while removed is not None and removed < key:
+            removed = next(sorted_removed, None)
+        if key != removed:
+            yield key
+
+#Fibonacci hashing: multiply a 64 bit key by 2^64 / golden ratio and keep the
+#top bits of the low 64 bits of the product as the slot number.
+_FIBONACCI = 11400714819323198485
+_MASK64 = (1 << 64) - 1
+
+class PackedClosedSet:
+    '''A closed set for full cycle checking that maps exact packed state
+       keys (see StateSpace.packed_state) to g-values, with the same
+       interface as the dictionary it replaces (in, [] and len).
+
+       It is an open addressing hash table with linear probing in two
+       flat arrays: the keys, stored as key + 1 so that 0 marks an empty
+       slot, in one or more 64 bit words per slot, and the g-values as
+       16 bit unsigned integers, widened to 64 bit floats the first time
+       a g-value above 65535 or not an integer is stored. With single
+       word keys a slot takes 10 bytes (16 once widened). The table fills
+       up to 3/4 and then doubles, so a state takes 13 to 27 bytes (21 to
+       43 widened), and up to 40 (64) while the table doubles, as the old
+       arrays are only freed once every key is reinserted. Since keys are
+       exact, distinct states never collide the way hash values of
+       hashable_state can.'''
+
+    def __init__(self, key_bits, capacity = 1024):
+        self.words = (key_bits + 64) // 64 #key + 1 needs key_bits + 1 bits
+        self.count = 0
+        self.gval_type = 'H'
+        size = 16
+        while size < capacity:
+            size *= 2
+        self._allocate(size)
+
+    def _allocate(self, size):
+        self.size = size
+        self.shift = 64 - (size.bit_length() - 1)
+        self.keys = array('Q', bytes(8 * self.words * size))
+        self.gvals = array(self.gval_type, bytes(array(self.gval_type).itemsize * size))
+
+    def _split(self, key):
+        '''The words of key + 1, least significant first'''
+        key += 1
+        return [(key >> (64 * w)) & _MASK64 for w in range(self.words)]
+
+    def _slot(self, key):
+        '''Slot that holds key, or the empty slot where it would go'''
+        keys = self.keys
+        mask = self.size - 1
+        if self.words == 1:
+            key += 1
+            i = ((key * _FIBONACCI) & _MASK64) >> self.shift
+            while True:
+                stored = keys[i]
+                if stored == key or stored == 0:
+                    return i
+                i = (i + 1) & mask
+        parts = self._split(key)
+        folded = 0
+        for part in parts:
+            folded ^= part
+        i = ((folded * _FIBONACCI) & _MASK64) >> self.shift
+        words = self.words
+        while True:
+            stored = keys[i * words:(i + 1) * words].tolist()
+            if stored == parts or not any(stored):
+                return i
+            i = (i + 1) & mask
+
+    def _empty(self, i):
+        if self.words == 1:
+            return self.keys[i] == 0
+        return not any(self.keys[i * self.words:(i + 1) * self.words])
+
+    def __contains__(self, key):
+        return not self._empty(self._slot(key))
+
+    def __getitem__(self, key):
+        i = self._slot(key)
+        if self._empty(i):
+            raise KeyError(key)
+        return self.gvals[i]
+
+    def __setitem__(self, key, gval):
+        i = self._slot(key)
+        if self._empty(i):
+            if self.words == 1:
+                self.keys[i] = key + 1
+            else:
+                self.keys[i * self.words:(i + 1) * self.words] = array('Q', self._split(key))
+            self.count += 1
+        try:
+            self.gvals[i] = gval
+        except (OverflowError, TypeError):
+            #does not fit 16 bits: widen the g-values to floats
+            self.gval_type = 'd'
+            self.gvals = array('d', self.gvals)
+            self.gvals[i] = gval
+        if 4 * self.count > 3 * self.size:
+            self._grow()
+
+    def __len__(self):
+        return self.count
+
+    def _grow(self):
+        '''Double the table and reinsert every key'''
+        keys, gvals, words = self.keys, self.gvals, self.words
+        self._allocate(2 * self.size)
+        self.count = 0
+        for i in range(len(gvals)):
+            stored = keys[i * words:(i + 1) * words]
+            if any(stored):
+                key = 0
+                for w in range(words):
+                    key |= stored[w] << (64 * w)
+                self[key - 1] = gvals[i]
+
+    def nbytes(self):
+        '''Bytes used by the two arrays'''
+        return self.keys.itemsize * len(self.keys) + self.gvals.itemsize * len(self.gvals)
+
 class sNode:
     '''Object of this class form the nodes of the search space.  Each
     node consists of a search space object (determined by the problem
     definition) along with the h and g values (the g values is
     redundant as it is stored in the state, but we make a copy in the
-    node object for convenience), and the number of the node'''
-    
-    n = 0
-    lt_type = _SUM_HG
+    node object for convenience), and the number of the node. The
+    comparison used for ordering nodes (lt_type) is stored in the node
+    by the SearchEngine that made it, so engines using different
+    strategies can run side by side.'''
     
-    def __init__(self, state, hval, fval_function):
+    n = 0 #nodes generated by the last search, see SearchEngine.get_stats
+
+    def __init__(self, state, hval, fval_function, lt_type = _SUM_HG, index = 0):
         self.state = state
         self.hval = hval
         self.gval = state.gval
-        self.index = sNode.n
+        self.index = index
         self.fval_function = fval_function
-        sNode.n = sNode.n + 1
+        self.lt_type = lt_type
+        self.hdata = None #data kept by an IncrementalHeuristic
+        self.pe_bound = None #partial expansion: f-value up to which children are on OPEN
 
     def __lt__(self, other):
         '''For astar and best first we use a priority queue for the
@@ -173,16 +527,16 @@ class sNode:
            value. This means that we expand nodes along deeper paths
            first causing the search to proceed directly to the goal'''
                 
-        if sNode.lt_type == _SUM_HG:
+        if self.lt_type == _SUM_HG:
             if (self.gval+self.hval) == (other.gval+other.hval):
                 #break ties by greatest gval. 
                 return self.gval > other.gval
             else: return ((self.gval+self.hval) < (other.gval+other.hval))
-        if sNode.lt_type == _G:
+        if self.lt_type == _G:
             return self.gval < other.gval
-        if sNode.lt_type == _H:
+        if self.lt_type == _H:
             return self.hval < other.hval    
-        if sNode.lt_type == _C:  
+        if self.lt_type == _C:  
             return self.fval_function(self) <  other.fval_function(other)          
         
         print('sNode class has invalid comparator setting!')
@@ -195,9 +549,11 @@ class Open:
        nodes. Depending on the search strategy used we want to extract
        nodes from this set in different orders, so set up the object's
        functions to operate as needed by the particular search
-       strategy'''
+       strategy. lt_type is the node comparison that the nodes
+       inserted into this OPEN must use.'''
     
     def __init__(self, search_strategy):
+        self.lt_type = _SUM_HG
         if search_strategy == _DEPTH_FIRST:
             #use stack for OPEN set (last in---most recent successor added---is first out)
             self.open = []
@@ -212,28 +568,28 @@ class Open:
             #use priority queue for OPEN (first out is node with lowest gval)
             self.open = []
             #set node less than function to compare gvals only
-            sNode.lt_type = _G
+            self.lt_type = _G
             self.insert = lambda node: heapq.heappush(self.open, node)
             self.extract = lambda: heapq.heappop(self.open)            
         elif search_strategy == _BEST_FIRST:
             #use priority queue for OPEN (first out is node with lowest hval)
             self.open = []
             #set node less than function to compare hvals only
-            sNode.lt_type = _H
+            self.lt_type = _H
             self.insert = lambda node: heapq.heappush(self.open, node)
             self.extract = lambda: heapq.heappop(self.open)
         elif search_strategy == _ASTAR:
             #use priority queue for OPEN (first out is node with lowest fval = gval+hval)
             self.open = []
             #set node less than function to compare sums of hval and gval
-            sNode.lt_type = _SUM_HG
+            self.lt_type = _SUM_HG
             self.insert = lambda node: heapq.heappush(self.open, node)
             self.extract = lambda: heapq.heappop(self.open) 
         elif search_strategy == _CUSTOM:
             #use priority queue for OPEN (first out is node with lowest fval)
             self.open = []
             #set node less than function to compare sums of fval    
-            sNode.lt_type = _C
+            self.lt_type = _C
             self.insert = lambda node: heapq.heappush(self.open, node)
             self.extract = lambda: heapq.heappop(self.open)          
 
@@ -264,12 +620,36 @@ class SearchEngine:
         #if set to custom, you will have to specify the way that f-values of nodes are calculated; these values will structure the order of the nodes that are expanded during your search.
         
         self.trace = 0
+        self.external = False
+        self.external_path = None
+        self.open = None
+        self.closed_set = 'dict'
+        self.closed_capacity = 1024
+        self.beam_width = 100
+        self.partial_expansion = False
+        self.compact_paths = False
+        self.path_store = None
 
     def initStats(self):
-        sNode.n = 0
-        StateSpace.n = 1    #initial state already generated on call so search
+        self.nodes_generated = 0
+        self.states_generated = 1    #initial state already generated on call so search
         self.cycle_check_pruned = 0
         self.cost_bound_pruned = 0
+        self.beam_pruned = 0
+
+    def _new_node(self, state, hval, fval_function):
+        '''Make a search node that is ordered as the OPEN of this engine needs'''
+        node = sNode(state, hval, fval_function, self.open.lt_type if self.open else _SUM_HG, self.nodes_generated)
+        self.nodes_generated = self.nodes_generated + 1
+        return node
+
+    def get_stats(self):
+        '''Counters of the last search, as a dictionary'''
+        return {'nodes_generated': self.nodes_generated,
+                'states_generated': self.states_generated,
+                'cycle_check_pruned': self.cycle_check_pruned,
+                'cost_bound_pruned': self.cost_bound_pruned,
+                'beam_pruned': self.beam_pruned}
 
     def trace_on(self, level = 1):
         '''For debugging, set tracking level 1 or 2'''
@@ -279,10 +659,171 @@ class SearchEngine:
         '''Turn off tracing'''
         self.trace = 0
 
+    def set_external_memory(self, directory = None, run_size = 100000):
+        '''Run breadth_first and ucs searches with external memory. Each
+           layer of the search and the closed set are kept in sorted files
+           of packed state keys (see StateSpace.packed_state) under
+           directory (a fresh temporary directory if None). At most
+           run_size successor keys are held in RAM at once; larger layers
+           are written as sorted runs and duplicates are removed while
+           merging the runs against the closed set. Layers are numbers of
+           actions, so costs are optimal for unit cost actions only.'''
+        self.external = True
+        self.external_directory = directory
+        self.external_run_size = run_size
+
+    def external_memory_off(self):
+        '''Go back to searching with OPEN and the closed set in RAM'''
+        self.external = False
+
+    def remove_external_files(self):
+        '''Delete the layer and closed set files of the last external memory
+           search. They are kept after a search so that it can be resumed.'''
+        if self.external_path is None:
+            return
+        if self.external_directory is None:
+            shutil.rmtree(self.external_path, ignore_errors=True)
+        else:
+            for name in os.listdir(self.external_path):
+                if name.endswith('.bin'):
+                    os.remove(os.path.join(self.external_path, name))
+
+    def save_checkpoint(self, filename, states = (), extra = None):
+        '''Save the search to filename so that it can be resumed by
+           load_checkpoint: OPEN, the cycle check dictionary, the counters
+           and the strategy. Search nodes keep their state, hval and the
+           data of an IncrementalHeuristic; the functions given to
+           init_search are not saved. states is a sequence of other states
+           to save along (e.g., the best solution found so far, False and
+           None are kept as is) and extra any picklable data of the
+           caller. Every state on the path to a saved state is written
+           once, as a packed key (see StateSpace.packed_state) if the
+           problem supports it, and the file is gzip compressed.'''
+        if self.open is None:
+            print('Only searches with OPEN in RAM can be checkpointed')
+            return False
+        nodes = list(self.open.open)
+        table, number = _flatten_states([node.state for node in nodes] +
+                                        [state for state in states if state])
+        try:
+            records = [(state.packed_state(), state.action, state.gval) for state in table]
+            template = _detach_path(table[0])[0] if table else None
+        except Exception:
+            records = [copy.copy(state) for state in table]
+            for state in records:
+                state.parent = None
+            template = None
+        checkpoint = {
+            'strategy': self.strategy,
+            'cycle_check': self.cycle_check,
+            'template': template,
+            'states': records,
+            'parents': [number[id(state.parent)] if state.parent else -1 for state in table],
+            'open': [(number[id(node.state)], node.hval, node.index, node.hdata, node.state.path_id) for node in nodes],
+            'path_store': self.path_store,
+            'closed_set': self.closed_set,
+            'cc_dictionary': self.cc_dictionary if self.cycle_check == _CC_FULL else None,
+            'saved': [number[id(state)] if state else state for state in states],
+            'stats': self.get_stats(),
+            'extra': extra}
+        with gzip.open(filename, 'wb') as f:
+            pickle.dump(checkpoint, f, pickle.HIGHEST_PROTOCOL)
+        return True
+
+    def load_checkpoint(self, filename, goal_fn, heur_fn=_zero_hfn, fval_function=_fval_function):
+        '''Replaces init_search when resuming a search saved by
+           save_checkpoint: the functions are given again as they are not
+           saved. The next call of search continues where the saved search
+           stopped. Returns a tuple (states, extra) of what was passed to
+           save_checkpoint.'''
+        with gzip.open(filename, 'rb') as f:
+            checkpoint = pickle.load(f)
+        self.strategy = checkpoint['strategy']
+        self.cycle_check = checkpoint['cycle_check']
+        self.closed_set = checkpoint['closed_set']
+        self.external = False
+        self.fval_function = fval_function
+        self.goal_fn = goal_fn
+        self.heur_fn = heur_fn
+
+        table = []
+        template = checkpoint['template']
+        for record, parent in zip(checkpoint['states'], checkpoint['parents']):
+            parent = table[parent] if parent >= 0 else None
+            if template is None:
+                state = record
+                state.parent = parent
+            else:
+                key, action, gval = record
+                state = template.unpacked_state(key, action, gval, parent)
+            table.append(state)
+
+        self.open = Open(self.strategy)
+        self.path_store = checkpoint['path_store']
+        for number, hval, index, hdata, path_id in checkpoint['open']:
+            if self.path_store is not None:
+                table[number].path_store = self.path_store
+                table[number].path_id = path_id
+            node = sNode(table[number], hval, fval_function, self.open.lt_type, index)
+            node.hdata = hdata
+            #the saved list is already in heap (or stack/queue) order
+            self.open.open.append(node)
+        if self.cycle_check == _CC_FULL:
+            self.cc_dictionary = checkpoint['cc_dictionary']
+        for name, value in checkpoint['stats'].items():
+            setattr(self, name, value)
+        states = [table[number] if number is not None and number is not False else number
+                  for number in checkpoint['saved']]
+        return states, checkpoint['extra']
+
+    def set_partial_expansion(self, on = True):
+        '''Partial expansion A* (Yoshizumi, Miura and Ishida, 2000), used
+           by the astar strategy. Expanding a node walks over its
+           successors (StateSpace.iter_successors) but only puts on OPEN
+           those whose f-value is no more than the node's; the node goes
+           back on OPEN with the lowest f-value of the children left out,
+           which are regenerated if it comes up again. OPEN holds far
+           fewer nodes, at the cost of generating successors more than
+           once.'''
+        self.partial_expansion = on
+
+    def set_compact_paths(self, on = True):
+        '''Keep the paths of the states put on OPEN in a PathStore instead
+           of parent pointers, so that expanded states whose descendants
+           are still on OPEN can be freed. search returns the goal with its
+           path rebuilt. Path checking needs the parent pointers, so it
+           turns this off.'''
+        self.compact_paths = on
+
+    def set_beam_width(self, width):
+        '''Number of nodes the beam and beam_stack strategies keep in each
+           layer; beam_stack also keeps the nodes tied in f with the last
+           one, so a layer may hold more. Memory use is about width times
+           the solution length.'''
+        self.beam_width = width
+
+    def set_closed_set(self, kind = 'dict', capacity = 1024):
+        '''Choose how full cycle checking stores the cheapest g-value of
+           each state: 'dict' (a dictionary keyed by hashable_state) or
+           'packed' (a PackedClosedSet keyed by packed_state, sized for
+           capacity states at first). Takes effect at the next init_search.'''
+        if not kind in ['dict', 'packed']:
+            print('Unknown closed set specified:', kind)
+            print("Must be one of 'dict' or 'packed'")
+        else:
+            self.closed_set = kind
+            self.closed_capacity = capacity
+
+    def _closed_key(self, state):
+        '''Key of state in the closed set'''
+        if self.closed_set == 'packed':
+            return state.packed_state()
+        return state.hashable_state()
+
     def set_strategy(self, s, cc = 'default'):
-        if not s in ['depth_first', 'breadth_first', 'ucs', 'best_first', 'astar', 'custom']:
+        if not s in ['depth_first', 'breadth_first', 'ucs', 'best_first', 'astar', 'custom', 'beam', 'beam_stack']:
             print('Unknown search strategy specified:', s)
-            print("Must be one of 'depth_first', 'ucs', 'breadth_first', 'best_first', 'custom' or 'astar'")
+            print("Must be one of 'depth_first', 'ucs', 'breadth_first', 'best_first', 'custom', 'astar', 'beam' or 'beam_stack'")
         elif not cc in ['default', 'none', 'path', 'full']:
             print('Unknown cycle check level', cc)
             print( "Must be one of ['default', 'none', 'path', 'full']")
@@ -303,6 +844,8 @@ class SearchEngine:
             elif s == 'best_first'   : self.strategy = _BEST_FIRST
             elif s == 'astar'        : self.strategy = _ASTAR       
             elif s == 'custom' : self.strategy = _CUSTOM             
+            elif s == 'beam'         : self.strategy = _BEAM
+            elif s == 'beam_stack'   : self.strategy = _BEAM_STACK
 
     def get_strategy(self):
         if   self.strategy == _DEPTH_FIRST    : rval = 'depth_first'
@@ -311,6 +854,8 @@ class SearchEngine:
         elif self.strategy == _UCS          : rval = 'ucs' 
         elif self.strategy == _ASTAR          : rval = 'astar'      
         elif self.strategy == _CUSTOM          : rval = 'custom'   
+        elif self.strategy == _BEAM            : rval = 'beam'
+        elif self.strategy == _BEAM_STACK      : rval = 'beam_stack'
   
         rval = rval + ' with '
 
@@ -352,20 +897,42 @@ class SearchEngine:
             print("   TRACE: Initial State:", end="")
             initState.print_state()
         #END 
+        self.fval_function = fval_function
+        self.goal_fn = goal_fn
+        self.heur_fn = heur_fn
+
+        if self.external and self.strategy in (_BREADTH_FIRST, _UCS):
+            self.open = None
+            self._init_external(initState)
+            return
+
+        if self.strategy in (_BEAM, _BEAM_STACK):
+            self.open = None
+            self._init_beam(initState)
+            return
+
         self.open = Open(self.strategy)
 
-        node = sNode(initState, heur_fn(initState), fval_function)      
+        if isinstance(heur_fn, IncrementalHeuristic):
+            hval, hdata = heur_fn.evaluate(initState)
+        else:
+            hval, hdata = heur_fn(initState), None
+        node = self._new_node(initState, hval, fval_function)      
+        node.hdata = hdata
+        self.path_store = None
+        if self.compact_paths and self.cycle_check != _CC_PATH:
+            self.path_store = PathStore(initState)
 
         #the cycle check dictionary stores the cheapest path (g-val) found
         #so far to a state. 
         if self.cycle_check == _CC_FULL:
-            self.cc_dictionary = dict() 
-            self.cc_dictionary[initState.hashable_state()] = initState.gval
+            if self.closed_set == 'packed':
+                self.cc_dictionary = PackedClosedSet(initState.packed_bits(), self.closed_capacity)
+            else:
+                self.cc_dictionary = dict() 
+            self.cc_dictionary[self._closed_key(initState)] = initState.gval
         
         self.open.insert(node)
-        self.fval_function = fval_function
-        self.goal_fn = goal_fn
-        self.heur_fn = heur_fn
 
     def search(self, timebound=None, costbound=None):
         
@@ -378,24 +945,33 @@ class SearchEngine:
         goal_node = []
 
         ###NOW do the search and return the result
-        self.search_start_time = os.times()[0]
+        self.search_start_time = search_clock()
         self.search_stop_time = None
         if timebound:
             self.search_stop_time = self.search_start_time + timebound
-        goal_node = self._searchOpen(self.goal_fn, self.heur_fn, self.fval_function, costbound)
+        if self.external and self.strategy in (_BREADTH_FIRST, _UCS):
+            goal_node = self._searchExternal(self.goal_fn, self.heur_fn, costbound)
+        elif self.strategy in (_BEAM, _BEAM_STACK):
+            goal_node = self._searchBeam(self.goal_fn, self.heur_fn, costbound)
+        else:
+            goal_node = self._searchOpen(self.goal_fn, self.heur_fn, self.fval_function, costbound)
+        sNode.n = self.nodes_generated
+        StateSpace.n = self.states_generated
 
         if goal_node:
-            total_search_time = os.times()[0] - self.search_start_time
+            total_search_time = search_clock() - self.search_start_time
+            if goal_node.state.path_store is not None and goal_node.state.parent is None:
+                return goal_node.state.path_store.rebuild(goal_node.state)
             #print("Solution Found with cost of {} in search time of {} sec".format(goal_node.gval, total_search_time))
             #print("Nodes expanded = {}, states generated = {}, states cycle check pruned = {}, states cost bound pruned = {}".format(
-            #    sNode.n, StateSpace.n, self.cycle_check_pruned, self.cost_bound_pruned))
+            #    self.nodes_generated, self.states_generated, self.cycle_check_pruned, self.cost_bound_pruned))
             return goal_node.state
         else:
             #exited the while without finding goal---search failed
-            total_search_time = os.times()[0] - self.search_start_time            
+            total_search_time = search_clock() - self.search_start_time            
             #print("Search Failed! No solution found.")
             #print("Nodes expanded = {}, states generated = {}, states cycle check pruned = {}, states cost bound pruned = {}".format(
-            #    sNode.n, StateSpace.n, self.cycle_check_pruned, self.cost_bound_pruned))
+            #    self.nodes_generated, self.states_generated, self.cycle_check_pruned, self.cost_bound_pruned))
             return False
 
     def _searchOpen(self, goal_fn, heur_fn, fval_function, costbound):
@@ -414,6 +990,9 @@ class SearchEngine:
             if self.cycle_check == _CC_FULL:
                 print("   TRACE: Initial CC_Dict:", self.cc_dictionary)
         #END TRACING
+        incremental = isinstance(heur_fn, IncrementalHeuristic)
+        batch = isinstance(heur_fn, BatchHeuristic)
+        partial = self.partial_expansion and self.strategy == _ASTAR
         while not self.open.empty():
             node = self.open.extract()
 
@@ -430,8 +1009,13 @@ class SearchEngine:
               return node
 
             if self.search_stop_time: #timebound check
-              if os.times()[0] > self.search_stop_time:                
-                #exceeded time bound, must terminate search
+              if search_clock() > self.search_stop_time:                
+                #exceeded time bound, must terminate search. Put the node
+                #back so that the search can be resumed or checkpointed.
+                if self.strategy == _BREADTH_FIRST:
+                    self.open.open.appendleft(node)
+                else:
+                    self.open.insert(node)
                 print("TRACE: Search has exceeeded the time bound provided")
                 return False
 
@@ -445,16 +1029,28 @@ class SearchEngine:
             #BEGIN TRACING
             if self.trace:
                 if self.cycle_check == _CC_FULL: print("   TRACE: CC_dict gval={}, node.gval={}".format(
-                    self.cc_dictionary[node.state.hashable_state()], node.gval))
+                    self.cc_dictionary[self._closed_key(node.state)], node.gval))
             #END TRACING
 
-            if self.cycle_check == _CC_FULL and self.cc_dictionary[node.state.hashable_state()] < node.gval:
+            if self.cycle_check == _CC_FULL and self.cc_dictionary[self._closed_key(node.state)] < node.gval:
                 continue
 
-            successors = node.state.successors()
+            if partial:
+                #children with f-values in (low, high] go on OPEN now
+                low = node.pe_bound
+                high = node.gval + node.hval
+                next_fval = float("inf")
+                successors = node.state.iter_successors()
+                if batch:
+                    successors = list(successors)
+            else:
+                successors = node.state.successors()
+                self.states_generated = self.states_generated + len(successors)
+            if batch:
+                batch_hvals = heur_fn.evaluate_batch(successors)
 
             #BEGIN TRACING
-            if self.trace:
+            if self.trace and not partial:
                 print("   TRACE: Expanding Node. Successors = {", end="")
                 for ss in successors:                  
                     print("<S{}:{}:{}, g={}, h={}, f=g+h={}>, ".format(
@@ -462,8 +1058,10 @@ class SearchEngine:
                 print("}")
             #END TRACING
 
-            for succ in successors:
-                hash_state = succ.hashable_state()
+            for k, succ in enumerate(successors):
+                if partial:
+                    self.states_generated = self.states_generated + 1
+                hash_state = self._closed_key(succ)
                 if self.trace > 1: 
                   if self.cycle_check == _CC_FULL and hash_state in self.cc_dictionary:
                       print("   TRACE: Already in CC_dict, CC_dict gval={}, successor state gval={}".format(
@@ -500,7 +1098,12 @@ class SearchEngine:
                     #END TRACING
                     continue
 
-                succ_hval = heur_fn(succ)
+                if incremental:
+                    succ_hval, succ_hdata = heur_fn.update(node.hdata, succ)
+                elif batch:
+                    succ_hval, succ_hdata = batch_hvals[k], None
+                else:
+                    succ_hval, succ_hdata = heur_fn(succ), None
                 if costbound is not None and (succ.gval > costbound[0] or
                                               succ_hval > costbound[1] or
                                               succ.gval + succ_hval > costbound[2]) : 
@@ -510,8 +1113,20 @@ class SearchEngine:
                       print("\n") 
                     continue                    
 
+                if partial:
+                    succ_fval = succ.gval + succ_hval
+                    if low is not None and succ_fval <= low:
+                        continue #put on OPEN by an earlier expansion of node
+                    if succ_fval > high:
+                        next_fval = min(next_fval, succ_fval)
+                        continue
+
                 #passed all cycle checks and costbound checks ...add to open
-                self.open.insert(sNode(succ, succ_hval, node.fval_function))
+                succ_node = self._new_node(succ, succ_hval, node.fval_function)
+                succ_node.hdata = succ_hdata
+                if self.path_store is not None:
+                    self.path_store.add(succ, node.state.path_id)
+                self.open.insert(succ_node)
 
                 #BEGIN TRACING
                 if self.trace > 1:
@@ -523,6 +1138,365 @@ class SearchEngine:
                 if self.cycle_check == _CC_FULL:
                     self.cc_dictionary[hash_state] = succ.gval
 
+            if partial and next_fval < float("inf"):
+                #put node back with the f-value of its best child left out
+                node.pe_bound = high
+                node.hval = next_fval - node.gval
+                self.open.insert(node)
+
         #end of while--OPEN is empty and no solution
         return False
             
+
+    def _init_beam(self, initState):
+        '''Set up a beam search: layer 0 holds the initial state. For beam
+           stack search beam_stack[l] is the [fmin, fmax) range of f-values
+           of the successors of layer l that may enter layer l + 1, and
+           beam_bound is the cost of the best solution found so far.
+           Until a solution is found, nodes with an f-value above
+           beam_limit are left out too, so narrow beams cannot wander
+           arbitrarily deep; see _restart_beam.'''
+        if isinstance(self.heur_fn, IncrementalHeuristic):
+            hval, hdata = self.heur_fn.evaluate(initState)
+        else:
+            hval, hdata = self.heur_fn(initState), None
+        node = self._new_node(initState, hval, self.fval_function)
+        node.hdata = hdata
+        self.beam_root = node
+        self.beam_bound = float("inf")
+        self._restart_beam(node.gval + node.hval)
+
+    def _restart_beam(self, limit):
+        '''Start the layers over from the initial node with f-limit limit,
+           as IDA* does: when no solution is found within a limit, the next
+           one is the lowest f-value it left out.'''
+        node = self.beam_root
+        self.beam_limit = limit
+        self.beam_next_limit = float("inf") #lowest f-value above beam_limit seen
+        self.beam_layers = [[node]]
+        self.beam_stack = [[0, float("inf")]]
+        self.beam_position = 0 #next node of the deepest layer to expand
+        self.beam_next = {} #successors collected for the next layer
+        #states in the layers kept: closed key -> (layer, gval)
+        self.beam_closed = {self._closed_key(node.state): (0, node.gval)}
+
+    def _beam_rank(self, node):
+        '''Beam search keeps the nodes of lowest h, beam stack search
+           those of lowest f = g + h; ties go to the deeper node.'''
+        if self.strategy == _BEAM:
+            return (node.hval, -node.gval)
+        return (node.gval + node.hval, -node.gval)
+
+    def _searchBeam(self, goal_fn, heur_fn, costbound):
+        """
+        Beam and beam stack search (Zhou and Hansen, 2005), starting from
+        the layers left by init_search or by the last call.
+
+        @param goal_fn: the goal function.
+        @param heur_fn: the heuristic function.
+        @param costbound: the cost bound 3-tuple, as described in the assignment.
+        """
+        incremental = isinstance(heur_fn, IncrementalHeuristic)
+        stack_search = self.strategy == _BEAM_STACK
+        while True:
+            depth = len(self.beam_layers) - 1
+            layer = self.beam_layers[depth]
+            fmin, fmax = self.beam_stack[depth]
+            while self.beam_position < len(layer):
+                node = layer[self.beam_position]
+                if self.search_stop_time and search_clock() > self.search_stop_time:
+                    #exceeded time bound, the next call goes on from this node
+                    print("TRACE: Search has exceeeded the time bound provided")
+                    return False
+                self.beam_position += 1
+                if stack_search and node.gval + node.hval >= self.beam_bound:
+                    continue
+
+                if goal_fn(node.state):
+                    if stack_search:
+                        #only cheaper solutions are looked for from now on
+                        self.beam_bound = node.gval
+                        self.beam_limit = float("inf")
+                    return node
+
+                successors = node.state.successors()
+                self.states_generated = self.states_generated + len(successors)
+                for succ in successors:
+                    key = self._closed_key(succ)
+                    if (self.cycle_check == _CC_FULL and key in self.beam_closed and
+                        self.beam_closed[key][1] <= succ.gval) or (
+                        self.cycle_check == _CC_PATH and succ.has_path_cycle()):
+                        self.cycle_check_pruned = self.cycle_check_pruned + 1
+                        continue
+                    if key in self.beam_next and self.beam_next[key].gval <= succ.gval:
+                        self.cycle_check_pruned = self.cycle_check_pruned + 1
+                        continue
+
+                    if incremental:
+                        succ_hval, succ_hdata = heur_fn.update(node.hdata, succ)
+                    else:
+                        succ_hval, succ_hdata = heur_fn(succ), None
+                    succ_fval = succ.gval + succ_hval
+                    if costbound is not None and (succ.gval > costbound[0] or
+                                                  succ_hval > costbound[1] or
+                                                  succ_fval > costbound[2]) :
+                        self.cost_bound_pruned = self.cost_bound_pruned + 1
+                        continue
+                    if stack_search and succ_fval > self.beam_limit:
+                        self.beam_next_limit = min(self.beam_next_limit, succ_fval)
+                        continue
+                    if stack_search and not (fmin <= succ_fval < fmax and succ_fval < self.beam_bound):
+                        #outside the range of this visit of the layer
+                        continue
+
+                    succ_node = self._new_node(succ, succ_hval, node.fval_function)
+                    succ_node.hdata = succ_hdata
+                    self.beam_next[key] = succ_node
+
+            #the layer is expanded, keep the best beam_width successors
+            candidates = sorted(self.beam_next.values(), key=self._beam_rank)
+            self.beam_next = {}
+            if len(candidates) > self.beam_width:
+                self.beam_pruned = self.beam_pruned + len(candidates) - self.beam_width
+                if stack_search:
+                    #cut at an f boundary: the nodes tied with the last one
+                    #that fits are kept too, so the layer is never empty, and
+                    #a later visit of this layer picks up the nodes left out
+                    fcut = candidates[self.beam_width - 1].gval + candidates[self.beam_width - 1].hval
+                    kept = self.beam_width
+                    while kept < len(candidates) and candidates[kept].gval + candidates[kept].hval <= fcut:
+                        kept += 1
+                    if kept < len(candidates):
+                        self.beam_stack[depth][1] = candidates[kept].gval + candidates[kept].hval
+                    self.beam_pruned = self.beam_pruned - (kept - self.beam_width)
+                    candidates = candidates[:kept]
+                else:
+                    candidates = candidates[:self.beam_width]
+
+            if candidates:
+                for c in candidates:
+                    self.beam_closed[self._closed_key(c.state)] = (depth + 1, c.gval)
+                self.beam_layers.append(candidates)
+                self.beam_stack.append([0, self.beam_bound])
+                self.beam_position = 0
+                continue
+
+            if not stack_search:
+                #the beam ran dry
+                return False
+
+            #backtrack to the deepest layer that left nodes out below the bound
+            while self.beam_stack and self.beam_stack[-1][1] >= self.beam_bound:
+                self.beam_stack.pop()
+                for c in self.beam_layers.pop():
+                    key = self._closed_key(c.state)
+                    if self.beam_closed.get(key, (None,))[0] == len(self.beam_layers):
+                        del self.beam_closed[key]
+            if not self.beam_stack and self.beam_bound == float("inf") and self.beam_next_limit < float("inf"):
+                #no solution within the f-limit, try again with the next one
+                self._restart_beam(self.beam_next_limit)
+                continue
+            if not self.beam_stack:
+                #every range is done, the last solution returned is optimal
+                self.beam_layers = [[]]
+                self.beam_stack = [[float("inf"), float("inf")]]
+                self.beam_position = 0
+                return False
+            self.beam_stack[-1][0] = self.beam_stack[-1][1]
+            self.beam_stack[-1][1] = self.beam_bound
+            self.beam_position = 0
+
+    def _init_external(self, initState):
+        '''Set up the files of an external memory search: layer 0 and the
+           closed set both hold just the initial state.'''
+        if self.external_directory is None:
+            self.external_path = tempfile.mkdtemp(prefix='search_')
+        else:
+            self.external_path = self.external_directory
+            os.makedirs(self.external_path, exist_ok=True)
+        self.external_state = initState
+        self.external_nbytes = (initState.packed_bits() + 7) // 8
+        self.external_depth = 0
+        self.external_runs = 0
+        _write_keys(self._layer_file(0), [initState.packed_state()], self.external_nbytes)
+        shutil.copyfile(self._layer_file(0), self._closed_file(0))
+
+    def _layer_file(self, depth):
+        return os.path.join(self.external_path, 'layer_{}.bin'.format(depth))
+
+    def _closed_file(self, depth):
+        return os.path.join(self.external_path, 'closed_{}.bin'.format(depth))
+
+    def _write_run(self, keys):
+        '''Sort a buffer of successor keys and write it as a run file'''
+        path = os.path.join(self.external_path, 'run_{}.bin'.format(self.external_runs))
+        self.external_runs += 1
+        _write_keys(path, _unique(sorted(keys)), self.external_nbytes)
+        return path
+
+    def _searchExternal(self, goal_fn, heur_fn, costbound):
+        """
+        Layered breadth first search with delayed duplicate detection.
+        Layer d is expanded into sorted runs of successor keys, the runs are
+        merged and whatever is already in the closed set (all layers up to
+        d) is dropped; the rest is layer d + 1.
+
+        @param goal_fn: the goal function.
+        @param heur_fn: the heuristic function (only used for the cost bound).
+        @param costbound: the cost bound 3-tuple, as described in the assignment.
+        """
+        template = self.external_state
+        nbytes = self.external_nbytes
+        while True:
+            depth = self.external_depth
+            runs = []
+            buffer = []
+            for key in _read_keys(self._layer_file(depth), nbytes):
+                state = template.unpacked_state(key, "START", depth, None)
+                self.nodes_generated = self.nodes_generated + 1
+
+                if goal_fn(state):
+                    return self._new_node(self._external_path_to(state, depth), 0, self.fval_function)
+
+                if self.search_stop_time: #timebound check
+                    if search_clock() > self.search_stop_time:
+                        print("TRACE: Search has exceeeded the time bound provided")
+                        for run in runs:
+                            os.remove(run)
+                        return False
+
+                successors = state.successors()
+                self.states_generated = self.states_generated + len(successors)
+                for succ in successors:
+                    if costbound is not None:
+                        succ_hval = heur_fn(succ)
+                        if (succ.gval > costbound[0] or succ_hval > costbound[1] or
+                                succ.gval + succ_hval > costbound[2]):
+                            self.cost_bound_pruned = self.cost_bound_pruned + 1
+                            continue
+                    buffer.append(succ.packed_state())
+                    if len(buffer) >= self.external_run_size:
+                        runs.append(self._write_run(buffer))
+                        buffer = []
+            if buffer:
+                runs.append(self._write_run(buffer))
+
+            #merge the runs, remove states already closed, and extend the closed set
+            generated = _unique(heapq.merge(*[_read_keys(run, nbytes) for run in runs]))
+            fresh = _subtract(generated, _read_keys(self._closed_file(depth), nbytes))
+            count = _write_keys(self._layer_file(depth + 1), fresh, nbytes)
+            for run in runs:
+                os.remove(run)
+            _write_keys(self._closed_file(depth + 1),
+                        heapq.merge(_read_keys(self._closed_file(depth), nbytes),
+                                    _read_keys(self._layer_file(depth + 1), nbytes)), nbytes)
+            os.remove(self._closed_file(depth))
+            self.external_depth = depth + 1
+
+            #BEGIN TRACING
+            if self.trace:
+                print("   TRACE: Layer {} holds {} new states".format(depth + 1, count))
+            #END TRACING
+
+            if count == 0:
+                return False
+
+    def _external_path_to(self, goal, depth):
+        '''Rebuild the path to a goal found at the given depth. Walking back,
+           the parent of each state is found by scanning the previous layer
+           file; the path is then replayed forward from the initial state so
+           that every state on it has its action and parent set.'''
+        template = self.external_state
+        keys = [goal.packed_state()]
+        for layer in range(depth - 1, -1, -1):
+            for key in _read_keys(self._layer_file(layer), self.external_nbytes):
+                state = template.unpacked_state(key, "START", layer, None)
+                if any(succ.packed_state() == keys[-1] for succ in state.successors()):
+                    keys.append(key)
+                    break
+        keys.pop() #the initial state
+        state = template
+        while keys:
+            key = keys.pop()
+            for succ in state.successors():
+                if succ.packed_state() == key:
+                    state = succ
+                    break
+        return state
+
+
+class SearchConfig:
+    '''The settings of one search run by solve_many: the strategy and
+       cycle check level of the SearchEngine, the functions passed to
+       init_search and the bounds passed to search. When problems are
+       solved in worker processes the functions must be picklable, i.e.,
+       defined at module level rather than lambdas.'''
+
+    def __init__(self, goal_fn, strategy = 'astar', cc_level = 'default', heur_fn = _zero_hfn,
+                 fval_function = _fval_function, timebound = None, costbound = None):
+        self.goal_fn = goal_fn
+        self.strategy = strategy
+        self.cc_level = cc_level
+        self.heur_fn = heur_fn
+        self.fval_function = fval_function
+        self.timebound = timebound
+        self.costbound = costbound
+
+def _detach_path(state):
+    '''Copies of the states on the path to state, root first, with their
+       parent pointers cut. Pickling a long parent chain directly recurses
+       once per state.'''
+    path = []
+    while state:
+        detached = copy.copy(state)
+        detached.parent = None
+        path.append(detached)
+        state = state.parent
+    path.reverse()
+    return path
+
+def _flatten_states(states):
+    '''Number every state on the paths to states, parents before their
+       children. Returns the list of states and a dictionary from the id
+       of each state to its number.'''
+    table = []
+    number = {}
+    for state in states:
+        chain = []
+        while state and id(state) not in number:
+            chain.append(state)
+            state = state.parent
+        for state in reversed(chain):
+            number[id(state)] = len(table)
+            table.append(state)
+    return table, number
+
+def _attach_path(path):
+    '''Inverse of _detach_path, returns the last state of the path'''
+    for parent, state in zip(path, path[1:]):
+        state.parent = parent
+    return path[-1]
+
+def _solve_one(index, problem, config):
+    '''Run one search with a SearchEngine of its own'''
+    se = SearchEngine(config.strategy, config.cc_level)
+    se.init_search(problem, config.goal_fn, config.heur_fn, config.fval_function)
+    start_time = search_clock()
+    final = se.search(config.timebound, config.costbound)
+    stats = se.get_stats()
+    stats['search_time'] = search_clock() - start_time
+    return index, _detach_path(final) if final else False, stats
+
+def solve_many(problems, config, workers = None, processes = True):
+    '''Solve each of the initial states in problems with the settings in
+       config (a SearchConfig), using a pool of workers processes (or
+       threads if processes is False; threads only overlap while the GIL
+       is released). This is a generator that yields a tuple
+       (index of the problem, goal state or False, stats dictionary) as
+       each search finishes, so results arrive out of order.'''
+    pool_class = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with pool_class(max_workers=workers) as pool:
+        futures = [pool.submit(_solve_one, index, problem, config) for index, problem in enumerate(problems)]
+        for future in as_completed(futures):
+            index, path, stats = future.result()
+            yield index, _attach_path(path) if path else False, stats
@@ -17,7 +17,7 @@ class SnowmanState(StateSpace):
     
     # a StateSpace with additional key attributes
 
-    def __init__(self, action, gval, parent, width, height, robot, snowballs, obstacles, destination):
+    def __init__(self, action, gval, parent, width, height, robot, snowballs, obstacles, destination, destinations=None, num_snowmen=None, delta=None):
         
         #width: the width of the Snowman Puzzle board
         #height: the height of the Snowman Puzzle board
@@ -29,8 +29,16 @@ class SnowmanState(StateSpace):
         
         #destination: the target destination for the snowperson: a tuple (x, y), that denotes the desired position for the completed snowperson.
         
+        #destinations: optional tuple of (x, y) destinations for boards with several snowmen. Defaults to (destination,). A goal is reached once every snowman is complete and standing on a distinct destination.
+        
+        #num_snowmen: optional number of snowmen on the board. If omitted it is derived from the snowball codes (see below).
+        
+        #delta: the change made by the move from parent to this state, used by incremental heuristics. A tuple (robot position in parent, changes) where changes is a tuple of (position, code in parent, code in this state) for the snowball positions that changed; a code is None where there is no snowball. None for the initial state.
+        
         #sizes: contains the key, value pairs that indicate snowball sizes or the presence of a snowball stack. The possible values are: ’b’ for a big snowball, ’m’ for a medium snowball, and ’s’ for a small one. A ’G’ denotes a completed snowperson. In addition, note that there are values to indicate stacks of snowballs on the board: ’A’ represents a medium snowball atop big one, ’B’ represents a small snowball atop big one and ’C’ represents a small snowball atop medium one. See Figure 2 for snowballs as they are represented by the ASCII visualizer you have been provided.
         
+        #stack codes are per snowman: the snowballs of snowman k use the codes 7*k + 0 ... 7*k + 6, so a board with a single snowman uses the codes 0 to 6 listed above. Snowballs that belong to different snowmen can never be stacked on top of each other.
+        
         
 
 
@@ -41,6 +49,13 @@ class SnowmanState(StateSpace):
         self.destination = destination        
         self.snowballs = snowballs
         self.obstacles = obstacles
+        if destinations is None:
+            destinations = (destination,)
+        self.destinations = destinations
+        if num_snowmen is None:
+            num_snowmen = snowman_count(snowballs)
+        self.num_snowmen = num_snowmen
+        self.delta = delta
         
         #snowball sizes: 'b' is 'big', 'm' is 'medium' and 's' is small.  
         #A type 'G' snowman is a complete snowman.
@@ -54,7 +69,12 @@ class SnowmanState(StateSpace):
         
         #This function generates a list of SnowmanStates that are successors to a given SnowmanState. Each state will be annotated by the action that was used to arrive at the SnowmanState up, down, left, right.
         
-        successors = []
+        return list(self.iter_successors())
+
+    def iter_successors(self):
+
+        #Generator version of successors: each successor is built only when it is asked for.
+
         transition_cost = 1
 
         for direction in (UP, RIGHT, DOWN, LEFT):
@@ -70,7 +90,8 @@ class SnowmanState(StateSpace):
                 continue
             
             new_snowballs = dict(self.snowballs)
-            index = 0
+            split = False
+            changes = ()
 
             if new_location in self.snowballs: #if the location we're going to is where there's a snowball
                 new_snowball_location = direction.move(new_location) #move the snowball
@@ -82,56 +103,63 @@ class SnowmanState(StateSpace):
                     continue
                 if new_snowball_location in self.obstacles:
                     continue        
-                if self.snowball_sizes[new_snowballs[new_location]] == 'G': #can't move a complete Snowman       
+
+                code = new_snowballs[new_location]
+                owner = code - code % 7 #first code of the snowman this snowball belongs to
+                size = self.snowball_sizes[code % 7]
+                if size == 'G': #can't move a complete Snowman       
                     continue  
 
+                index = code % 7
+
                 #cases where bigger snowball is pushed atop smaller one(s)        
                 if new_snowball_location in new_snowballs: #if the new snowball location is where there's a snowball
-                    if self.snowball_sizes[new_snowballs[new_snowball_location]] == 'b' and self.snowball_sizes[new_snowballs[new_location]] == 'm':
+                    target_code = new_snowballs[new_snowball_location]
+                    if target_code - target_code % 7 != owner: #snowballs of different snowmen never stack
+                        continue
+                    target_size = self.snowball_sizes[target_code % 7]
+                    if target_size == 'b' and size == 'm':
                         index = 3 #will transition to A formation of snowballs
-                    elif self.snowball_sizes[new_snowballs[new_snowball_location]] == 'm' and self.snowball_sizes[new_snowballs[new_location]] == 's':
+                    elif target_size == 'm' and size == 's':
                         index = 4 #will transition to B formation of snowballs
-                    elif self.snowball_sizes[new_snowballs[new_snowball_location]] == 'b' and self.snowball_sizes[new_snowballs[new_location]] == 's':
+                    elif target_size == 'b' and size == 's':
                         index = 5  #will transition to C formation of snowballs 
-                    elif self.snowball_sizes[new_snowballs[new_snowball_location]] == 'A' and self.snowball_sizes[new_snowballs[new_location]] == 's':
+                    elif target_size == 'A' and size == 's':
                         index = 6  #will transition to Goal formation of snowballs               
                     else:
                         continue
 
                 #cases where a stack of snowballs is pushed apart                             
-                if self.snowball_sizes[new_snowballs[new_location]] == 'A':
-                    new_snowballs[new_location] = 0 #b
-                    new_snowballs[new_snowball_location] = 1 #m  
-                    index = 7;                 
-                if self.snowball_sizes[new_snowballs[new_location]] == 'B':
-                    new_snowballs[new_location] = 1 #m
-                    new_snowballs[new_snowball_location] = 2 #s     
-                    index = 7;   
-                if self.snowball_sizes[new_snowballs[new_location]] == 'C':
-                    new_snowballs[new_location] = 0 #b
-                    new_snowballs[new_snowball_location] = 2 #s 
-                    index = 7;               
-
-                if index == 0: #case robot has pushed one snowball
-                    index = new_snowballs.pop(new_location)
-                elif index != 7: #case robot has pushed snowballs stack apart          
+                if size == 'A':
+                    new_snowballs[new_location] = owner + 0 #b
+                    new_snowballs[new_snowball_location] = owner + 1 #m  
+                    split = True
+                elif size == 'B':
+                    new_snowballs[new_location] = owner + 1 #m
+                    new_snowballs[new_snowball_location] = owner + 2 #s     
+                    split = True
+                elif size == 'C':
+                    new_snowballs[new_location] = owner + 0 #b
+                    new_snowballs[new_snowball_location] = owner + 2 #s 
+                    split = True
+                else: #case robot has pushed one snowball, possibly atop others
                     new_snowballs.pop(new_location)
-                    new_snowballs.pop(new_snowball_location)
-                
-                if index < 7: #case robot has pushed two snowballs together
-                    new_snowballs[new_snowball_location] = index
+                    new_snowballs[new_snowball_location] = owner + index
+
+                changes = ((new_location, code, new_snowballs.get(new_location)),
+                           (new_snowball_location, self.snowballs.get(new_snowball_location), new_snowballs[new_snowball_location]))
             
-            if index == 7: #if robot pushed snowball stack apart, no movement of robot results
+            if split: #if robot pushed snowball stack apart, no movement of robot results
                 new_robot = self.robot
             else:
                 new_robot = tuple(new_location)
 
             new_state = SnowmanState(action=direction.name, gval=self.gval + transition_cost, parent=self,
                                      width=self.width, height=self.height, robot=new_robot,
-                                     snowballs=new_snowballs, obstacles=self.obstacles, destination=self.destination)
-            successors.append(new_state)
-
-        return successors
+                                     snowballs=new_snowballs, obstacles=self.obstacles, destination=self.destination,
+                                     destinations=self.destinations, num_snowmen=self.num_snowmen,
+                                     delta=(self.robot, changes))
+            yield new_state
 
     def hashable_state(self):
         
@@ -140,6 +168,53 @@ class SnowmanState(StateSpace):
 
         return hash((self.robot, frozenset(self.snowballs.items())))
 
+    def _packing(self):
+        #bits per board cell index and per snowball code. The largest cell value is kept free to pad out empty slots.
+        cell_bits = (self.width * self.height).bit_length()
+        code_bits = max(1, (7 * self.num_snowmen - 1).bit_length())
+        return cell_bits, code_bits
+
+    def packed_bits(self):
+
+        #Every state of a board packs the robot cell and one (cell, code) slot per snowball, i.e. 3 slots per snowman.
+
+        cell_bits, code_bits = self._packing()
+        return cell_bits + 3 * self.num_snowmen * (cell_bits + code_bits)
+
+    def packed_state(self):
+
+        #This is a function that encodes a SnowmanState exactly as an integer: the robot cell, followed by the snowballs in order of their cell and then padding slots.
+
+        cell_bits, code_bits = self._packing()
+        key = self.robot[1] * self.width + self.robot[0]
+        slots = 0
+        for (x, y), code in sorted(self.snowballs.items(), key=lambda item: (item[0][1], item[0][0])):
+            key = (((key << cell_bits) | (y * self.width + x)) << code_bits) | code
+            slots += 1
+        padding = (1 << cell_bits) - 1
+        for _ in range(slots, 3 * self.num_snowmen):
+            key = ((key << cell_bits) | padding) << code_bits
+        return key
+
+    def unpacked_state(self, key, action, gval, parent):
+
+        #This is the inverse of packed_state; the board (size, obstacles, destinations) is taken from self.
+
+        cell_bits, code_bits = self._packing()
+        padding = (1 << cell_bits) - 1
+        snowballs = {}
+        for _ in range(3 * self.num_snowmen):
+            code = key & ((1 << code_bits) - 1)
+            key >>= code_bits
+            cell = key & padding
+            key >>= cell_bits
+            if cell != padding:
+                snowballs[(cell % self.width, cell // self.width)] = code
+        robot = (key % self.width, key // self.width)
+        return SnowmanState(action=action, gval=gval, parent=parent, width=self.width, height=self.height,
+                            robot=robot, snowballs=snowballs, obstacles=self.obstacles, destination=self.destination,
+                            destinations=self.destinations, num_snowmen=self.num_snowmen)
+
 
     def state_string(self):
         """
@@ -156,16 +231,18 @@ class SnowmanState(StateSpace):
         if self.robot in self.obstacles:
             print("error: robot is in list of obstacles")
 
-        if self.destination in self.obstacles:
-            print("error: destination for snowman is in list of obstacles")
+        for destination in self.destinations:
+            if destination in self.obstacles:
+                print("error: destination for snowman is in list of obstacles")
 
         for obstacle in self.obstacles:
             map[obstacle[1]][obstacle[0]] = '#'
 
-        map[self.destination[1]][self.destination[0]] = 'X'
+        for destination in self.destinations:
+            map[destination[1]][destination[0]] = 'X'
 
         for snowball in self.snowballs:
-            map[snowball[1]][snowball[0]] = self.snowball_sizes[self.snowballs[snowball]]
+            map[snowball[1]][snowball[0]] = self.snowball_sizes[self.snowballs[snowball] % 7]
             if snowball in self.obstacles:
                 print("error: snowball is in list of obstacles")
 
@@ -197,6 +274,14 @@ def removekey(d, key):
     del r[key]
     return r
 
+def snowman_count(snowballs):
+    """
+    Returns the number of snowmen encoded in a snowballs dictionary (see the per snowman stack codes in SnowmanState).
+    """
+    if not snowballs:
+        return 0
+    return max(snowballs.values()) // 7 + 1
+
 def snowman_goal_state(state):
   """
   Returns True if we have reached a goal state.
@@ -204,10 +289,11 @@ def snowman_goal_state(state):
   @param state: a Snowball state
   OUTPUT: True (if goal) or False (if not)
   """
+  completed = 0
   for snowball in state.snowballs:
-    if(state.snowball_sizes[state.snowballs[snowball]] == 'G' and snowball[1] == state.destination[1] and snowball[0] == state.destination[0]): #means a complete snowman is on the board and in the right spot
-        return True
-  return False 
+    if state.snowballs[snowball] % 7 == 6 and snowball in state.destinations: #means a complete snowman is on the board and in the right spot
+        completed += 1
+  return completed == state.num_snowmen
 
 def generate_coordinate_rect(x_start, x_finish, y_start, y_finish):
     """
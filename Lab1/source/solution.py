@@ -8,8 +8,6 @@
 
 import os
 
-from numpy.ma.bench import timer
-
 from search import *  # for search engines
 from snowman import SnowmanState, Direction, snowman_goal_state  # for snowball specific classes
 from test_problems import PROBLEMS  # 20 test problems
@@ -53,28 +51,32 @@ def heur_alternate(state):
     # Write a heuristic function that improves upon heur_manhattan_distance to estimate distance between the current state and the goal.
     # Your function should return a numeric value for the estimate of the distance to the goal.
 
+    # find each snowball by its size
+    positions = [None] * 7
+    for snowball in state.snowballs:
+        if state.snowballs[snowball] < 7:
+            positions[state.snowballs[snowball]] = snowball
+
+    return alternate_from_positions(positions, state.robot, state.destination, heur_manhattan_distance(state))
+
+
+def alternate_from_positions(positions, robot_position, dest, manhattan_distance):
+    '''heur_alternate computed from the position of the snowballs of each size'''
+    '''INPUT: the position of each snowball code 0-6 (None if absent), the robot, the destination and heur_manhattan_distance'''
+    '''OUTPUT: the value of heur_alternate for that state'''
     final_heur = 0
-    robot_position = state.robot
-    dest = state.destination
     new_snowballs_dic = {}
-    b_snowball = (0, 0)
-    m_snowball = (0, 0)
-    s_snowball = (0, 0)
+    b_snowball = positions[0] or (0, 0)
+    m_snowball = positions[1] or (0, 0)
+    s_snowball = positions[2] or (0, 0)
 
-    # find each snowball by its size
-    for snowball in state.snowballs:
-        if state.snowballs[snowball] == 0:
-            b_snowball = snowball
-        if state.snowballs[snowball] == 1:
-            m_snowball = snowball
-        if state.snowballs[snowball] == 2:
-            s_snowball = snowball
-        if state.snowballs[snowball] == 3 and (snowball[0] != dest[0] or snowball[1] != dest[1]):
-            return float("inf")
-        if state.snowballs[snowball] == 4 and (snowball[0] != dest[0] or snowball[1] != dest[1]):
-            return float("inf")
-        if state.snowballs[snowball] == 5:
-            return float("inf")
+    # stacks that are not in the destination can't become a snowman
+    if positions[3] is not None and (positions[3][0] != dest[0] or positions[3][1] != dest[1]):
+        return float("inf")
+    if positions[4] is not None and (positions[4][0] != dest[0] or positions[4][1] != dest[1]):
+        return float("inf")
+    if positions[5] is not None:
+        return float("inf")
 
     # find snowballs that are already in destination
     if (b_snowball[0] != dest[0] or b_snowball[1] != dest[1]) and (b_snowball[0] != 0 or b_snowball[1] != 0):
@@ -98,11 +100,172 @@ def heur_alternate(state):
     snowball = new_snowballs_dic.get(snowball_id)
     # calculate the manhattan distance between the initial robot position and the snowball position
     final_heur += abs(snowball[0] - robot_position[0]) + abs(snowball[1] - robot_position[1])
-    final_heur += heur_manhattan_distance(state)
+    final_heur += manhattan_distance
 
     return final_heur
 
 
+class IncrementalManhattan(IncrementalHeuristic):
+    '''heur_manhattan_distance, updated from the parent's value using the move delta of the state'''
+
+    def evaluate(self, state):
+        manhattan_distance = heur_manhattan_distance(state)
+        return manhattan_distance, manhattan_distance
+
+    def update(self, data, state):
+        # a move changes at most two snowball positions: take out the old ones and add the new ones
+        manhattan_distance = data
+        dest = state.destination
+        for position, old_code, new_code in state.delta[1]:
+            distance = abs(position[0] - dest[0]) + abs(position[1] - dest[1])
+            if old_code is not None:
+                manhattan_distance -= distance
+            if new_code is not None:
+                manhattan_distance += distance
+        return manhattan_distance, manhattan_distance
+
+
+class IncrementalAlternate(IncrementalHeuristic):
+    '''heur_alternate, updated from the parent's snowball positions and Manhattan distance'''
+
+    def evaluate(self, state):
+        positions = [None] * 7
+        for snowball in state.snowballs:
+            if state.snowballs[snowball] < 7:
+                positions[state.snowballs[snowball]] = snowball
+        manhattan_distance = heur_manhattan_distance(state)
+        hval = alternate_from_positions(positions, state.robot, state.destination, manhattan_distance)
+        return hval, (tuple(positions), manhattan_distance)
+
+    def update(self, data, state):
+        positions, manhattan_distance = data
+        dest = state.destination
+        changes = state.delta[1]
+        if changes:
+            positions = list(positions)
+            for position, old_code, new_code in changes:
+                distance = abs(position[0] - dest[0]) + abs(position[1] - dest[1])
+                if old_code is not None:
+                    manhattan_distance -= distance
+                    if old_code < 7 and positions[old_code] == position:
+                        positions[old_code] = None
+                if new_code is not None:
+                    manhattan_distance += distance
+                    if new_code < 7:
+                        positions[new_code] = position
+            positions = tuple(positions)
+        hval = alternate_from_positions(positions, state.robot, dest, manhattan_distance)
+        return hval, (positions, manhattan_distance)
+
+
+# incremental versions of the heuristics above; they can be passed to a search engine like any heuristic function
+heur_manhattan_incremental = IncrementalManhattan()
+heur_alternate_incremental = IncrementalAlternate()
+
+
+def hungarian_assignment(cost):
+    '''Minimum cost assignment of rows to distinct columns (Hungarian algorithm)'''
+    '''INPUT: a cost matrix given as a list of n rows of m numbers, with n <= m'''
+    '''OUTPUT: a tuple (total cost, column assigned to each row)'''
+    # Shortest augmenting path version of the Hungarian algorithm with row and column potentials, O(n^2 * m).
+    # Index 0 is a dummy row/column, so real rows and columns are 1-based inside the loops.
+    n = len(cost)
+    if n == 0:
+        return 0, []
+    m = len(cost[0])
+    row_potential = [0] * (n + 1)
+    col_potential = [0] * (m + 1)
+    col_match = [0] * (m + 1)  # row matched to each column, 0 if free
+    way = [0] * (m + 1)
+    for row in range(1, n + 1):
+        col_match[0] = row
+        free_col = 0
+        min_slack = [float("inf")] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[free_col] = True
+            current_row = col_match[free_col]
+            delta = float("inf")
+            next_col = 0
+            for col in range(1, m + 1):
+                if not used[col]:
+                    slack = cost[current_row - 1][col - 1] - row_potential[current_row] - col_potential[col]
+                    if slack < min_slack[col]:
+                        min_slack[col] = slack
+                        way[col] = free_col
+                    if min_slack[col] < delta:
+                        delta = min_slack[col]
+                        next_col = col
+            for col in range(m + 1):
+                if used[col]:
+                    row_potential[col_match[col]] += delta
+                    col_potential[col] -= delta
+                else:
+                    min_slack[col] -= delta
+            free_col = next_col
+            if col_match[free_col] == 0:
+                break
+        # flip the augmenting path
+        while free_col:
+            prev_col = way[free_col]
+            col_match[free_col] = col_match[prev_col]
+            free_col = prev_col
+
+    assignment = [0] * n
+    for col in range(1, m + 1):
+        if col_match[col]:
+            assignment[col_match[col] - 1] = col - 1
+    total = sum(cost[row][assignment[row]] for row in range(n))
+    return total, assignment
+
+
+# number of snowballs stacked at a position, indexed by size code (b, m, s, A, B, C, G)
+SNOWBALL_COUNTS = (1, 1, 1, 2, 2, 2, 3)
+
+
+def heur_multi_snowman(state):
+    '''admissible heuristic for boards with several snowmen and several destinations'''
+    '''INPUT: a snowman state'''
+    '''OUTPUT: a numeric value that serves as an estimate of the distance of the state to the goal.'''
+    # Each move pushes at most one snowball by one square, and all snowballs of a snowman must end up on the same
+    # destination. So the cost of the cheapest matching of snowmen to distinct destinations, where a snowman costs
+    # the summed Manhattan distance of its snowballs to the destination, is a lower bound.
+    # Before the first push the robot also has to walk next to a snowball that still has to move.
+    # A complete snowman can't be moved, so it either keeps its destination or the state is a dead end.
+
+    destinations = list(state.destinations)
+    balls = [[] for _ in range(state.num_snowmen)]  # (position, count) of the snowballs of each snowman
+    finished = set()
+    for snowball, code in state.snowballs.items():
+        owner = code // 7
+        if code % 7 == 6:
+            if snowball not in destinations:
+                return float("inf")
+            finished.add(owner)
+            destinations.remove(snowball)
+        else:
+            balls[owner].append((snowball, SNOWBALL_COUNTS[code % 7]))
+
+    cost = []
+    for owner in range(state.num_snowmen):
+        if owner in finished:
+            continue
+        cost.append([sum(count * (abs(snowball[0] - dest[0]) + abs(snowball[1] - dest[1]))
+                         for snowball, count in balls[owner]) for dest in destinations])
+    if not cost:
+        return 0
+    if len(cost) > len(destinations):
+        return float("inf")
+    matching, _ = hungarian_assignment(cost)
+
+    # the robot has to stand next to a snowball before it can push it
+    robot = state.robot
+    walk = min(abs(snowball[0] - robot[0]) + abs(snowball[1] - robot[1]) - 1
+               for owner in range(state.num_snowmen) for snowball, _ in balls[owner])
+
+    return matching + walk
+
+
 def heur_zero(state):
     '''Zero Heuristic can be used to make A* search perform uniform cost search'''
     return 0
@@ -129,12 +292,15 @@ def fval_function(sN, weight):
     return sN.gval + weight * sN.hval
 
 
-def anytime_weighted_astar(initial_state, heur_fn, weight=10., timebound=5):
+def anytime_weighted_astar(initial_state, heur_fn, weight=10., timebound=5, checkpoint=None):
     # IMPLEMENT
     '''Provides an implementation of anytime weighted a-star, as described in the HW1 handout'''
     '''INPUT: a sokoban state that represents the start state and a timebound (number of seconds)'''
     '''OUTPUT: A goal state (if a goal is found), else False'''
     '''implementation of weighted astar algorithm'''
+    '''If checkpoint names a file the search is saved to it when time runs out, and a later call
+       with the same file resumes that search with a fresh timebound instead of starting over.
+       Once the search is completed the file is removed.'''
 
     time_elapsed = 0
     best_fvalue = 0
@@ -142,26 +308,43 @@ def anytime_weighted_astar(initial_state, heur_fn, weight=10., timebound=5):
     # initialize the search engine with a custom strategy
     se = SearchEngine(strategy='custom', cc_level='full')
     wrapped_fval_function = (lambda sN: fval_function(sN, weight))
-    se.init_search(initState=initial_state, goal_fn=snowman_goal_state, heur_fn=heur_fn,
-                   fval_function=wrapped_fval_function)
     # initialize prune and costbound
     costbound = (float("inf"), float("inf"), float("inf"))
-
-    # first time search
-    start_time = os.times()[0]
-    goal_state = se.search(timebound=timebound, costbound=costbound)
-    # check if goal_state would return false for the first time search
-    best_state = goal_state
-    if goal_state:
-        # set up the best f value so far
-        best_fvalue = goal_state.gval + heur_fn(goal_state)
-    # add search time for the first time search
-    end_time = os.times()[0]
-    time_elapsed += (end_time - start_time)
+    resumed = False
+
+    if checkpoint and os.path.exists(checkpoint):
+        # resume the saved search, goal_state is the last result it had not yet looked at
+        (best_state, goal_state), (best_fvalue, costbound, weight, previous_weight) = se.load_checkpoint(
+            checkpoint, goal_fn=snowman_goal_state, heur_fn=heur_fn, fval_function=wrapped_fval_function)
+        resumed = True
+        if not goal_state:
+            # the saved search ran out of time, carry on with it
+            start_time = search_clock()
+            goal_state = se.search(timebound=timebound, costbound=costbound)
+            if goal_state and not best_state:
+                # first solution of the resumed search
+                best_state = goal_state
+                best_fvalue = goal_state.gval + heur_fn(goal_state)
+            end_time = search_clock()
+            time_elapsed += (end_time - start_time)
+    else:
+        # first time search
+        se.init_search(initState=initial_state, goal_fn=snowman_goal_state, heur_fn=heur_fn,
+                       fval_function=wrapped_fval_function)
+        start_time = search_clock()
+        goal_state = se.search(timebound=timebound, costbound=costbound)
+        # check if goal_state would return false for the first time search
+        best_state = goal_state
+        if goal_state:
+            # set up the best f value so far
+            best_fvalue = goal_state.gval + heur_fn(goal_state)
+        # add search time for the first time search
+        end_time = search_clock()
+        time_elapsed += (end_time - start_time)
 
     # search till the end
     while time_elapsed < timebound:
-        start_time = os.times()[0]
+        start_time = search_clock()
         time_remaining = timebound - time_elapsed
 
         if goal_state:
@@ -175,20 +358,21 @@ def anytime_weighted_astar(initial_state, heur_fn, weight=10., timebound=5):
                 best_state = goal_state
 
             # re-initialize search with updated weight only when weight is changed, no need to re-initialize when weight
-            # is not changed
-            if weight != previous_weight:
+            # is not changed, nor right after resuming a checkpoint as that would throw its OPEN away
+            if weight != previous_weight and not resumed:
                 wrapped_fval_function = (lambda sN: fval_function(sN, weight))
                 se.init_search(initState=initial_state, goal_fn=snowman_goal_state, heur_fn=heur_fn,
                                fval_function=wrapped_fval_function)
 
             goal_state = se.search(timebound=time_remaining, costbound=costbound)
+            resumed = False
 
         else:
             # return best_state when goal_state is false
-            return best_state
+            break
 
         # update the time elapsed
-        end_time = os.times()[0]
+        end_time = search_clock()
         search_time = end_time - start_time
         time_elapsed += search_time
         # update weight
@@ -197,6 +381,14 @@ def anytime_weighted_astar(initial_state, heur_fn, weight=10., timebound=5):
         if weight <= 1:
             weight = 1
 
+    if checkpoint:
+        if not se.open.empty():
+            # the timebound stopped the search, save it to be resumed
+            se.save_checkpoint(checkpoint, states=(best_state, goal_state),
+                               extra=(best_fvalue, costbound, weight, previous_weight))
+        elif os.path.exists(checkpoint):
+            # OPEN is exhausted, there is nothing left to resume
+            os.remove(checkpoint)
     return best_state
 
 
@@ -215,7 +407,7 @@ def anytime_gbfs(initial_state, heur_fn, timebound=5):
     costbound = (float("inf"), float("inf"), float("inf"))
 
     # first time search
-    start_time = os.times()[0]
+    start_time = search_clock()
     goal_state = se.search(timebound=timebound, costbound=costbound)
     # check if goal_state would return false for the first time search
     best_state = goal_state
@@ -223,12 +415,12 @@ def anytime_gbfs(initial_state, heur_fn, timebound=5):
         # set up the best cost value
         best_gvalue = goal_state.gval
     # add search time for the first time search
-    end_time = os.times()[0]
+    end_time = search_clock()
     time_elapsed += (end_time - start_time)
 
     # search till the end
     while time_elapsed < timebound:
-        start_time = os.times()[0]
+        start_time = search_clock()
         time_remaining = timebound - time_elapsed
 
         if goal_state:
@@ -245,7 +437,7 @@ def anytime_gbfs(initial_state, heur_fn, timebound=5):
             return best_state
 
         # update the time elapsed
-        end_time = os.times()[0]
+        end_time = search_clock()
         search_time = end_time - start_time
         time_elapsed += search_time
 
@@ -155,3 +155,37 @@ PROBLEMS = (
 
 
 
+
+def generate_multi_snowman_problem(n):
+    """
+    Generate an open board with n snowmen to build, one per three rows, and n + 1 destinations.
+    Snowman k uses the snowball codes 7*k + 0 ... 7*k + 6 (see SnowmanState).
+    """
+    width, height = 7, 3 * n + 1
+    snowballs = {}
+    destinations = []
+    for k in range(n):
+        row = 3 * k + 1
+        snowballs[(2, row)] = 7 * k + 0
+        snowballs[(4, row)] = 7 * k + 1
+        snowballs[(5, row)] = 7 * k + 2
+        destinations.append((1, row))
+    destinations.append((5, height - 1))
+    return SnowmanState("START", 0, None, width, height, (0, 0), snowballs, frozenset(), destinations[0], tuple(destinations))
+
+def generate_random_problem(rng):
+    """
+    Generate a random single snowman board using the random.Random rng: a 5x5 to 9x9 board
+    with scattered obstacles, the three snowballs off the edges and a free destination.
+    The board is not checked for being solvable.
+    """
+    width, height = rng.randint(5, 9), rng.randint(5, 9)
+    cells = [(x, y) for x in range(width) for y in range(height)]
+    inner = [(x, y) for x in range(1, width - 1) for y in range(1, height - 1)]
+    balls = rng.sample(inner, 3)
+    free = [cell for cell in cells if cell not in balls]
+    rng.shuffle(free)
+    robot, destination = free[0], free[1]
+    obstacles = frozenset(free[2:2 + rng.randint(0, len(free) // 8)])
+    return SnowmanState("START", 0, None, width, height, robot,
+                        {balls[0]: 0, balls[1]: 1, balls[2]: 2}, obstacles, destination)
@@ -14,21 +14,230 @@ The final heuristic is the sum of these three heuristic values.
 
 """
 
+import multiprocessing
+import os
 import random
 import sys
 import time
 
 # You can use the functions in othello_shared to write your AI
 from othello_shared import find_lines, get_possible_moves, get_score, play_move
+import othello_bitboard
+import othello_shared
+from move_ordering import MoveOrderer
+import othello_eval
+from othello_eval import Evaluator
+from transposition import EXACT, LOWER, UPPER, SALTS, TranspositionTable, zobrist
 
-# global dictionary to cache states
-minimax_min_dict = {}
-minimax_max_dict = {}
-alphabeta_min_dict = {}
-alphabeta_max_dict = {}
+# board representations the search can work on, see set_backend
+BACKENDS = ['tuple', 'bitboard', 'mutable']
+backend = 'tuple'
 
-def take_third(elem):
-    return elem[2]
+# number of nodes (minimax or alpha-beta calls) searched so far
+node_count = 0
+
+# perf_counter() time at which alpha-beta gives up with a SearchTimeout, None for no deadline
+deadline = None
+
+# seconds an AI gets for all its moves of a game when the depth limit is off
+GAME_TIME = 60
+
+# half width of the aspiration window of iterative deepening with PVS
+ASPIRATION = 4
+
+# transposition table shared by all the searches, used when caching is on
+transposition_table = TranspositionTable()
+
+# whether the leaves are cached too: a leaf of a tuple board costs a full move
+# generation, more than its table entry, a leaf of a BitBoard less (see set_backend)
+cache_leaves = True
+
+MIN_NODE, MAX_NODE = 0, 1
+
+# orders the moves of the alpha-beta searches when ordering is on, and keeps cutoff statistics
+move_orderer = MoveOrderer()
+
+# how alpha-beta evaluates the leaves below a node of depth 1, see set_leaf_evaluation
+LEAF_EVALUATIONS = ['scalar', 'batched']
+leaf_evaluation = 'scalar'
+
+# weighs the features of compute_heuristic, e.g., Evaluator({'stability': 5, 'frontier': -1})
+evaluator = Evaluator()
+
+# processes of the parallel alpha-beta search, read from the environment by run_ai
+WORKERS = int(os.environ.get('OTHELLO_WORKERS', 1))
+
+def copy_make_move(board, player, i, j):
+    """make_move of the immutable backends: the child is a new board and there is nothing to undo"""
+    return play_move(board, player, i, j), None
+
+def copy_unmake_move(board, undo):
+    pass
+
+# the search plays moves with next_board, undo = make_move(board, player, i, j)
+# and takes them back with unmake_move(board, undo) once the child is searched
+make_move = copy_make_move
+unmake_move = copy_unmake_move
+
+def set_backend(name):
+    """
+    Select the board representation the search works on: 'tuple' boards of
+    othello_shared, othello_bitboard's BitBoards, or a 'mutable' BitBoard
+    that moves are made on and unmade in place, with its disc counts and
+    Zobrist key kept up to date. select_move_minimax and
+    select_move_alphabeta convert the boards they are given; the node
+    functions must be given boards of the selected backend (see to_backend).
+    """
+    global backend, get_possible_moves, play_move, get_score, make_move, unmake_move, cache_leaves
+    if name not in BACKENDS:
+        print('Unknown backend specified:', name)
+        print("Must be one of 'tuple', 'bitboard' or 'mutable'")
+        return
+    backend = name
+    cache_leaves = name == 'tuple'
+    module = othello_shared if name == 'tuple' else othello_bitboard
+    get_possible_moves = module.get_possible_moves
+    play_move = module.play_move
+    get_score = module.get_score
+    make_move, unmake_move = copy_make_move, copy_unmake_move
+    if name == 'mutable':
+        get_score = othello_bitboard.get_counts
+        make_move, unmake_move = othello_bitboard.make_move, othello_bitboard.unmake_move
+
+def set_leaf_evaluation(name):
+    """
+    Select how alpha-beta evaluates leaves: one at a time with
+    compute_utility ('scalar'), or 'batched', where a node at depth 1 plays
+    all its moves, stacks the children into one array and scores them with
+    one NumPy call (see leaf_utilities). The values and moves are the same
+    either way; batched, the leaves after a cutoff are evaluated too.
+    """
+    global leaf_evaluation
+    if name not in LEAF_EVALUATIONS:
+        print('Unknown leaf evaluation specified:', name)
+        print("Must be one of 'scalar' or 'batched'")
+        return
+    if name == 'batched' and othello_eval.numpy is None:
+        print('Batched leaf evaluation needs NumPy')
+        return
+    leaf_evaluation = name
+
+def to_backend(board):
+    """
+    board in the representation of the selected backend; with 'mutable' it is
+    always a new board, so the search can play on it
+    """
+    if backend == 'tuple':
+        if isinstance(board, othello_bitboard.BitBoard):
+            return othello_bitboard.to_tuple(board)
+        return board
+    if not isinstance(board, othello_bitboard.BitBoard):
+        board = othello_bitboard.from_tuple(board)
+    if backend == 'mutable':
+        return othello_bitboard.MutableBitBoard(board.dimension, board.dark, board.light, zobrist(len(board)).board_numbers)
+    if isinstance(board, othello_bitboard.MutableBitBoard):
+        return othello_bitboard.BitBoard(board.dimension, board.dark, board.light)
+    return board
+
+def board_key(board):
+    """
+    Key of board in the transposition table: the Zobrist key of a BitBoard,
+    and the built-in hash of a tuple board, which Python computes faster than
+    the Zobrist key can be updated
+    """
+    if not isinstance(board, othello_bitboard.BitBoard):
+        return hash(board) & 0xFFFFFFFFFFFFFFFF
+    return zobrist(len(board)).key(board)
+
+def child_key(key, board, child):
+    """Key of child, found incrementally from the key of its parent board if it is a BitBoard"""
+    if not isinstance(child, othello_bitboard.BitBoard):
+        return hash(child) & 0xFFFFFFFFFFFFFFFF
+    return zobrist(len(board)).child_key(key, board, child)
+
+def cache_lookup(key, node, color, limit, alpha = float("-inf"), beta = float("inf")):
+    """
+    Look up the state with Zobrist key key searched as node (MIN_NODE or
+    MAX_NODE) for color. Returns (cached, hash move): cached is (best move,
+    utility) if the transposition table holds the state searched exactly
+    limit deep with a value that is usable in the window (alpha, beta),
+    otherwise None; hash move is the best move the table holds for the state,
+    if any, to be searched first. A deeper search would give a different
+    value than alpha-beta to limit, so caching could change the move chosen.
+    """
+    entry = transposition_table.probe(key ^ SALTS[2 * node + color - 1])
+    if entry is None:
+        return None, None
+    depth, flag, value, move = entry
+    if depth != (limit if limit >= 0 else 127):
+        return None, move
+    if flag == EXACT or (flag == LOWER and value >= beta) or (flag == UPPER and value <= alpha):
+        transposition_table.cutoffs += 1
+        return (move, value), move
+    return None, move
+
+def cache_store(key, node, color, limit, move, value, alpha = float("-inf"), beta = float("inf")):
+    """Store the result of a search in the window (alpha, beta) in the transposition table"""
+    if value <= alpha:
+        flag = UPPER
+    elif value >= beta:
+        flag = LOWER
+    else:
+        flag = EXACT
+    transposition_table.store(key ^ SALTS[2 * node + color - 1], limit if limit >= 0 else 127, flag, value, move)
+
+class SearchTimeout(Exception):
+    """Raised by alpha-beta when the deadline of the move has passed"""
+
+class TimeManager(object):
+    """
+    Budgets the time of the moves of a game for iterative deepening.
+
+    move_timeout is the time the game manager allows per move (see
+    othello_game.AiPlayerInterface.TIMEOUT) and margin the part of it kept
+    for reading the board and answering. If game_time is given, it is
+    spread over the moves the player has left in the game, about half the
+    empty squares; no move gets more than move_timeout - margin.
+    """
+
+    def __init__(self, move_timeout = 10, game_time = None, margin = 1.0):
+        self.move_timeout = move_timeout
+        self.game_time = game_time
+        self.margin = margin
+        self.used = 0.0
+        self.start = self.soft = self.hard = None
+        self.depth = 0 #depth of the last completed iteration of the move
+
+    def start_move(self, board):
+        """Set the deadlines of a move from board"""
+        dark, light = get_score(board)
+        moves_left = max(1, (len(board) * len(board) - dark - light + 1) // 2)
+        budget = self.move_timeout - self.margin
+        if self.game_time is not None:
+            budget = min(budget, max(0.0, self.game_time - self.used) / moves_left)
+        self.start = time.perf_counter()
+        self.hard = self.start + budget
+        # an iteration takes about as long as all the ones before it together,
+        # so a new one is not started past half the budget
+        self.soft = self.start + budget / 2
+
+    def should_deepen(self):
+        return time.perf_counter() < self.soft
+
+    def finish_move(self):
+        self.used += time.perf_counter() - self.start
+
+def order_moves(board, player, possible_moves, ordering, hash_move):
+    """
+    possible_moves of player in the order they are searched: by move_orderer
+    if ordering is on, else as generated; the hash move comes first either way
+    """
+    if ordering == 1:
+        return move_orderer.order(board, player, possible_moves, hash_move)
+    if hash_move in possible_moves:
+        possible_moves.remove(hash_move)
+        possible_moves.insert(0, hash_move)
+    return possible_moves
 
 def eprint(*args, **kwargs): #you can use this for debugging, as it will print to sterr and not stdout
     print(*args, file=sys.stderr, **kwargs)
@@ -47,42 +256,36 @@ def compute_utility(board, color):
     return utility_value
 
 
-# Better heuristic value of board
+def leaf_utilities(board, player, moves, color):
+    """compute_utility(child, color) of the children of board after each of the moves of player, in one batch"""
+    global node_count
+    node_count += len(moves)
+    children = []
+    for move in moves:
+        child, undo = make_move(board, player, move[0], move[1])
+        if isinstance(child, othello_bitboard.BitBoard):
+            child = othello_bitboard.BitBoard(child.dimension, child.dark, child.light) #a MutableBitBoard is unmade below
+        children.append(child)
+        unmake_move(board, undo)
+    return othello_eval.batch_features(othello_eval.stack(children), color, ['parity'])['parity'].tolist()
+
+# Better heuristic value of board: coin parity + mobility + 10 per corner with
+# the default weights of othello_eval (see evaluator)
 def compute_heuristic(board, color):
-
-    # ===============1. Coin Parity===============:
-    score = get_score(board)
-    num_of_black = score[0]
-    num_of_white = score[1]
-    if color == 1:
-        heuristic_1 = num_of_black - num_of_white
-    else:
-        heuristic_1 = num_of_white - num_of_black
-
-    # ===============2. Mobility===============:
-    heuristic_2 = len(get_possible_moves(board, color))
-
-    # ===============3. Corners===============:
-    count = 0
-    board_dimension = len(board) - 1
-    corners = [(0, 0), (0, board_dimension), (board_dimension, 0), (board_dimension, board_dimension)]
-    for corner in corners:
-        if board[corner[0]][corner[1]] == color:
-            count += 1
-    heuristic_3 = count * 10
-
-    # ===============4. Final heuristic===============:
-    final_heuristic = heuristic_1 + heuristic_2 + heuristic_3
-
-    return final_heuristic
+    return evaluator.evaluate(board, color)
 
 ############ MINIMAX ###############################
-def minimax_min_node(board, color, limit, caching = 0):
+def minimax_min_node(board, color, limit, caching = 0, key = None):
+    global node_count
+    node_count += 1
 
     # check if the given state has already existed in the cache
-    if caching == 1 and (board, color) in minimax_min_dict:
-        best_move, utility = minimax_min_dict[(board, color)]
-        return best_move, utility
+    if caching == 1 and (limit != 0 or cache_leaves):
+        if key is None:
+            key = board_key(board)
+        cached, _ = cache_lookup(key, MIN_NODE, color, limit)
+        if cached is not None:
+            return cached
 
     # find opponent's color
     if color == 1:
@@ -97,15 +300,17 @@ def minimax_min_node(board, color, limit, caching = 0):
     # terminate when there is no possible moves or reaches the depth limit
     if possible_moves == [] or limit == 0:
         best_move, utility = None, compute_utility(board, color)
-        if caching == 1:
-            minimax_min_dict[(board, color)] = best_move, utility
+        if caching == 1 and (limit != 0 or cache_leaves):
+            cache_store(key, MIN_NODE, color, limit, best_move, utility)
         return best_move, utility
 
     best_move = possible_moves[0]
 
     for move in possible_moves:
-        next_board = play_move(board, opponent_color, move[0], move[1])
-        next_move, next_utility = minimax_max_node(next_board, color, limit-1, caching)
+        next_board, undo = make_move(board, opponent_color, move[0], move[1])
+        next_key = child_key(key, board, next_board) if caching == 1 and (limit != 1 or cache_leaves) else None
+        next_move, next_utility = minimax_max_node(next_board, color, limit-1, caching, next_key)
+        unmake_move(board, undo)
 
         # compare the new utility with the current beta: update when we found a smaller one
         if min_utility > next_utility:
@@ -113,16 +318,21 @@ def minimax_min_node(board, color, limit, caching = 0):
 
     # cache the state with best move and its utility value
     if caching == 1:
-        minimax_min_dict[(board, color)] = best_move, min_utility
+        cache_store(key, MIN_NODE, color, limit, best_move, min_utility)
 
     return best_move, min_utility
 
-def minimax_max_node(board, color, limit, caching = 0): #returns highest possible utility
+def minimax_max_node(board, color, limit, caching = 0, key = None): #returns highest possible utility
+    global node_count
+    node_count += 1
 
     # check if the given state has already existed in the cache
-    if caching == 1 and (board, color) in minimax_max_dict:
-        best_move, utility = minimax_max_dict[(board, color)]
-        return best_move, utility
+    if caching == 1 and (limit != 0 or cache_leaves):
+        if key is None:
+            key = board_key(board)
+        cached, _ = cache_lookup(key, MAX_NODE, color, limit)
+        if cached is not None:
+            return cached
 
     # initialization
     possible_moves = get_possible_moves(board, color)
@@ -131,8 +341,8 @@ def minimax_max_node(board, color, limit, caching = 0): #returns highest possibl
     # terminate when there is no possible moves or reaches the depth limit
     if possible_moves == [] or limit == 0:
         best_move, utility = None, compute_utility(board, color)
-        if caching == 1:
-            minimax_max_dict[(board, color)] = best_move, utility
+        if caching == 1 and (limit != 0 or cache_leaves):
+            cache_store(key, MAX_NODE, color, limit, best_move, utility)
         return best_move, utility
 
     best_move = possible_moves[0]
@@ -140,9 +350,11 @@ def minimax_max_node(board, color, limit, caching = 0): #returns highest possibl
     # traverse each possible move that Max player can choose
     for move in possible_moves:
         # get new board based on the given move
-        next_board = play_move(board, color, move[0], move[1])
+        next_board, undo = make_move(board, color, move[0], move[1])
+        next_key = child_key(key, board, next_board) if caching == 1 and (limit != 1 or cache_leaves) else None
         # current level is max, so the next level should be min
-        next_move, next_utility = minimax_min_node(next_board, color, limit-1, caching)
+        next_move, next_utility = minimax_min_node(next_board, color, limit-1, caching, next_key)
+        unmake_move(board, undo)
 
         # compare the new utility with the current beta: update when we found a bigger one
         if max_utility < next_utility:
@@ -150,7 +362,7 @@ def minimax_max_node(board, color, limit, caching = 0): #returns highest possibl
 
     # cache the state with best move and its utility value
     if caching == 1:
-        minimax_max_dict[(board, color)] = best_move, max_utility
+        cache_store(key, MAX_NODE, color, limit, best_move, max_utility)
 
     return best_move, max_utility
 
@@ -168,18 +380,29 @@ def select_move_minimax(board, color, limit, caching = 0):
     If caching is OFF (i.e. 0), do NOT use state caching to reduce the number of state evaluations.
     """
 
+    transposition_table.new_search()
     # always return the move with the maximum utility
-    best_move, _ = minimax_max_node(board, color, limit, caching)
+    best_move, _ = minimax_max_node(to_backend(board), color, limit, caching)
 
     return best_move
 
 ################################################# ALPHA-BETA PRUNING ###############################################################
-def alphabeta_min_node(board, color, alpha, beta, limit, caching = 0, ordering = 0):
+def alphabeta_min_node(board, color, alpha, beta, limit, caching = 0, ordering = 0, key = None):
+    global node_count
+    node_count += 1
+    if deadline is not None and time.perf_counter() > deadline:
+        raise SearchTimeout
 
     # check if the given state has already existed in the cache
-    if caching == 1 and (board, color) in alphabeta_min_dict:
-        best_move, utility = alphabeta_min_dict[(board, color)]
-        return best_move, utility
+    # (bounds are stored against the window the state was searched with)
+    hash_move = None
+    if caching == 1 and (limit != 0 or cache_leaves):
+        if key is None:
+            key = board_key(board)
+        cached, hash_move = cache_lookup(key, MIN_NODE, color, limit, alpha, beta)
+        if cached is not None:
+            return cached
+    window = alpha, beta
 
     # find opponent's color
     if color == 1:
@@ -189,33 +412,28 @@ def alphabeta_min_node(board, color, alpha, beta, limit, caching = 0, ordering =
 
     # initialization
     possible_moves = get_possible_moves(board, opponent_color)
-    board_cache = []
     min_utility = float("inf")
 
     # terminate when there is no possible moves or reaches the depth limit
     if possible_moves == [] or limit == 0:
         best_move, utility = None, compute_utility(board, color)
-        if caching == 1:
-            alphabeta_min_dict[(board, color)] = best_move, utility
+        if caching == 1 and (limit != 0 or cache_leaves):
+            cache_store(key, MIN_NODE, color, limit, best_move, utility)
         return best_move, utility
 
+    # order the moves without playing them; each child board is only made when it is searched
+    possible_moves = order_moves(board, opponent_color, possible_moves, ordering, hash_move)
     best_move = possible_moves[0]
+    batch = leaf_utilities(board, opponent_color, possible_moves, color) if limit == 1 and leaf_evaluation == 'batched' else None
 
-    # sort the board cache based on its utility (ascending order) when ordering is true
-    for move in possible_moves:
-        new_board = play_move(board, opponent_color, move[0], move[1])
-        board_utility = compute_utility(new_board, opponent_color)
-        board_cache.append((new_board, move, board_utility))
-
-    if ordering == 1:
-        board_cache = sorted(board_cache, key=take_third, reverse=False)
-        # print("sorted:", board_cache)
-
-    # traverse each board in the sorted board cache
-    for each_tuple in board_cache:
-        next_board = each_tuple[0]
-        move = each_tuple[1]
-        next_move, next_utility = alphabeta_max_node(next_board, color, alpha, beta, limit-1, caching, ordering)
+    for index, move in enumerate(possible_moves):
+        if batch is not None:
+            next_utility = batch[index]
+        else:
+            next_board, undo = make_move(board, opponent_color, move[0], move[1])
+            next_key = child_key(key, board, next_board) if caching == 1 and (limit != 1 or cache_leaves) else None
+            next_move, next_utility = alphabeta_max_node(next_board, color, alpha, beta, limit-1, caching, ordering, next_key)
+            unmake_move(board, undo)
 
         # compare the new utility with the current beta: update when we found a smaller one
         if min_utility > next_utility:
@@ -223,51 +441,61 @@ def alphabeta_min_node(board, color, alpha, beta, limit, caching = 0, ordering =
         # stop expanding the rest of the children of the current node when minimum utility found so far(min_utility) is
         # bigger than or equal to the utility of a children node
         if min_utility <= alpha:
+            move_orderer.searched(board, opponent_color, move, limit, index)
+            if caching == 1:
+                cache_store(key, MIN_NODE, color, limit, best_move, min_utility, *window)
             return best_move, min_utility
         beta = min(beta, min_utility)
 
+    move_orderer.searched(board, opponent_color, None, limit, index)
+
     # cache the state with best move and its utility value
     if caching == 1:
-        alphabeta_min_dict[(board, color)] = best_move, min_utility
+        cache_store(key, MIN_NODE, color, limit, best_move, min_utility, *window)
 
     return best_move, min_utility
 
-def alphabeta_max_node(board, color, alpha, beta, limit, caching = 0, ordering = 0):
+def alphabeta_max_node(board, color, alpha, beta, limit, caching = 0, ordering = 0, key = None):
+    global node_count
+    node_count += 1
+    if deadline is not None and time.perf_counter() > deadline:
+        raise SearchTimeout
 
     # check if the given state has already existed in the cache
-    if caching == 1 and (board, color) in alphabeta_max_dict:
-        best_move, utility = alphabeta_max_dict[(board, color)]
-        return best_move, utility
+    # (bounds are stored against the window the state was searched with)
+    hash_move = None
+    if caching == 1 and (limit != 0 or cache_leaves):
+        if key is None:
+            key = board_key(board)
+        cached, hash_move = cache_lookup(key, MAX_NODE, color, limit, alpha, beta)
+        if cached is not None:
+            return cached
+    window = alpha, beta
 
     # initialization
     possible_moves = get_possible_moves(board, color)
-    board_cache = []
     max_utility = float("-inf")
 
     # terminate when there is no possible moves or reaches the depth limit
     if possible_moves == [] or limit == 0:
         best_move, utility = None, compute_utility(board, color)
-        if caching == 1:
-            alphabeta_max_dict[(board, color)] = best_move, utility
+        if caching == 1 and (limit != 0 or cache_leaves):
+            cache_store(key, MAX_NODE, color, limit, best_move, utility)
         return best_move, utility
 
+    # order the moves without playing them; each child board is only made when it is searched
+    possible_moves = order_moves(board, color, possible_moves, ordering, hash_move)
     best_move = possible_moves[0]
+    batch = leaf_utilities(board, color, possible_moves, color) if limit == 1 and leaf_evaluation == 'batched' else None
 
-    # sort the board cache based on its utility (ascending order) when ordering is true
-    for move in possible_moves:
-        new_board = play_move(board, color, move[0], move[1])
-        board_utility = compute_utility(new_board, color)
-        board_cache.append((new_board, move, board_utility))
-        # print("sorted:", board_cache)
-
-    if ordering == 1:
-        board_cache = sorted(board_cache, key=take_third, reverse=True)
-
-    # traverse each board in the sorted board cache
-    for each_tuple in board_cache:
-        next_board = each_tuple[0]
-        move = each_tuple[1]
-        next_move, next_utility = alphabeta_min_node(next_board, color, alpha, beta, limit - 1, caching, ordering)
+    for index, move in enumerate(possible_moves):
+        if batch is not None:
+            next_utility = batch[index]
+        else:
+            next_board, undo = make_move(board, color, move[0], move[1])
+            next_key = child_key(key, board, next_board) if caching == 1 and (limit != 1 or cache_leaves) else None
+            next_move, next_utility = alphabeta_min_node(next_board, color, alpha, beta, limit - 1, caching, ordering, next_key)
+            unmake_move(board, undo)
 
         # compare the new utility with the current beta: update when we found a smaller one
         if max_utility < next_utility:
@@ -275,12 +503,17 @@ def alphabeta_max_node(board, color, alpha, beta, limit, caching = 0, ordering =
         # stop expanding the rest of the children of the current node when maximum utility found so far(max_utility) is
         # smaller than or equal to the utility of a children node
         if max_utility >= beta:
+            move_orderer.searched(board, color, move, limit, index)
+            if caching == 1:
+                cache_store(key, MAX_NODE, color, limit, best_move, max_utility, *window)
             return best_move, max_utility
         alpha = max(alpha, max_utility)
 
+    move_orderer.searched(board, color, None, limit, index)
+
     # cache the state with best move and its utility value
     if caching == 1:
-        alphabeta_max_dict[(board, color)] = best_move, max_utility
+        cache_store(key, MAX_NODE, color, limit, best_move, max_utility, *window)
 
     return best_move, max_utility
 
@@ -300,10 +533,297 @@ def select_move_alphabeta(board, color, limit, caching = 0, ordering = 0):
     If ordering is OFF (i.e. 0), do NOT use node ordering to expedite pruning and reduce the number of state evaluations.
     """
 
-    best_move, _ = alphabeta_max_node(board, color, float("-inf"), float("inf"), limit, caching, ordering)
+    transposition_table.new_search()
+    move_orderer.new_search()
+    best_move, _ = alphabeta_max_node(to_backend(board), color, float("-inf"), float("inf"), limit, caching, ordering)
 
     return best_move
 
+def select_move_iterative(board, color, time_manager, caching = 0, ordering = 0, max_depth = None, search = 'alphabeta', splitter = None):
+    """
+    Iterative deepening alpha-beta: search to depth 1, 2, ... until the soft
+    deadline of time_manager (a TimeManager) passes, the search covers the
+    rest of the game or max_depth is reached. Each iteration searches the
+    best move of the previous one first, and with caching the hash moves of
+    the transposition table order the rest of the principal variation.
+    A search still running at the hard deadline is abandoned and the best
+    move of the deepest completed iteration is returned.
+    With search = 'pvs' the iterations are principal variation searches in
+    an aspiration window around the value of the previous iteration (see
+    pvs_aspiration). With a splitter (a RootSplitter) the alpha-beta
+    iterations are searched in parallel.
+    """
+    global deadline
+    board = to_backend(board)
+    possible_moves = get_possible_moves(board, color)
+    if possible_moves == []:
+        return None
+    best_move = possible_moves[0]
+    dark, light = get_score(board)
+    empty = len(board) * len(board) - dark - light
+    if max_depth is None or max_depth > empty:
+        max_depth = empty
+
+    time_manager.start_move(board)
+    transposition_table.new_search()
+    move_orderer.new_search()
+    if splitter is not None:
+        splitter.new_search()
+    deadline = time_manager.hard
+    time_manager.depth = 0
+    try:
+        depth = 1
+        value = None
+        while depth <= max_depth and (depth == 1 or time_manager.should_deepen()):
+            if search == 'pvs':
+                best_move, value = pvs_aspiration(board, color, depth, caching, ordering, best_move, value)
+            elif splitter is not None:
+                result = splitter.search(board, color, depth, caching, ordering, best_move, deadline - time.perf_counter())
+                if result is None:
+                    raise SearchTimeout
+                best_move, value = result
+            else:
+                best_move, value = alphabeta_root(board, color, depth, caching, ordering, best_move)
+            time_manager.depth = depth
+            depth += 1
+    except SearchTimeout:
+        pass
+    finally:
+        deadline = None
+        time_manager.finish_move()
+    return best_move
+
+def root_moves(board, color, ordering = 0, first_move = None):
+    """Moves of the root, in the order of alphabeta_max_node but with first_move first"""
+    return order_moves(board, color, get_possible_moves(board, color), ordering, first_move)
+
+def alphabeta_root(board, color, limit, caching = 0, ordering = 0, first_move = None):
+    """alphabeta_max_node at the root, searching first_move first"""
+    global node_count
+    node_count += 1
+    possible_moves = root_moves(board, color, ordering, first_move)
+    key = board_key(board) if caching == 1 else None
+    best_move, max_utility = possible_moves[0], float("-inf")
+    for move in possible_moves:
+        next_board, undo = make_move(board, color, move[0], move[1])
+        next_key = child_key(key, board, next_board) if caching == 1 and (limit != 1 or cache_leaves) else None
+        next_move, next_utility = alphabeta_min_node(next_board, color, max_utility, float("inf"), limit - 1, caching, ordering, next_key)
+        unmake_move(board, undo)
+        if max_utility < next_utility:
+            best_move, max_utility = move, next_utility
+    if caching == 1:
+        cache_store(key, MAX_NODE, color, limit, best_move, max_utility)
+    return best_move, max_utility
+
+################################################# PRINCIPAL VARIATION SEARCH ###############################################################
+def pvs_node(board, color, alpha, beta, limit, caching = 0, ordering = 0, key = None):
+    """
+    Negamax principal variation search (NegaScout). Here color is the player
+    to move and the utility is from its point of view, so pvs_node(board,
+    color, alpha, beta, ...) equals alphabeta_max_node(board, color, alpha,
+    beta, ...), and the transposition table entries of the two are shared.
+    The first child is searched with the full window, the others with a null
+    window (alpha, alpha + 1) that only tells whether they beat alpha; a
+    child that does is searched again with the full window.
+    """
+    global node_count
+    node_count += 1
+    if deadline is not None and time.perf_counter() > deadline:
+        raise SearchTimeout
+
+    hash_move = None
+    if caching == 1 and (limit != 0 or cache_leaves):
+        if key is None:
+            key = board_key(board)
+        cached, hash_move = cache_lookup(key, MAX_NODE, color, limit, alpha, beta)
+        if cached is not None:
+            return cached
+    window = alpha, beta
+
+    possible_moves = get_possible_moves(board, color)
+    if possible_moves == [] or limit == 0:
+        best_move, utility = None, compute_utility(board, color)
+        if caching == 1 and (limit != 0 or cache_leaves):
+            cache_store(key, MAX_NODE, color, limit, best_move, utility)
+        return best_move, utility
+
+    possible_moves = order_moves(board, color, possible_moves, ordering, hash_move)
+    best_move, max_utility, index = pvs_moves(board, color, alpha, beta, limit, caching, ordering, key, possible_moves)
+
+    move_orderer.searched(board, color, best_move if max_utility >= beta else None, limit, index)
+    if caching == 1:
+        cache_store(key, MAX_NODE, color, limit, best_move, max_utility, *window)
+    return best_move, max_utility
+
+def pvs_moves(board, color, alpha, beta, limit, caching, ordering, key, possible_moves):
+    """
+    The move loop of pvs_node, searching possible_moves in order. Returns
+    (best move, utility, index of the last move searched); on a cutoff the
+    best move is the one that caused it.
+    """
+    opponent_color = 2 if color == 1 else 1
+    best_move, max_utility = possible_moves[0], float("-inf")
+    for index, move in enumerate(possible_moves):
+        next_board, undo = make_move(board, color, move[0], move[1])
+        next_key = child_key(key, board, next_board) if caching == 1 and (limit != 1 or cache_leaves) else None
+        if max_utility == float("-inf"):
+            _, utility = pvs_node(next_board, opponent_color, -beta, -alpha, limit - 1, caching, ordering, next_key)
+            utility = -utility
+        else:
+            _, utility = pvs_node(next_board, opponent_color, -alpha - 1, -alpha, limit - 1, caching, ordering, next_key)
+            utility = -utility
+            if alpha < utility < beta:
+                _, utility = pvs_node(next_board, opponent_color, -beta, -alpha, limit - 1, caching, ordering, next_key)
+                utility = -utility
+        unmake_move(board, undo)
+        if max_utility < utility:
+            best_move, max_utility = move, utility
+        if max_utility >= beta:
+            break
+        alpha = max(alpha, max_utility)
+    return best_move, max_utility, index
+
+def pvs_root(board, color, limit, caching = 0, ordering = 0, first_move = None, alpha = float("-inf"), beta = float("inf")):
+    """pvs_node at the root, searching first_move first"""
+    global node_count
+    node_count += 1
+    key = board_key(board) if caching == 1 else None
+    best_move, max_utility, _ = pvs_moves(board, color, alpha, beta, limit, caching, ordering, key, root_moves(board, color, ordering, first_move))
+    if caching == 1:
+        cache_store(key, MAX_NODE, color, limit, best_move, max_utility, alpha, beta)
+    return best_move, max_utility
+
+def pvs_aspiration(board, color, limit, caching = 0, ordering = 0, first_move = None, guess = None):
+    """
+    pvs_root in the window guess +- ASPIRATION. If the value falls outside,
+    the window is opened on that side and the root is searched again.
+    Without a guess the full window is used.
+    """
+    if guess is None:
+        return pvs_root(board, color, limit, caching, ordering, first_move)
+    alpha, beta = guess - ASPIRATION, guess + ASPIRATION
+    while True:
+        best_move, utility = pvs_root(board, color, limit, caching, ordering, first_move, alpha, beta)
+        if utility <= alpha:
+            alpha = float("-inf")
+        elif utility >= beta:
+            beta = float("inf")
+        else:
+            return best_move, utility
+        first_move = best_move
+
+def select_move_pvs(board, color, limit, caching = 0, ordering = 0):
+    """select_move_alphabeta, searching with principal variation search"""
+    transposition_table.new_search()
+    move_orderer.new_search()
+    best_move, _ = pvs_root(to_backend(board), color, limit, caching, ordering)
+    return best_move
+
+################################################# PARALLEL ROOT SPLITTING ###############################################################
+# in a worker process: the best utility found so far among the root moves, shared by all the workers
+shared_alpha = None
+
+# in a worker process: the number of the search (see RootSplitter.new_search) its last task was part of
+worker_search = None
+
+def init_worker(alpha, backend_name):
+    global shared_alpha
+    shared_alpha = alpha
+    set_backend(backend_name)
+
+def search_root_move(task):
+    """
+    Search one root move in a worker process. Returns (utility, nodes
+    searched), or (None, nodes) if the deadline passed. The deadline is a
+    perf_counter() time, which all the processes share, so a move that
+    waited for a free worker gets only what is left of the budget.
+    The move is searched in the window (alpha - 1, inf), alpha being the best
+    utility the workers have found so far: the utilities are integers, so
+    a move that ties with alpha still gets its exact utility, and the root
+    picks the same move as alphabeta_root.
+    The first task of a new search ages the transposition table and the
+    move orderer of the worker, as select_move_alphabeta does.
+    """
+    global node_count, deadline, worker_search
+    board, color, move, limit, caching, ordering, stop_time, search = task
+    if search != worker_search:
+        transposition_table.new_search()
+        move_orderer.new_search()
+        worker_search = search
+    board = to_backend(board)
+    node_count = 0
+    deadline = stop_time
+    alpha = shared_alpha.value
+    next_board, undo = make_move(board, color, move[0], move[1])
+    next_key = board_key(next_board) if caching == 1 and (limit != 1 or cache_leaves) else None
+    try:
+        _, utility = alphabeta_min_node(next_board, color, alpha - 1, float("inf"), limit - 1, caching, ordering, next_key)
+    except SearchTimeout:
+        return None, node_count
+    finally:
+        deadline = None
+    with shared_alpha.get_lock():
+        if shared_alpha.value < utility:
+            shared_alpha.value = utility
+    return utility, node_count
+
+class RootSplitter(object):
+    """
+    Alpha-beta with the root moves split over a pool of worker processes.
+    Each worker searches whole root moves, as many at a time as there are
+    workers, with its own transposition table and move orderer; the best
+    utility found so far is shared, so the moves searched after it are cut
+    off as in the sequential search. The pool is started once and kept for
+    the searches of the game.
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.alpha = multiprocessing.Value('d', float("-inf"))
+        self.pool = multiprocessing.Pool(workers, init_worker, (self.alpha, backend))
+        self.searches = 0
+
+    def new_search(self):
+        """Start the search of a new move: the workers age their tables and orderers on their next task"""
+        self.searches += 1
+
+    def search(self, board, color, limit, caching = 0, ordering = 0, first_move = None, time_left = None):
+        """
+        (best move, utility) of alphabeta_root(board, ...), or None if the
+        search did not finish within time_left seconds
+        """
+        global node_count
+        node_count += 1
+        board = to_backend(board)
+        possible_moves = root_moves(board, color, ordering, first_move)
+        if not isinstance(board, othello_bitboard.BitBoard):
+            board = othello_bitboard.from_tuple(board) #smaller to send
+        board = othello_bitboard.BitBoard(board.dimension, board.dark, board.light)
+        self.alpha.value = float("-inf")
+        stop_time = None if time_left is None else time.perf_counter() + time_left
+        tasks = [(board, color, move, limit, caching, ordering, stop_time, self.searches) for move in possible_moves]
+        results = self.pool.map(search_root_move, tasks, chunksize=1)
+        node_count += sum(nodes for _, nodes in results)
+        if any(utility is None for utility, _ in results):
+            return None
+        best_move, max_utility = possible_moves[0], float("-inf")
+        for move, (utility, _) in zip(possible_moves, results):
+            if max_utility < utility:
+                best_move, max_utility = move, utility
+        return best_move, max_utility
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+
+def select_move_parallel(board, color, limit, caching = 0, ordering = 0, splitter = None):
+    """select_move_alphabeta, with the root moves searched in parallel by splitter (a RootSplitter)"""
+    if get_possible_moves(to_backend(board), color) == []:
+        return None
+    splitter.new_search()
+    best_move, _ = splitter.search(board, color, limit, caching, ordering)
+    return best_move
+
 ####################################################
 def run_ai():
     """
@@ -320,6 +840,7 @@ def run_ai():
     minimax = int(arguments[2]) #Minimax or alpha beta
     caching = int(arguments[3]) #Caching
     ordering = int(arguments[4]) #Node-ordering (for alpha-beta only)
+    protocol = int(arguments[5]) if len(arguments) > 5 else othello_bitboard.EVAL_PROTOCOL #How the board is sent
 
     if (minimax == 1): eprint("Running MINIMAX")
     else: eprint("Running ALPHA-BETA")
@@ -330,8 +851,15 @@ def run_ai():
     if (ordering == 1): eprint("Node Ordering is ON")
     else: eprint("Node Ordering is OFF")
 
-    if (limit == -1): eprint("Depth Limit is OFF")
-    else: eprint("Depth Limit is ", limit)
+    if (limit != -1): eprint("Depth Limit is ", limit)
+    elif (minimax == 1): eprint("Depth Limit is OFF")
+    else: eprint("Depth Limit is OFF, iterative deepening alpha-beta within {} s for the game".format(GAME_TIME))
+    time_manager = TimeManager(game_time = GAME_TIME)
+
+    splitter = None
+    if minimax == 0 and WORKERS > 1:
+        eprint("Root moves split over", WORKERS, "worker processes")
+        splitter = RootSplitter(WORKERS)
 
     if (minimax == 1 and ordering == 1): eprint("Node Ordering should have no impact on Minimax")
 
@@ -345,18 +873,30 @@ def run_ai():
         light_score = int(light_score_s)
 
         if status == "FINAL": # Game is over.
-            print
+            if caching == 1:
+                eprint("Transposition table:", transposition_table.report())
+            eprint("Move ordering:", move_orderer.report())
+            if splitter is not None:
+                splitter.close()
+                splitter = None
         else:
-            board = eval(input()) # Read in the input and turn it into a Python
-                                  # object. The format is a list of rows. The
-                                  # squares in each row are represented by
-                                  # 0 : empty square
-                                  # 1 : dark disk (player 1)
-                                  # 2 : light disk (player 2)
+            if protocol == othello_bitboard.BITBOARD_PROTOCOL:
+                board, _ = othello_bitboard.decode_board(input()) # A BitBoard, see othello_bitboard
+            else:
+                board = eval(input()) # Read in the input and turn it into a Python
+                                      # object. The format is a list of rows. The
+                                      # squares in each row are represented by
+                                      # 0 : empty square
+                                      # 1 : dark disk (player 1)
+                                      # 2 : light disk (player 2)
 
             # Select the move and send it to the manager
             if (minimax == 1): #run this if the minimax flag is given
                 movei, movej = select_move_minimax(board, color, limit, caching)
+            elif (limit == -1): #iterative deepening within the time budget
+                movei, movej = select_move_iterative(board, color, time_manager, caching, ordering, splitter = splitter)
+            elif splitter is not None: #alphabeta with the root moves split over the workers
+                movei, movej = select_move_parallel(board, color, limit, caching, ordering, splitter)
             else: #else run alphabeta
                 movei, movej = select_move_alphabeta(board, color, limit, caching, ordering)
 
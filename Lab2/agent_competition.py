@@ -1,33 +1,356 @@
+import math
+import multiprocessing
 import random
 import sys
 import time
+from array import array
 
 # You can use the functions in othello_shared to write your AI for competition
 from othello_shared import find_lines, get_possible_moves, get_score, play_move
+from othello_bitboard import BITBOARD_PROTOCOL, EVAL_PROTOCOL, BitBoard, decode_board, flip_mask, from_tuple, move_mask, popcount, squares
+from agent import TimeManager
 
-# If you choose to try MCTS, you can make use of the code below
-class MCTS_state():
+# exploration constant C of UCT
+EXPLORATION = 1.4
+
+# seconds the AI gets for all its moves of a game when the playout limit is off
+GAME_TIME = 60
+
+NO_MOVE = 0xFFFF
+
+# parallel searches, selected by a limit of -(10 * workers + mode), e.g., -41 for 4 root-parallel workers
+ROOT_PARALLEL, LEAF_PARALLEL = 1, 2
+
+# playouts each worker runs per selection of the leaf-parallel search
+LEAF_PLAYOUTS = 4
+
+def eprint(*args, **kwargs): #you can use this for debugging, as it will print to sterr and not stdout
+    print(*args, file=sys.stderr, **kwargs)
+
+def bitboard_play(n, dark, light, player, square):
+    """(dark, light) after player plays on square (a bit index, see othello_bitboard)"""
+    flips = flip_mask(BitBoard(n, dark, light), player, square) | (1 << square)
+    if player == 1:
+        return dark | flips, light & ~flips
+    return dark & ~flips, light | flips
+
+# results of a playout won by nobody, dark or light: (draws, dark wins, light wins)
+RESULTS = [(1, 0, 0), (0, 1, 0), (0, 0, 1)]
+
+def random_playout(n, dark, light, player, rng):
+    """Play random moves from the board until the player to move has none. Returns the winner, 0 for a draw."""
+    while True:
+        moves = move_mask(BitBoard(n, dark, light), player)
+        if not moves:
+            break
+        dark, light = bitboard_play(n, dark, light, player, rng.choice(list(squares(moves))))
+        player = 3 - player
+    dark_count, light_count = popcount(dark), popcount(light)
+    if dark_count == light_count:
+        return 0
+    return 1 if dark_count > light_count else 2
+
+def most_visited(children, dimension):
+    """(i, j) of the move of children, [(square, visits, wins)], with the most visits, or None if there are none"""
+    if not children:
+        return None
+    square = max(children, key=lambda child: child[1])[0]
+    return divmod(square, dimension)
+
+class MCTS(object):
     """
-            This sample code gives you a idea of how to store records for each node
-            in the tree. However, you are welcome to modify this part or define your own
-            class.
+    Monte Carlo tree search with UCT for the player color.
+
+    The nodes of the tree live in an arena of parallel arrays indexed by
+    node: visits, wins (for the player who made the move into the node, a
+    draw counting for half), first_child, child_count, move (the square of
+    the move into the node) and parent. The children of a node are
+    allocated together when it is expanded, so they are the child_count
+    nodes from first_child on; first_child is -1 until then. Node 0 is the
+    root, whose board is kept, and the player to move alternates with the
+    depth, as the game has no passes. The boards of the other nodes are
+    played out from the root as the tree is walked.
+
+    Between two moves the tree is kept: the next search starts from the
+    grandchild of the root reached by the move played and the reply of the
+    opponent, with the subtree below it, if it was expanded (see reroot).
     """
-    def __init__(self, ID, parent, child, reward, total, board):
-        self.ID = ID
-        self.parent = parent    # a list of states
-        self.child = child      # a list of states
-        self.reward = reward    # number of win
-        self.total = total      # number of simulation for self and (grand*)children
+
+    def __init__(self, color, seed = None):
+        self.color = color
+        self.rng = random.Random(seed)
+        self.playouts = 0  #playouts run by all the searches
+        self.reused = 0    #visits of the trees kept from the previous moves
+        self.clear(None)
+
+    def clear(self, board):
+        """Start a new tree with the root board board (a BitBoard)"""
         self.board = board
-        self.visited = 0        # 0 -> not visited yet, 1 -> already visited
+        self.visits = array('I')
+        self.wins = array('d')
+        self.first_child = array('i')
+        self.child_count = array('H')
+        self.move = array('H')
+        self.parent = array('i')
+        self.add(-1, NO_MOVE)
+
+    def add(self, parent, move):
+        self.visits.append(0)
+        self.wins.append(0.0)
+        self.first_child.append(-1)
+        self.child_count.append(0)
+        self.move.append(move)
+        self.parent.append(parent)
+        return len(self.visits) - 1
 
+    def __len__(self):
+        return len(self.visits)
+
+    def search(self, board, playouts = None, deadline = None):
+        """
+        The move to play on board, after running playouts iterations or
+        until the perf_counter() time deadline, or None if there is no move
+        """
+        if not isinstance(board, BitBoard):
+            board = from_tuple(board)
+        if not self.reroot(board):
+            self.clear(board)
+        self.reused += self.visits[0]
+        count = 0
+        while True:
+            self.iterate()
+            count += 1
+            if playouts is not None and count >= playouts:
+                break
+            if deadline is not None and count % 16 == 0 and time.perf_counter() > deadline:
+                break
+        self.playouts += count
+        return most_visited(self.root_children(), board.dimension)
+
+    def root_children(self):
+        """[(square of the move, visits, wins)] of the children of the root"""
+        first = self.first_child[0]
+        return [(self.move[child], self.visits[child], self.wins[child]) for child in range(first, first + self.child_count[0])]
+
+    def iterate(self):
+        """Selection, expansion, a random playout and backpropagation"""
+        path, dark, light, player = self.select()
+        self.backpropagate(path, RESULTS[random_playout(self.board.dimension, dark, light, player, self.rng)])
+
+    def select(self):
+        """
+        Walk down the tree by UCT and expand the node reached if it was
+        visited before. Returns the path, [(node, player who moved into it)]
+        from the root, and the (dark, light, player to move) of its last node.
+        """
+        visits, wins, first_child, child_count, move = self.visits, self.wins, self.first_child, self.child_count, self.move
+        n = self.board.dimension
+        dark, light = self.board.dark, self.board.light
+        node, player = 0, self.color
+        path = [(0, 3 - player)] #(node, player who moved into it)
+        while first_child[node] >= 0 and child_count[node] > 0:
+            log_visits = math.log(visits[node])
+            first = first_child[node]
+            best, best_score = first, -1.0
+            for child in range(first, first + child_count[node]):
+                child_visits = visits[child]
+                if child_visits == 0:
+                    best = child
+                    break
+                score = wins[child] / child_visits + EXPLORATION * math.sqrt(log_visits / child_visits)
+                if score > best_score:
+                    best, best_score = child, score
+            node = best
+            dark, light = bitboard_play(n, dark, light, player, move[node])
+            path.append((node, player))
+            player = 3 - player
 
-def select_move_MCTS(board, color, limit):
+        if first_child[node] < 0 and (visits[node] > 0 or node == 0):
+            moves = list(squares(move_mask(BitBoard(n, dark, light), player)))
+            self.rng.shuffle(moves)
+            first_child[node] = len(visits)
+            child_count[node] = len(moves)
+            for square in moves:
+                self.add(node, square)
+            if moves:
+                node = first_child[node]
+                dark, light = bitboard_play(n, dark, light, player, move[node])
+                path.append((node, player))
+                player = 3 - player
+        return path, dark, light, player
+
+    def backpropagate(self, path, results):
+        """Add the playouts of results, (draws, dark wins, light wins), to the nodes of path"""
+        visits, wins = self.visits, self.wins
+        playouts = results[0] + results[1] + results[2]
+        for node, mover in path:
+            visits[node] += playouts
+            wins[node] += results[mover] + 0.5 * results[0]
+
+    def reroot(self, board):
+        """
+        Make the node of board the root if it is the root or a grandchild of
+        the root, dropping the rest of the tree. Returns whether it was found.
+        """
+        if self.board is None or board.dimension != self.board.dimension:
+            return False
+        if board == self.board:
+            return True
+        n = board.dimension
+        first = self.first_child[0]
+        for child in range(first, first + self.child_count[0]):
+            if self.first_child[child] < 0:
+                continue
+            dark, light = bitboard_play(n, self.board.dark, self.board.light, self.color, self.move[child])
+            first_grandchild = self.first_child[child]
+            for node in range(first_grandchild, first_grandchild + self.child_count[child]):
+                if bitboard_play(n, dark, light, 3 - self.color, self.move[node]) == (board.dark, board.light):
+                    self.compact(node)
+                    self.board = board
+                    return True
+        return False
+
+    def compact(self, root):
+        """Keep only the subtree of root, copied to the front of the arena with root as node 0"""
+        old = (self.visits, self.wins, self.first_child, self.child_count, self.move)
+        self.visits, self.wins, self.first_child, self.child_count, self.move, self.parent = (
+            array('I'), array('d'), array('i'), array('H'), array('H'), array('i'))
+        self.add(-1, old[4][root])
+        self.visits[0], self.wins[0] = old[0][root], old[1][root]
+        queue = [root] #old node of each new node, in the order they are copied
+        for node, old_node in enumerate(queue):
+            first = old[2][old_node]
+            if first < 0:
+                continue
+            self.first_child[node] = len(self.visits)
+            self.child_count[node] = old[3][old_node]
+            for old_child in range(first, first + old[3][old_node]):
+                child = self.add(node, old[4][old_child])
+                self.visits[child], self.wins[child] = old[0][old_child], old[1][old_child]
+                queue.append(old_child)
+
+############ PARALLEL MCTS ###############################
+# in a worker process: its random generator, root-parallel its own tree, and
+# the barrier all the workers wait at before a root-parallel search
+worker_rng = None
+worker_tree = None
+worker_barrier = None
+
+def init_worker(barrier = None):
+    global worker_rng, worker_tree, worker_barrier
+    worker_rng = random.Random() #seeded from the system, not from the parent process
+    worker_tree = None
+    worker_barrier = barrier
+
+def root_parallel_search(task):
+    """
+    Search the board with the tree of the worker until the perf_counter()
+    time deadline, which all the processes share. Returns (root children,
+    playouts run, visits reused).
+    The worker first waits at the barrier until every worker has taken a
+    task, so no worker runs two searches of the same move.
+    """
+    global worker_tree
+    board, color, playouts, deadline = task
+    worker_barrier.wait()
+    if worker_tree is None or worker_tree.color != color:
+        worker_tree = MCTS(color)
+        worker_tree.rng = worker_rng
+    before = worker_tree.playouts, worker_tree.reused
+    worker_tree.search(board, playouts, deadline)
+    return worker_tree.root_children(), worker_tree.playouts - before[0], worker_tree.reused - before[1]
+
+def leaf_playouts(task):
+    """(draws, dark wins, light wins) of count random playouts from a board"""
+    n, dark, light, player, count = task
+    results = [0, 0, 0]
+    for _ in range(count):
+        results[random_playout(n, dark, light, player, worker_rng)] += 1
+    return results
+
+class ParallelMCTS(object):
     """
-               You can add additional help functions as long as this function will return a position tuple
+    MCTS for the player color over a pool of worker processes, with the
+    search interface of MCTS:
+
+    ROOT_PARALLEL  each worker grows its own tree from the board, kept from
+                   move to move as MCTS does, and the visits of the moves of
+                   the roots are added up to choose the move
+    LEAF_PARALLEL  one tree, in this process: each leaf selected is played
+                   out LEAF_PLAYOUTS times by every worker and the results
+                   are backpropagated together
     """
-    initial_state = MCTS_state(0, [], [], 0, 0, board) # this is just an example. delete it when you start to code.
-    pass
+
+    def __init__(self, color, workers, mode = ROOT_PARALLEL):
+        self.color = color
+        self.workers = workers
+        self.mode = mode
+        self.tree = MCTS(color) #the tree of LEAF_PARALLEL
+        self.playouts = 0
+        self.reused = 0
+        self.pool = multiprocessing.Pool(workers, init_worker, (multiprocessing.Barrier(workers),))
+
+    def search(self, board, playouts = None, deadline = None):
+        if not isinstance(board, BitBoard):
+            board = from_tuple(board)
+        if self.mode == ROOT_PARALLEL:
+            return self.search_roots(board, playouts, deadline)
+        return self.search_leaves(board, playouts, deadline)
+
+    def search_roots(self, board, playouts, deadline):
+        share = None if playouts is None else max(1, playouts // self.workers)
+        results = self.pool.map(root_parallel_search, [(board, self.color, share, deadline)] * self.workers, chunksize=1)
+        merged = {}
+        for children, count, reused in results:
+            self.playouts += count
+            self.reused += reused
+            for square, visits, wins in children:
+                total = merged.setdefault(square, [0, 0.0])
+                total[0] += visits
+                total[1] += wins
+        return most_visited([(square, visits, wins) for square, (visits, wins) in merged.items()], board.dimension)
+
+    def search_leaves(self, board, playouts, deadline):
+        tree = self.tree
+        if not tree.reroot(board):
+            tree.clear(board)
+        tree.reused += tree.visits[0]
+        self.reused += tree.visits[0]
+        n = board.dimension
+        count = 0
+        while True:
+            path, dark, light, player = tree.select()
+            results = [0, 0, 0]
+            for worker_results in self.pool.map(leaf_playouts, [(n, dark, light, player, LEAF_PLAYOUTS)] * self.workers, chunksize=1):
+                for k in range(3):
+                    results[k] += worker_results[k]
+            tree.backpropagate(path, results)
+            count += self.workers * LEAF_PLAYOUTS
+            if playouts is not None and count >= playouts:
+                break
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+        tree.playouts += count
+        self.playouts += count
+        return most_visited(tree.root_children(), n)
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+
+def select_move_MCTS(board, color, limit, tree = None, deadline = None):
+    """
+    The move of color on board after limit playouts (-1 for no limit),
+    stopping early at the perf_counter() time deadline if one is given; a
+    deadline is needed when there is no limit.
+    tree is the MCTS (or ParallelMCTS) of the previous moves, to search on
+    from; a new MCTS is used if it is None.
+    """
+    if limit < 0 and deadline is None:
+        raise ValueError("MCTS with no playout limit needs a deadline")
+    if tree is None:
+        tree = MCTS(color)
+    return tree.search(board, limit if limit >= 0 else None, deadline)
 
 
 def run_ai():
@@ -42,11 +365,22 @@ def run_ai():
     minimax = int(arguments[2])  # not used here
     caching = int(arguments[3])  # not used here
     ordering = int(arguments[4])  # not used here
+    protocol = int(arguments[5]) if len(arguments) > 5 else EVAL_PROTOCOL  # how the board is sent
 
-    if (limit == -1):
+    tree = MCTS(color)
+    if (limit < -1): #-(10 * workers + mode): a parallel search within the time budget
+        workers, mode = divmod(-limit, 10)
+        if mode in (ROOT_PARALLEL, LEAF_PARALLEL) and workers > 0:
+            eprint("Iteration Limit is OFF, {} with {} worker processes".format("root-parallel" if mode == ROOT_PARALLEL else "leaf-parallel", workers))
+            tree = ParallelMCTS(color, workers, mode)
+        else:
+            eprint("Unknown parallel search specified:", limit)
+            eprint("Iteration Limit is OFF")
+    elif (limit == -1):
         eprint("Iteration Limit is OFF")
     else:
         eprint("Iteration Limit is ", limit)
+    time_manager = TimeManager(game_time = GAME_TIME)
 
     if (minimax == 1 and ordering == 1): eprint("Node Ordering should have no impact on Minimax")
 
@@ -60,20 +394,26 @@ def run_ai():
         light_score = int(light_score_s)
 
         if status == "FINAL":  # Game is over.
-            print
+            eprint("MCTS: {} playouts, {} visits reused".format(tree.playouts, tree.reused))
+            if isinstance(tree, ParallelMCTS):
+                tree.close()
         else:
-            board = eval(input())  # Read in the input and turn it into a Python
-            # object. The format is a list of rows. The
-            # squares in each row are represented by
-            # 0 : empty square
-            # 1 : dark disk (player 1)
-            # 2 : light disk (player 2)
+            if protocol == BITBOARD_PROTOCOL:
+                board, _ = decode_board(input())  # a BitBoard, see othello_bitboard
+            else:
+                board = eval(input())  # Read in the input and turn it into a Python
+                # object. The format is a list of rows. The
+                # squares in each row are represented by
+                # 0 : empty square
+                # 1 : dark disk (player 1)
+                # 2 : light disk (player 2)
 
-            #Uncomment the line below if you choose to use MCTS
-            #movei, movej = select_move_MCTS(board, color, limit)
+            # limit playouts per move, or as many as the time budget allows
+            time_manager.start_move(board)
+            movei, movej = select_move_MCTS(board, color, limit, tree, time_manager.hard)
+            time_manager.finish_move()
 
-            #Otherwise, use whatever formulation you like! e.g.:
-            #movei, movej = select_move_minimax(board, color, limit, caching)
-            #movei, movej = select_move_alphabeta(board, color, limit, caching, ordering)            
+            print("{} {}".format(movei, movej))
 
-            print("{} {}".format(movei, movej))
\ No newline at end of file
+if __name__ == "__main__":
+    run_ai()
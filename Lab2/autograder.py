@@ -1,8 +1,13 @@
 #!/usr/bin/env python
 import os  # for time functions
+import random
 
 # import student's functions
 from agent import *
+import agent_competition
+import othello_bitboard
+import othello_eval
+import othello_shared
 
 smallboards = [((0, 0, 0, 0), (0, 2, 1, 0), (0, 1, 1, 1), (0, 0, 0, 0)),
 ((0, 1, 0, 0), (0, 1, 1, 0), (0, 1, 2, 1), (0, 0, 0, 2)),
@@ -32,6 +37,36 @@ test_ordering = True
 test_select_move_minimax = True
 test_select_move_alphabeta = True
 test_select_move_equal = True
+test_bitboard = True
+test_transposition_table = True
+test_pvs = True
+test_root_splitting = True
+test_batch_features = True
+test_mcts = True
+test_protocol = True
+
+def initial_board(dimension):
+    rows = [[0] * dimension for _ in range(dimension)]
+    k = dimension // 2 - 1
+    rows[k][k] = rows[k+1][k+1] = 2
+    rows[k+1][k] = rows[k][k+1] = 1
+    return tuple(tuple(row) for row in rows)
+
+def random_positions(count, dimension, seed = 384):
+    """count (tuple board, player to move) pairs reached by random moves from the initial board"""
+    rng = random.Random(seed)
+    positions = []
+    for _ in range(count):
+      board = initial_board(dimension)
+      player = 1
+      for _ in range(rng.randrange(dimension * dimension - 4)):
+        moves = othello_shared.get_possible_moves(board, player)
+        if moves == []:
+          break
+        board = othello_shared.play_move(board, player, *rng.choice(moves))
+        player = 3 - player
+      positions.append((board, player))
+    return positions
 
 
 if test_compute_utility:
@@ -345,3 +380,162 @@ if test_minimax_max_node_2:
 
     print("You computed correct minimax max moves for {} of {} boards".format(correct, len(selected))) 
     print("You computed correct minimax max values for {} of {} boards".format(correctval, len(selected))) 
+
+if test_bitboard:
+
+    print('Testing Bitboard Backend')
+    positions = random_positions(20, 4) + random_positions(20, 6) + random_positions(20, 8)
+    correct = 0
+    for board, player in positions:
+      bitboard = othello_bitboard.from_tuple(board)
+      moves = othello_shared.get_possible_moves(board, player)
+      same = (othello_bitboard.to_tuple(bitboard) == board
+              and othello_bitboard.get_possible_moves(bitboard, player) == moves
+              and othello_bitboard.get_score(bitboard) == othello_shared.get_score(board))
+      for i, j in moves:
+        if othello_bitboard.to_tuple(othello_bitboard.play_move(bitboard, player, i, j)) != othello_shared.play_move(board, player, i, j):
+          same = False
+      if same:
+        correct += 1
+
+    print("The bitboard backend matched othello_shared for {} of {} random positions".format(correct, len(positions)))
+
+if test_transposition_table:
+
+    print('Testing Transposition Table')
+    positions = random_positions(20, 6, 385)
+    correct = 0
+    for board, player in positions:
+      same = True
+      for name in BACKENDS:
+        set_backend(name)
+        for limit in (2, 4):
+          (move, value) = alphabeta_max_node(to_backend(board), player, float("-Inf"), float("Inf"), limit, 0, 0)
+          for ordering in (0, 1):
+            (cached_move, cached_value) = alphabeta_max_node(to_backend(board), player, float("-Inf"), float("Inf"), limit, 1, ordering)
+            if cached_value != value:
+              same = False
+      if same:
+        correct += 1
+    set_backend('tuple')
+
+    print("Alpha-beta with caching found the value of plain alpha-beta for {} of {} random positions".format(correct, len(positions)))
+
+if test_pvs:
+
+    print('Testing Principal Variation Search')
+    positions = [(board, player) for board, player in random_positions(20, 6, 386) if get_possible_moves(board, player) != []]
+    correct = 0
+    for board, player in positions:
+      same = True
+      for caching in (0, 1):
+        for ordering in (0, 1):
+          (move, value) = alphabeta_max_node(board, player, float("-Inf"), float("Inf"), 4, 0, 0)
+          (pvs_move, pvs_value) = pvs_root(board, player, 4, caching, ordering)
+          (aspiration_move, aspiration_value) = pvs_aspiration(board, player, 4, caching, ordering, None, value + 5)
+          if pvs_value != value or aspiration_value != value:
+            same = False
+      if same:
+        correct += 1
+
+    print("PVS and aspiration windows found the value of plain alpha-beta for {} of {} random positions".format(correct, len(positions)))
+
+if test_root_splitting:
+
+    print('Testing Root Splitting')
+    positions = [(board, player) for board, player in random_positions(12, 6, 387) if get_possible_moves(board, player) != []]
+    splitter = RootSplitter(2)
+    correct = 0
+    for board, player in positions:
+      same = True
+      for caching in (0, 1):
+        (move, value) = alphabeta_root(board, player, 4, 0, 0)
+        splitter.new_search()
+        (split_move, split_value) = splitter.search(board, player, 4, caching, 0)
+        if split_move != move or split_value != value:
+          same = False
+      if same:
+        correct += 1
+    splitter.close()
+
+    print("Root splitting found the move and value of plain alpha-beta for {} of {} random positions".format(correct, len(positions)))
+
+if test_batch_features:
+
+    print('Testing Batched Features')
+    if othello_eval.numpy is None:
+      print("Batched features need NumPy, not tested")
+    else:
+      evaluator = othello_eval.Evaluator({name: k + 1 for k, name in enumerate(othello_eval.FEATURES)})
+      correct = 0
+      total = 0
+      for dimension in (4, 6, 8):
+        positions = random_positions(20, dimension, 388)
+        boards = [board for board, player in positions]
+        for stacked in (othello_eval.stack(boards), othello_eval.stack([othello_bitboard.from_tuple(board) for board in boards])):
+          for player in (1, 2):
+            batch = othello_eval.batch_features(stacked, player)
+            values = evaluator.evaluate_batch(stacked, player)
+            for k in range(len(boards)):
+              total += 1
+              single = othello_eval.features(boards[k], player)
+              if all(batch[name][k] == single[name] for name in othello_eval.FEATURES) and values[k] == evaluator.evaluate(boards[k], player):
+                correct += 1
+
+      print("batch_features matched features for {} of {} boards".format(correct, total))
+
+if test_mcts:
+
+    print('Testing MCTS')
+    positions = random_positions(10, 4, 389) + random_positions(10, 6, 389)
+    correct = 0
+    for board, player in positions:
+      moves = get_possible_moves(board, player)
+      move = agent_competition.select_move_MCTS(board, player, 100)
+      if (move in moves) if moves != [] else move is None:
+        correct += 1
+
+    # games against random moves, with the tree kept from move to move
+    rng = random.Random(389)
+    played = 0
+    for dimension, color in ((4, 1), (6, 2)):
+      board, player = initial_board(dimension), 1
+      tree = agent_competition.MCTS(color, 389)
+      moves = get_possible_moves(board, player)
+      while moves != []:
+        if player == color:
+          move = agent_competition.select_move_MCTS(board, player, 100, tree)
+          played += 1
+          if move not in moves:
+            break
+          correct += 1
+        else:
+          move = rng.choice(moves)
+        board = play_move(board, player, move[0], move[1])
+        player = 3 - player
+        moves = get_possible_moves(board, player)
+
+    print("MCTS chose a legal move for {} of {} positions".format(correct, len(positions) + played))
+
+if test_protocol:
+
+    print('Testing Bitboard Protocol')
+    positions = random_positions(20, 4, 390) + random_positions(20, 6, 390) + random_positions(20, 8, 390)
+    correct = 0
+    for board, player in positions:
+      line = othello_bitboard.encode_board(othello_bitboard.from_tuple(board), player)
+      (decoded, decoded_player) = othello_bitboard.decode_board(line)
+      if othello_bitboard.to_tuple(decoded) == board and decoded_player == player:
+        correct += 1
+
+    print("encode_board and decode_board round-tripped {} of {} random positions".format(correct, len(positions)))
+
+    malformed = ["", "B 4 240 420", "X 4 240 420 1", "B 4 240 420 3", "B 4 240 240 1", "B 4 10000 420 1", "B 4 24g 420 1"]
+    rejected = 0
+    for line in malformed:
+      try:
+        othello_bitboard.decode_board(line)
+      except ValueError:
+        rejected += 1
+
+    print("decode_board rejected {} of {} malformed lines".format(rejected, len(malformed)))
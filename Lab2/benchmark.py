@@ -0,0 +1,526 @@
+import random
+import subprocess
+import sys
+import time
+
+# import student's functions
+import agent
+import agent_competition
+import othello_bitboard
+import othello_eval
+from othello_game import OthelloGameManager
+from othello_shared import get_possible_moves, get_score, play_move
+
+#Select what to benchmark
+bench_backends = True
+bench_transposition = True
+bench_iterative_deepening = True
+bench_pvs = True
+bench_move_ordering = True
+bench_make_unmake = True
+bench_parallel = True
+bench_evaluation = True
+bench_batched_leaves = True
+bench_mcts = True
+bench_parallel_mcts = True
+bench_protocol = True
+
+DEPTH = 4 #depth limit of the searches
+GAME_TIME = 30 #seconds per side per game for iterative deepening
+POSITIONS = 5 #midgame positions per board size
+WORKERS = [1, 2, 4, 8] #worker processes of the parallel search
+BATCH_SIZES = [8, 16, 32, 64, 128, 256] #boards per batched evaluation
+PLAYOUTS = 1000 #MCTS playouts per move
+GAMES = 6 #games per match, half of them as dark
+MOVE_TIME = 2.0 #seconds per move of the parallel MCTS benchmark
+ROUND_TRIPS = 200 #boards sent per protocol in the IPC benchmark
+
+#an AI that reads each board as run_ai does and answers at once, to time the pipe
+ECHO_AI = """
+import othello_bitboard
+protocol = int(input().split(",")[5])
+while True:
+  input()
+  line = input()
+  board = othello_bitboard.decode_board(line) if protocol == othello_bitboard.BITBOARD_PROTOCOL else eval(line)
+  print("0 0", flush=True)
+"""
+
+#the bigboards of autograder.py
+BIGBOARDS = [((0, 0, 0, 0, 0, 0), (0, 0, 2, 2, 0, 0), (0, 1, 1, 2, 2, 0), (2, 2, 1, 2, 0, 0), (0, 1, 0, 1, 2, 0), (0, 0, 0, 0, 0, 0)),
+((0, 0, 0, 0, 0, 0), (0, 0, 1, 2, 0, 0), (0, 1, 1, 1, 1, 0), (2, 2, 1, 2, 0, 0), (0, 1, 0, 1, 2, 0), (0, 0, 0, 0, 0, 0)),
+((0, 0, 0, 0, 1, 0), (0, 0, 1, 1, 0, 0), (0, 1, 1, 1, 1, 0), (2, 2, 1, 2, 0, 0), (0, 2, 0, 1, 2, 0), (0, 0, 2, 2, 1, 0)),
+((0, 0, 0, 0, 0, 0), (0, 0, 0, 2, 0, 0), (0, 1, 2, 2, 2, 0), (0, 2, 2, 2, 0, 0), (0, 1, 0, 0, 0, 0), (0, 0, 0, 0, 0, 0)),
+((0, 0, 0, 0, 0, 0), (0, 0, 0, 2, 0, 0), (0, 1, 2, 1, 1, 0), (0, 2, 2, 2, 0, 0), (0, 1, 0, 0, 0, 0), (0, 0, 0, 0, 0, 0))]
+
+def random_position(dimension, plies, seed):
+  '''(board, color to move) reached by plies random moves from the initial board'''
+  rng = random.Random(seed)
+  board = tuple(tuple(row) for row in OthelloGameManager(dimension).board)
+  color = 1
+  for _ in range(plies):
+    moves = get_possible_moves(board, color)
+    if not moves:
+      break
+    i, j = rng.choice(moves)
+    board = play_move(board, color, i, j)
+    color = 3 - color
+  return board, color
+
+def play_game(dimension, players):
+  '''
+  Play a game between players[1] (dark) and players[2] (light), functions
+  (board, color) -> (i, j). The game ends when the player to move has no
+  move, as in othello_game. Returns the final (dark, light) score.
+  '''
+  board = tuple(tuple(row) for row in OthelloGameManager(dimension).board)
+  color = 1
+  while get_possible_moves(board, color):
+    i, j = players[color](board, color)
+    board = play_move(board, color, i, j)
+    color = 3 - color
+  return get_score(board)
+
+def match(dimension, make_player, make_opponent, games = GAMES):
+  '''(wins, draws, losses) of the players make_player(color, game) against make_opponent(color, game) over games games'''
+  results = [0, 0, 0]
+  for game in range(games):
+    color = 1 + game % 2
+    players = [None, None, None]
+    players[color] = make_player(color, game)
+    players[3 - color] = make_opponent(3 - color, game)
+    score = play_game(dimension, players)
+    results[0 if score[color - 1] > score[2 - color] else 1 if score[0] == score[1] else 2] += 1
+  return tuple(results)
+
+def board_bytes(board):
+  '''Bytes of a board object, with its rows or masks'''
+  if isinstance(board, tuple):
+    return sys.getsizeof(board) + sum(sys.getsizeof(row) for row in board)
+  return sys.getsizeof(board) + sys.getsizeof(board.dark) + sys.getsizeof(board.light)
+
+def scan_heuristic(board, color):
+  '''agent.compute_heuristic before othello_eval: parity, mobility from a find_lines scan, 10 per corner'''
+  score = get_score(board)
+  heuristic_1 = score[0] - score[1] if color == 1 else score[1] - score[0]
+  heuristic_2 = len(get_possible_moves(board, color))
+  count = 0
+  board_dimension = len(board) - 1
+  for corner in [(0, 0), (0, board_dimension), (board_dimension, 0), (board_dimension, board_dimension)]:
+    if board[corner[0]][corner[1]] == color:
+      count += 1
+  return heuristic_1 + heuristic_2 + count * 10
+
+def midgame_positions(dimension, count = POSITIONS):
+  plies = (dimension * dimension - 4) // 3
+  return [random_position(dimension, plies, seed) for seed in range(count)]
+
+if __name__ == '__main__':
+  if bench_backends:
+
+    ##############################################################
+    # TUPLE BOARDS VERSUS BITBOARDS
+    print('Benchmarking alphabeta_max_node on tuple boards and bitboards (depth {})'.format(DEPTH))
+
+    print("{:>5} {:>10} {:>10} {:>10} {:>12} {:>9}".format("dim", "backend", "nodes", "time (s)", "nodes/sec", "speedup"))
+    for dimension in [6, 8, 10]:
+      positions = midgame_positions(dimension)
+      base_rate = None
+      results = []
+      for backend in ['tuple', 'bitboard']:
+        agent.set_backend(backend)
+        agent.node_count = 0
+        start_time = time.perf_counter()
+        for board, color in positions:
+          results.append(agent.alphabeta_max_node(agent.to_backend(board), color, float("-inf"), float("inf"), DEPTH))
+        elapsed = time.perf_counter() - start_time
+        rate = agent.node_count / elapsed
+        base_rate = base_rate or rate
+        print("{:>5} {:>10} {:>10} {:>10.2f} {:>12.0f} {:>9.2f}".format(dimension, backend, agent.node_count, elapsed, rate, rate / base_rate))
+      if results[:len(positions)] != results[len(positions):]:
+        print("The backends disagree on the moves or values of {}x{} boards".format(dimension, dimension))
+    agent.set_backend('tuple')
+    print("*************************************\n")
+    ##############################################################
+
+  if bench_transposition:
+
+    ##############################################################
+    # TRANSPOSITION TABLE OVER WHOLE GAMES
+    print('Benchmarking full games of alpha-beta (depth {}) against itself, bitboard backend'.format(DEPTH))
+
+    agent.set_backend('bitboard')
+    print("{:>5} {:>8} {:>8} {:>10} {:>10} {:>9} {:>9} {:>10}".format("dim", "caching", "score", "nodes", "time (s)", "hit rate", "cutoffs", "table (MB)"))
+    for dimension in [6, 8]:
+      for caching in [0, 1]:
+        agent.transposition_table.clear()
+        agent.node_count = 0
+        player = lambda board, color: agent.select_move_alphabeta(board, color, DEPTH, caching)
+        start_time = time.perf_counter()
+        score = play_game(dimension, [None, player, player])
+        elapsed = time.perf_counter() - start_time
+        table = agent.transposition_table
+        print("{:>5} {:>8} {:>8} {:>10} {:>10.2f} {:>9.1%} {:>9} {:>10.1f}".format(dimension, caching, "{}:{}".format(*score),
+              agent.node_count, elapsed, table.hit_rate(), table.cutoffs, table.nbytes() / 2**20))
+    agent.set_backend('tuple')
+    print("*************************************\n")
+    ##############################################################
+
+  if bench_iterative_deepening:
+
+    ##############################################################
+    # ITERATIVE DEEPENING WITHIN A TIME BUDGET
+    print('Benchmarking iterative deepening ({} s per game) against alpha-beta (depth {}), bitboard backend'.format(GAME_TIME, DEPTH))
+
+    agent.set_backend('bitboard')
+    print("{:>5} {:>6} {:>8} {:>10} {:>10} {:>12} {:>14}".format("dim", "ID is", "score", "ID moves", "mean depth", "max move (s)", "game time (s)"))
+    for dimension in [6, 8]:
+      for id_color in [1, 2]:
+        time_manager = agent.TimeManager(game_time=GAME_TIME)
+        depths = []; move_times = []
+        def iterative(board, color):
+          start_time = time.perf_counter()
+          move = agent.select_move_iterative(board, color, time_manager, 1)
+          move_times.append(time.perf_counter() - start_time)
+          depths.append(time_manager.depth)
+          return move
+        fixed = lambda board, color: agent.select_move_alphabeta(board, color, DEPTH, 1)
+        players = [None, iterative, fixed] if id_color == 1 else [None, fixed, iterative]
+        score = play_game(dimension, players)
+        print("{:>5} {:>6} {:>8} {:>10} {:>10.1f} {:>12.2f} {:>14.2f}".format(dimension, "dark" if id_color == 1 else "light",
+              "{}:{}".format(*score), len(depths), sum(depths) / len(depths), max(move_times), time_manager.used))
+    agent.set_backend('tuple')
+    print("*************************************\n")
+    ##############################################################
+
+  if bench_pvs:
+
+    ##############################################################
+    # PRINCIPAL VARIATION SEARCH AGAINST ALPHA-BETA
+    print('Benchmarking PVS against alpha-beta on the autograder bigboards (depth 6), bitboard backend')
+
+    agent.set_backend('bitboard')
+    print("{:>9} {:>9} {:>10} {:>10} {:>10} {:>12}".format("search", "ordering", "nodes", "time (s)", "nodes (%)", "same moves"))
+    for ordering in [0, 1]:
+      moves = {}
+      base_nodes = None
+      for name, select_move in [('alphabeta', agent.select_move_alphabeta), ('pvs', agent.select_move_pvs)]:
+        agent.node_count = 0
+        start_time = time.perf_counter()
+        moves[name] = [select_move(board, color, 6, 0, ordering) for board in BIGBOARDS for color in [1, 2]]
+        elapsed = time.perf_counter() - start_time
+        base_nodes = base_nodes or agent.node_count
+        print("{:>9} {:>9} {:>10} {:>10.2f} {:>10.1f} {:>12}".format(name, ordering, agent.node_count, elapsed,
+              100.0 * agent.node_count / base_nodes, str(moves[name] == moves['alphabeta'])))
+
+    print('Benchmarking full 8x8 games against itself, iterative deepening to depth {}, caching and ordering on'.format(DEPTH + 1))
+    print("{:>22} {:>8} {:>10} {:>10} {:>10}".format("search", "score", "nodes", "time (s)", "nodes (%)"))
+    base_nodes = None
+    for search in ['alphabeta', 'pvs']:
+      time_manager = agent.TimeManager(move_timeout=float("inf"))
+      player = lambda board, color: agent.select_move_iterative(board, color, time_manager, 1, 1, DEPTH + 1, search)
+      agent.transposition_table.clear()
+      agent.node_count = 0
+      start_time = time.perf_counter()
+      score = play_game(8, [None, player, player])
+      elapsed = time.perf_counter() - start_time
+      base_nodes = base_nodes or agent.node_count
+      name = 'pvs + aspiration' if search == 'pvs' else search
+      print("{:>22} {:>8} {:>10} {:>10.2f} {:>10.1f}".format(name, "{}:{}".format(*score), agent.node_count, elapsed, 100.0 * agent.node_count / base_nodes))
+    agent.set_backend('tuple')
+    print("*************************************\n")
+    ##############################################################
+
+  if bench_move_ordering:
+
+    ##############################################################
+    # MOVE ORDERING AND CUTOFF RATES
+    print('Benchmarking move ordering on the autograder bigboards (depth 6) and 8x8 midgame positions (depth {}), bitboard backend'.format(DEPTH + 1))
+
+    agent.set_backend('bitboard')
+    positions = [(board, color, 6) for board in BIGBOARDS for color in [1, 2]] + [(board, color, DEPTH + 1) for board, color in midgame_positions(8)]
+    print("{:>9} {:>8} {:>9} {:>10} {:>10} {:>10} {:>12} {:>13}".format("search", "caching", "ordering", "nodes", "time (s)", "cutoffs", "first move", "moves/cutoff"))
+    for name, select_move in [('alphabeta', agent.select_move_alphabeta), ('pvs', agent.select_move_pvs)]:
+      for caching, ordering in [(0, 0), (0, 1), (1, 1)]:
+        agent.transposition_table.clear()
+        agent.move_orderer.reset_stats()
+        agent.node_count = 0
+        start_time = time.perf_counter()
+        for board, color, depth in positions:
+          select_move(board, color, depth, caching, ordering)
+        elapsed = time.perf_counter() - start_time
+        orderer = agent.move_orderer
+        print("{:>9} {:>8} {:>9} {:>10} {:>10.2f} {:>10.1%} {:>12.1%} {:>13.2f}".format(name, caching, ordering, agent.node_count, elapsed,
+              orderer.cutoff_rate(), orderer.first_move_rate(), orderer.moves_before_cutoff / max(1, orderer.cutoffs)))
+    agent.set_backend('tuple')
+    print("*************************************\n")
+    ##############################################################
+
+  if bench_make_unmake:
+
+    ##############################################################
+    # NEW BOARDS PER MOVE VERSUS MAKE/UNMAKE IN PLACE
+    print('Benchmarking alphabeta on 8x8 midgame positions (depth {}, ordering on) with new boards and with make/unmake'.format(DEPTH + 1))
+
+    positions = midgame_positions(8)
+    print("{:>9} {:>8} {:>10} {:>10} {:>12} {:>12} {:>14} {:>12}".format("backend", "caching", "nodes", "time (s)", "nodes/sec", "new boards", "bytes/board", "undo records"))
+    for caching in [0, 1]:
+      for backend in ['tuple', 'bitboard', 'mutable']:
+        agent.set_backend(backend)
+        #count the boards the search allocates and the undo records it keeps
+        counts = {'boards': 0, 'undo': 0}
+        backend_play_move, backend_make_move = agent.play_move, agent.make_move
+        def counted_play_move(board, player, i, j):
+          counts['boards'] += 1
+          return backend_play_move(board, player, i, j)
+        def counted_make_move(board, player, i, j):
+          child, undo = backend_make_move(board, player, i, j)
+          if undo is not None:
+            counts['undo'] += 1
+          return child, undo
+        agent.play_move, agent.make_move = counted_play_move, counted_make_move
+        agent.transposition_table.clear()
+        agent.move_orderer = agent.MoveOrderer()
+        for board, color in positions:
+          agent.select_move_alphabeta(board, color, DEPTH + 1, caching, 1)
+        agent.play_move, agent.make_move = backend_play_move, backend_make_move
+
+        #then time the search, best of 3
+        elapsed = float("inf")
+        for _ in range(3):
+          agent.transposition_table.clear()
+          agent.move_orderer = agent.MoveOrderer()
+          agent.node_count = 0
+          start_time = time.perf_counter()
+          for board, color in positions:
+            agent.select_move_alphabeta(board, color, DEPTH + 1, caching, 1)
+          elapsed = min(elapsed, time.perf_counter() - start_time)
+        size = board_bytes(agent.to_backend(positions[0][0])) if counts['boards'] else 0
+        print("{:>9} {:>8} {:>10} {:>10.2f} {:>12.0f} {:>12} {:>14} {:>12}".format(backend, caching, agent.node_count, elapsed,
+              agent.node_count / elapsed, counts['boards'], size, counts['undo']))
+    agent.set_backend('tuple')
+    print("*************************************\n")
+    ##############################################################
+
+  if bench_parallel:
+
+    ##############################################################
+    # ROOT SPLITTING OVER WORKER PROCESSES
+    print('Benchmarking time to depth {} of iterative deepening on 8x8 midgame positions, with the root moves split over worker processes, mutable backend'.format(DEPTH + 1))
+    print('({} CPU cores available)'.format(agent.multiprocessing.cpu_count()))
+
+    agent.set_backend('mutable')
+    positions = midgame_positions(8)
+    print("{:>10} {:>10} {:>10} {:>9} {:>12}".format("workers", "nodes", "time (s)", "speedup", "same moves"))
+    base_time = None; base_moves = None
+    for workers in [0] + WORKERS:
+      splitter = agent.RootSplitter(workers) if workers else None
+      agent.transposition_table.clear()
+      agent.move_orderer = agent.MoveOrderer()
+      agent.node_count = 0
+      start_time = time.perf_counter()
+      moves = []
+      for board, color in positions:
+        time_manager = agent.TimeManager(move_timeout=float("inf"))
+        moves.append(agent.select_move_iterative(board, color, time_manager, 1, 1, DEPTH + 1, splitter=splitter))
+      elapsed = time.perf_counter() - start_time
+      if splitter is not None:
+        splitter.close()
+      base_time = base_time or elapsed
+      base_moves = base_moves or moves
+      print("{:>10} {:>10} {:>10.2f} {:>9.2f} {:>12}".format(workers if workers else "sequential", agent.node_count, elapsed,
+            base_time / elapsed, str(moves == base_moves)))
+    agent.set_backend('tuple')
+    print("*************************************\n")
+    ##############################################################
+
+  if bench_evaluation:
+
+    ##############################################################
+    # LEAF EVALUATION: BOARD SCAN VERSUS BITBOARD FEATURES
+    print('Benchmarking leaf evaluations per second of compute_heuristic on midgame positions')
+
+    all_features = othello_eval.Evaluator({'potential_mobility': 1, 'frontier': -1, 'stability': 5})
+    evaluators = [('scan (old)', 'tuple', scan_heuristic),
+                  ('default', 'tuple', agent.compute_heuristic),
+                  ('default', 'bitboard', agent.compute_heuristic),
+                  ('all features', 'bitboard', all_features.evaluate)]
+    print("{:>5} {:>14} {:>9} {:>12} {:>9} {:>10}".format("dim", "evaluator", "board", "evals/sec", "speedup", "same value"))
+    for dimension in [6, 8, 10]:
+      positions = [(board, color) for board, color in midgame_positions(dimension, 20) for color in [1, 2]]
+      expected = [scan_heuristic(board, color) for board, color in positions]
+      base_rate = None
+      for name, board_type, evaluate in evaluators:
+        boards = [(othello_bitboard.from_tuple(board) if board_type == 'bitboard' else board, color) for board, color in positions]
+        repeat = 20
+        start_time = time.perf_counter()
+        for _ in range(repeat):
+          values = [evaluate(board, color) for board, color in boards]
+        elapsed = time.perf_counter() - start_time
+        rate = repeat * len(boards) / elapsed
+        base_rate = base_rate or rate
+        print("{:>5} {:>14} {:>9} {:>12.0f} {:>9.2f} {:>10}".format(dimension, name, board_type, rate, rate / base_rate,
+              str(values == expected) if name != 'all features' else '-'))
+    print("*************************************\n")
+    ##############################################################
+
+  if bench_batched_leaves:
+
+    ##############################################################
+    # BATCHED LEAF EVALUATION
+    print('Benchmarking leaf evaluations per second one board at a time and in NumPy batches, midgame positions')
+
+    evaluator = othello_eval.Evaluator()
+    print("{:>5} {:>11} {:>7} {:>12} {:>12} {:>9} {:>10}".format("dim", "evaluation", "batch", "scalar/sec", "batched/sec", "speedup", "same value"))
+    for dimension in [10, 12, 16]:
+      positions = [othello_bitboard.from_tuple(board) for board, _ in midgame_positions(dimension, max(BATCH_SIZES))]
+      for name, scalar, wanted in [('utility', lambda board: othello_eval.features(board, 1, ['parity'])['parity'], ['parity']),
+                                   ('heuristic', lambda board: evaluator.evaluate(board, 1), evaluator.wanted)]:
+        for size in BATCH_SIZES:
+          boards = positions[:size]
+          repeat = max(1, 512 // size)
+          start_time = time.perf_counter()
+          for _ in range(repeat):
+            expected = [scalar(board) for board in boards]
+          scalar_rate = repeat * size / (time.perf_counter() - start_time)
+          start_time = time.perf_counter()
+          for _ in range(repeat):
+            stacked = othello_eval.stack(boards)
+            if name == 'utility':
+              values = othello_eval.batch_features(stacked, 1, wanted)['parity'].tolist()
+            else:
+              values = evaluator.evaluate_batch(stacked, 1).tolist()
+          batched_rate = repeat * size / (time.perf_counter() - start_time)
+          print("{:>5} {:>11} {:>7} {:>12.0f} {:>12.0f} {:>9.2f} {:>10}".format(dimension, name, size, scalar_rate, batched_rate,
+                batched_rate / scalar_rate, str(values == expected)))
+
+    print('Benchmarking alphabeta (depth {}, ordering on) with scalar and batched leaves on 10x10 midgame positions'.format(DEPTH))
+    positions = midgame_positions(10)
+    print("{:>9} {:>9} {:>10} {:>10} {:>12}".format("backend", "leaves", "nodes", "time (s)", "same moves"))
+    for backend in ['tuple', 'bitboard', 'mutable']:
+      agent.set_backend(backend)
+      moves = {}
+      for leaves in agent.LEAF_EVALUATIONS:
+        agent.set_leaf_evaluation(leaves)
+        agent.move_orderer = agent.MoveOrderer()
+        agent.node_count = 0
+        start_time = time.perf_counter()
+        moves[leaves] = [agent.select_move_alphabeta(board, color, DEPTH, 0, 1) for board, color in positions]
+        elapsed = time.perf_counter() - start_time
+        print("{:>9} {:>9} {:>10} {:>10.2f} {:>12}".format(backend, leaves, agent.node_count, elapsed, str(moves[leaves] == moves['scalar'])))
+    agent.set_leaf_evaluation('scalar')
+    agent.set_backend('tuple')
+    print("*************************************\n")
+    ##############################################################
+
+  if bench_mcts:
+
+    ##############################################################
+    # MONTE CARLO TREE SEARCH
+    print('Benchmarking MCTS playouts per second from the initial and midgame positions')
+
+    print("{:>5} {:>10} {:>10} {:>10} {:>13} {:>12}".format("dim", "position", "playouts", "time (s)", "playouts/sec", "tree nodes"))
+    for dimension in [6, 8, 10]:
+      initial = tuple(tuple(row) for row in OthelloGameManager(dimension).board)
+      for name, positions in [('initial', [(initial, 1)]), ('midgame', midgame_positions(dimension))]:
+        playouts = 0; nodes = 0
+        start_time = time.perf_counter()
+        for board, color in positions:
+          tree = agent_competition.MCTS(color, 0)
+          tree.search(board, PLAYOUTS)
+          playouts += tree.playouts; nodes += len(tree)
+        elapsed = time.perf_counter() - start_time
+        print("{:>5} {:>10} {:>10} {:>10.2f} {:>13.0f} {:>12}".format(dimension, name, playouts, elapsed, playouts / elapsed, nodes))
+
+    print('Benchmarking MCTS ({} playouts per move, tree reuse on) against randy and alpha-beta (depth {}, ordering on), {} games each'.format(PLAYOUTS, DEPTH, GAMES))
+    def mcts_player(color, game):
+      tree = agent_competition.MCTS(color, game)
+      return lambda board, color: agent_competition.select_move_MCTS(board, color, PLAYOUTS, tree)
+    def randy_player(color, game):
+      rng = random.Random(game)
+      return lambda board, color: rng.choice(get_possible_moves(board, color))
+    def alphabeta_player(color, game):
+      return lambda board, color: agent.select_move_alphabeta(board, color, DEPTH, 0, 1)
+    agent.set_backend('bitboard')
+    print("{:>5} {:>10} {:>6} {:>6} {:>7} {:>9} {:>10}".format("dim", "opponent", "wins", "draws", "losses", "win rate", "time (s)"))
+    for dimension in [6, 8]:
+      for name, opponent in [('randy', randy_player), ('alphabeta', alphabeta_player)]:
+        start_time = time.perf_counter()
+        wins, draws, losses = match(dimension, mcts_player, opponent)
+        elapsed = time.perf_counter() - start_time
+        print("{:>5} {:>10} {:>6} {:>6} {:>7} {:>9.1%} {:>10.2f}".format(dimension, name, wins, draws, losses, (wins + 0.5 * draws) / GAMES, elapsed))
+    agent.set_backend('tuple')
+    print("*************************************\n")
+    ##############################################################
+
+  if bench_parallel_mcts:
+
+    ##############################################################
+    # ROOT-PARALLEL AND LEAF-PARALLEL MCTS
+    print('Benchmarking MCTS playouts in {} s per move on 8x8 midgame positions, over worker processes'.format(MOVE_TIME))
+    print('({} CPU cores available)'.format(agent.multiprocessing.cpu_count()))
+
+    positions = midgame_positions(8)
+    print("{:>14} {:>8} {:>10} {:>13} {:>9}".format("search", "workers", "playouts", "playouts/sec", "speedup"))
+    base_rate = None
+    for name, mode, counts in [('sequential', None, [1]), ('root-parallel', agent_competition.ROOT_PARALLEL, WORKERS),
+                               ('leaf-parallel', agent_competition.LEAF_PARALLEL, WORKERS)]:
+      for workers in counts:
+        playouts = 0
+        start_time = time.perf_counter()
+        for board, color in positions:
+          if mode is None:
+            tree = agent_competition.MCTS(color, 0)
+          else:
+            tree = agent_competition.ParallelMCTS(color, workers, mode)
+          tree.search(board, None, time.perf_counter() + MOVE_TIME)
+          playouts += tree.playouts
+          if mode is not None:
+            tree.close()
+        rate = playouts / (time.perf_counter() - start_time)
+        base_rate = base_rate or rate
+        print("{:>14} {:>8} {:>10} {:>13.0f} {:>9.2f}".format(name, workers, playouts, rate, rate / base_rate))
+    print("*************************************\n")
+    ##############################################################
+
+  if bench_protocol:
+
+    ##############################################################
+    # BOARD PROTOCOLS: EVAL OF PYTHON ROWS VERSUS HEX BITBOARD LINES
+    print('Benchmarking the per-move cost of sending the board to an AI, {} boards per protocol'.format(ROUND_TRIPS))
+
+    print("{:>5} {:>9} {:>12} {:>14} {:>14} {:>14}".format("dim", "protocol", "line bytes", "encode (us)", "decode (us)", "round trip (us)"))
+    for dimension in [6, 8, 10, 16]:
+      boards = [[list(row) for row in board] for board, _ in midgame_positions(dimension, 10)] #as the manager keeps them
+      for protocol, name in [(othello_bitboard.EVAL_PROTOCOL, 'eval'), (othello_bitboard.BITBOARD_PROTOCOL, 'bitboard')]:
+        if protocol == othello_bitboard.BITBOARD_PROTOCOL:
+          encode = lambda board: othello_bitboard.encode_board(othello_bitboard.from_tuple(board), 1)
+          decode = othello_bitboard.decode_board
+        else:
+          encode, decode = str, eval
+        repeat = ROUND_TRIPS // len(boards)
+        start_time = time.perf_counter()
+        for _ in range(repeat):
+          lines = [encode(board) for board in boards]
+        encode_time = (time.perf_counter() - start_time) / (repeat * len(boards))
+        start_time = time.perf_counter()
+        for _ in range(repeat):
+          for line in lines:
+            decode(line)
+        decode_time = (time.perf_counter() - start_time) / (repeat * len(boards))
+
+        #the whole exchange of a move, through the pipe to a process
+        process = subprocess.Popen([sys.executable, '-c', ECHO_AI], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        process.stdin.write("1,4,0,0,0,{}\n".format(protocol).encode("ASCII"))
+        start_time = time.perf_counter()
+        for k in range(ROUND_TRIPS):
+          process.stdin.write("SCORE 2 2\n{}\n".format(encode(boards[k % len(boards)])).encode("ASCII"))
+          process.stdin.flush()
+          process.stdout.readline()
+        round_trip = (time.perf_counter() - start_time) / ROUND_TRIPS
+        process.kill()
+        process.wait()
+        print("{:>5} {:>9} {:>12} {:>14.1f} {:>14.1f} {:>14.1f}".format(dimension, name, len(lines[0]), 1e6 * encode_time,
+              1e6 * decode_time, 1e6 * round_trip))
+    print("*************************************\n")
+    ##############################################################
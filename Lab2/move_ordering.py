@@ -0,0 +1,124 @@
+"""
+Move ordering for the Othello alpha-beta searches.
+
+A MoveOrderer sorts the legal moves of a node without playing them:
+
+1. the hash move, the best move the transposition table holds for the node
+2. the killer moves, the last two moves that caused a cutoff at another
+   node with as many discs on the board
+3. the other moves, by their history score (the sum of depth * depth
+   over the cutoffs they caused, for the player to move) plus the static
+   value of their square (see square_values)
+
+The searches then play the moves one at a time, in that order, so the
+children after a cutoff are never generated.
+
+The orderer also keeps cutoff statistics: of the interior nodes searched,
+how many ended in a cutoff, how many of those cut off on the first move
+searched and how many moves were searched on average before a cutoff.
+"""
+from othello_bitboard import BitBoard, popcount
+
+KILLERS = 2 #killer moves kept per disc count
+
+def square_values(dimension):
+    """
+    Static value of each square (i, j): corners are good; the squares next
+    to a corner, which can give it away, are bad; other edge squares are
+    good, as they are harder to flip.
+    """
+    n = dimension
+    edge = (0, n - 1)
+    near = (1, n - 2)
+    values = {}
+    for i in range(n):
+        for j in range(n):
+            if i in edge and j in edge:
+                value = 100
+            elif i in near and j in near and n > 4:
+                value = -50 #X-square, diagonal to a corner
+            elif (i in edge and j in near) or (j in edge and i in near):
+                value = -20 #C-square, next to a corner on the edge
+            elif i in edge or j in edge:
+                value = 10
+            else:
+                value = 0
+            values[(i, j)] = value
+    return values
+
+def disc_count(board):
+    if isinstance(board, BitBoard):
+        return popcount(board.dark | board.light)
+    return sum(1 for row in board for square in row if square != 0)
+
+class MoveOrderer(object):
+    """Hash move, killer moves, history heuristic and square values"""
+
+    def __init__(self):
+        self.squares = {}  #dimension -> square values
+        self.killers = {}  #disc count -> [killer moves], most recent first
+        self.history = {}  #(color, move) -> history score
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.nodes = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.moves_before_cutoff = 0
+
+    def new_search(self):
+        """Forget the killers and age the history of the previous search"""
+        self.killers = {}
+        for key in self.history:
+            self.history[key] //= 2
+
+    def order(self, board, color, moves, hash_move = None):
+        """moves, the legal moves of color on board, best first"""
+        n = len(board)
+        if n not in self.squares:
+            self.squares[n] = square_values(n)
+        squares = self.squares[n]
+        history = self.history
+        killers = self.killers.get(disc_count(board), ())
+
+        def score(move):
+            if move == hash_move:
+                return 1 << 40
+            if move in killers:
+                return (1 << 30) - killers.index(move)
+            return history.get((color, move), 0) + squares[move]
+
+        return sorted(moves, key=score, reverse=True)
+
+    def searched(self, board, color, move, limit, index):
+        """
+        Record an interior node: move, the index-th move searched, caused a
+        cutoff, or move is None if no move did.
+        """
+        self.nodes += 1
+        if move is None:
+            return
+        self.cutoffs += 1
+        self.moves_before_cutoff += index + 1
+        if index == 0:
+            self.first_move_cutoffs += 1
+        key = (color, move)
+        self.history[key] = self.history.get(key, 0) + limit * limit
+        ply = disc_count(board)
+        killers = self.killers.setdefault(ply, [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[KILLERS:]
+
+    def cutoff_rate(self):
+        """Fraction of the interior nodes that ended in a cutoff"""
+        return self.cutoffs / self.nodes if self.nodes else 0.0
+
+    def first_move_rate(self):
+        """Fraction of the cutoffs that happened on the first move searched"""
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    def report(self):
+        return "{} interior nodes, {} cutoffs ({:.1%}), {:.1%} on the first move, {:.2f} moves searched per cutoff".format(
+            self.nodes, self.cutoffs, self.cutoff_rate(), self.first_move_rate(),
+            self.moves_before_cutoff / self.cutoffs if self.cutoffs else 0.0)
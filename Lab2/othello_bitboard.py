@@ -0,0 +1,285 @@
+"""
+A bitboard backend for Othello, compatible with othello_shared.
+
+A BitBoard keeps the dark (player 1) and light (player 2) discs of a
+dimension x dimension board as two Python ints, one bit per square. Square
+(i,j), column i and row j, is bit i*dimension + j, so that walking the bits
+from low to high visits the squares in the same order as
+othello_shared.get_possible_moves. Python ints are unbounded, so any
+dimension works; on the standard 8x8 board each side fits in 64 bits.
+
+Moves, flips and scores are computed with shifts and masks over whole
+boards instead of walking lines square by square. get_possible_moves,
+play_move and get_score take and return BitBoards but otherwise behave as
+their othello_shared counterparts. from_tuple and to_tuple convert between
+the two representations.
+
+A BitBoard can also be read like a tuple board (board[j][i], len(board)),
+so code written against tuple boards keeps working, only more slowly.
+
+encode_board and decode_board write and read the line the game manager
+sends the AIs a board in with the bitboard protocol (see
+othello_game.AiPlayerInterface):
+
+    B <dimension> <dark discs in hex> <light discs in hex> <player to move>
+
+e.g., "B 4 240 420 1" for the initial 4x4 board.
+"""
+
+try:
+    popcount = int.bit_count
+except AttributeError: #Python < 3.10
+    def popcount(x):
+        return bin(x).count("1")
+
+_GEOMETRY = {}
+
+def geometry(dimension):
+    """
+    (full board mask, [(shift, mask)] for the 8 directions) of a board of
+    the given dimension. A positive shift moves bits up, a negative one
+    down; the mask clears the bits that wrapped around to the other side
+    of a column.
+    """
+    if dimension not in _GEOMETRY:
+        n = dimension
+        full = (1 << (n * n)) - 1
+        first_row = 0
+        last_row = 0
+        for i in range(n):
+            first_row |= 1 << (i * n)
+            last_row |= 1 << (i * n + n - 1)
+        not_first_row = full & ~first_row
+        not_last_row = full & ~last_row
+        directions = [(1, not_first_row),            #j + 1
+                      (-1, not_last_row),            #j - 1
+                      (n, full),                     #i + 1
+                      (-n, full),                    #i - 1
+                      (n + 1, not_first_row),        #i + 1, j + 1
+                      (n - 1, not_last_row),         #i + 1, j - 1
+                      (-n + 1, not_first_row),       #i - 1, j + 1
+                      (-n - 1, not_last_row)]        #i - 1, j - 1
+        _GEOMETRY[dimension] = (full, directions)
+    return _GEOMETRY[dimension]
+
+def shift(bits, amount, mask):
+    if amount > 0:
+        return (bits << amount) & mask
+    return (bits >> -amount) & mask
+
+class BitBoard(object):
+    """
+    An immutable Othello board: dimension and the dark and light disc masks.
+    """
+    __slots__ = ('dimension', 'dark', 'light')
+
+    def __init__(self, dimension, dark, light):
+        self.dimension = dimension
+        self.dark = dark
+        self.light = light
+
+    def discs(self, player):
+        """(discs of player, discs of the opponent)"""
+        if player == 1:
+            return self.dark, self.light
+        return self.light, self.dark
+
+    def __eq__(self, other):
+        return (isinstance(other, BitBoard) and self.dark == other.dark and
+                self.light == other.light and self.dimension == other.dimension)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((self.dark, self.light))
+
+    def __len__(self):
+        return self.dimension
+
+    def __getitem__(self, j):
+        """Row j, as in a tuple board"""
+        if j < 0:
+            j += self.dimension
+        if not 0 <= j < self.dimension:
+            raise IndexError("board row out of range")
+        row = []
+        for i in range(self.dimension):
+            bit = 1 << (i * self.dimension + j)
+            row.append(1 if self.dark & bit else 2 if self.light & bit else 0)
+        return tuple(row)
+
+    def __iter__(self):
+        for j in range(self.dimension):
+            yield self[j]
+
+    def __repr__(self):
+        return "BitBoard({}, {:#x}, {:#x})".format(self.dimension, self.dark, self.light)
+
+def from_tuple(board):
+    """The BitBoard of a tuple (or list) board"""
+    n = len(board)
+    dark = 0
+    light = 0
+    for j in range(n):
+        row = board[j]
+        for i in range(n):
+            if row[i] == 1:
+                dark |= 1 << (i * n + j)
+            elif row[i] == 2:
+                light |= 1 << (i * n + j)
+    return BitBoard(n, dark, light)
+
+def to_tuple(board):
+    """The tuple board of a BitBoard"""
+    return tuple(board[j] for j in range(board.dimension))
+
+# how the game manager sends the board to an AI: the str() of the tuple board,
+# read back with eval, or the line of encode_board
+EVAL_PROTOCOL, BITBOARD_PROTOCOL = 0, 1
+
+def encode_board(board, player):
+    """The protocol line of board (a BitBoard) with player to move"""
+    return "B {} {:x} {:x} {}".format(board.dimension, board.dark, board.light, player)
+
+def decode_board(line):
+    """(BitBoard, player to move) of a line written by encode_board"""
+    fields = line.split()
+    if len(fields) != 5 or fields[0] != "B":
+        raise ValueError("not a bitboard line: {!r}".format(line))
+    dimension, dark, light, player = int(fields[1]), int(fields[2], 16), int(fields[3], 16), int(fields[4])
+    if dimension <= 0 or (dark | light) >> (dimension * dimension) or dark & light or player not in (1, 2):
+        raise ValueError("invalid bitboard line: {!r}".format(line))
+    return BitBoard(dimension, dark, light), player
+
+def move_mask(board, player):
+    """Bits of the squares player can play on"""
+    own, opp = board.discs(player)
+    full, directions = geometry(board.dimension)
+    empty = full & ~(own | opp)
+    moves = 0
+    for amount, mask in directions:
+        x = shift(own, amount, mask) & opp
+        #a line of opponent discs is at most dimension - 2 long
+        for _ in range(board.dimension - 3):
+            x |= shift(x, amount, mask) & opp
+        moves |= shift(x, amount, mask) & empty
+    return moves
+
+def flip_mask(board, player, square):
+    """Bits of the discs flipped when player plays on square (a bit index)"""
+    own, opp = board.discs(player)
+    full, directions = geometry(board.dimension)
+    move = 1 << square
+    flips = 0
+    for amount, mask in directions:
+        line = 0
+        x = shift(move, amount, mask)
+        while x & opp:
+            line |= x
+            x = shift(x, amount, mask)
+        if x & own:
+            flips |= line
+    return flips
+
+def squares(bits):
+    """Bit indices of the set bits of bits, lowest first"""
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+def get_possible_moves(board, player):
+    """
+    Return a list of all possible (column,row) tuples that player can play on
+    the current board.
+    """
+    n = board.dimension
+    return [divmod(square, n) for square in squares(move_mask(board, player))]
+
+def play_move(board, player, i, j):
+    square = i * board.dimension + j
+    flips = flip_mask(board, player, square) | (1 << square)
+    if player == 1:
+        return BitBoard(board.dimension, board.dark | flips, board.light & ~flips)
+    return BitBoard(board.dimension, board.dark & ~flips, board.light | flips)
+
+def get_score(board):
+    return popcount(board.dark), popcount(board.light)
+
+class MutableBitBoard(BitBoard):
+    """
+    A BitBoard that is played on in place: make_move plays a move and
+    returns an undo record, unmake_move takes the move back. The disc counts
+    and, if the board is given Zobrist numbers, the Zobrist key of the board
+    are updated with every move instead of being recomputed. The numbers are
+    (dark, light, dark ^ light) lists indexed by square, see
+    transposition.Zobrist.
+    """
+    __slots__ = ('dark_count', 'light_count', 'numbers', 'key')
+
+    __hash__ = None #mutable
+
+    def __init__(self, dimension, dark, light, numbers = None):
+        BitBoard.__init__(self, dimension, dark, light)
+        self.dark_count = popcount(dark)
+        self.light_count = popcount(light)
+        self.numbers = numbers
+        self.key = 0
+        if numbers is not None:
+            for square in squares(dark):
+                self.key ^= numbers[0][square]
+            for square in squares(light):
+                self.key ^= numbers[1][square]
+
+    def copy(self):
+        return MutableBitBoard(self.dimension, self.dark, self.light, self.numbers)
+
+    def make_move(self, player, i, j):
+        """
+        Play player on (i,j). Returns the undo record (player, square, flipped
+        squares, key and disc counts before the move) to give to unmake_move.
+        """
+        square = i * self.dimension + j
+        flips = flip_mask(self, player, square)
+        undo = (player, square, flips, self.key, self.dark_count, self.light_count)
+        flipped = popcount(flips)
+        if player == 1:
+            self.dark |= flips | (1 << square)
+            self.light &= ~flips
+            self.dark_count += flipped + 1
+            self.light_count -= flipped
+        else:
+            self.light |= flips | (1 << square)
+            self.dark &= ~flips
+            self.light_count += flipped + 1
+            self.dark_count -= flipped
+        numbers = self.numbers
+        if numbers is not None:
+            key = self.key ^ numbers[player - 1][square]
+            both = numbers[2]
+            while flips:
+                low = flips & -flips
+                key ^= both[low.bit_length() - 1]
+                flips ^= low
+            self.key = key
+        return undo
+
+    def unmake_move(self, undo):
+        player, square, flips, self.key, self.dark_count, self.light_count = undo
+        if player == 1:
+            self.dark &= ~(flips | (1 << square))
+            self.light |= flips
+        else:
+            self.light &= ~(flips | (1 << square))
+            self.dark |= flips
+
+def make_move(board, player, i, j):
+    """Play player on (i,j) of a MutableBitBoard in place, returns (board, undo record)"""
+    return board, MutableBitBoard.make_move(board, player, i, j)
+
+unmake_move = MutableBitBoard.unmake_move
+
+def get_counts(board):
+    """get_score of a MutableBitBoard, from its disc counts"""
+    return board.dark_count, board.light_count
@@ -0,0 +1,225 @@
+"""
+Evaluation features of Othello positions, computed on bitboards.
+
+All the features are computed for one player from the two disc masks of a
+BitBoard, with shifts and masks over the whole board (see
+othello_bitboard), in one pass that shares the masks the features have in
+common:
+
+  parity              discs of the player minus discs of the opponent
+  mobility            moves the player can play
+  potential_mobility  empty squares next to an opponent disc minus empty
+                      squares next to a disc of the player
+  frontier            discs of the player next to an empty square minus
+                      those of the opponent
+  stability           discs of the player that can no longer be flipped
+                      minus those of the opponent
+  corners             corners held by the player
+
+An Evaluator weighs the features; the features of weight 0 are not
+computed. With the default weights (parity 1, mobility 1, corners 10) it
+gives the value of the heuristic agent.compute_heuristic always had.
+
+If NumPy is installed, the same features are also computed for a whole
+batch of boards at once: stack turns N boards into an N x dimension x
+dimension array and batch_features and Evaluator.evaluate_batch work on
+it, with the same values as their one-board counterparts.
+"""
+from othello_bitboard import BitBoard, from_tuple, geometry, move_mask, popcount, shift
+
+try:
+    import numpy
+except ImportError: #batches need NumPy
+    numpy = None
+
+FEATURES = ['parity', 'mobility', 'potential_mobility', 'frontier', 'stability', 'corners']
+
+DEFAULT_WEIGHTS = {'parity': 1, 'mobility': 1, 'potential_mobility': 0, 'frontier': 0, 'stability': 0, 'corners': 10}
+
+_MASKS = {}
+
+def masks(dimension):
+    """
+    (full board mask, corner mask, {shift: mask}, {shift: edge}) of a board
+    of the given dimension: the mask of a shift as in geometry, and its edge
+    the squares that have no neighbour in the direction of the shift
+    """
+    if dimension not in _MASKS:
+        n = dimension
+        full, directions = geometry(n)
+        shift_masks = dict(directions)
+        edges = {}
+        for amount, mask in directions:
+            #the squares a shift by -amount reaches have a neighbour at +amount
+            edges[amount] = full & ~shift(full, -amount, shift_masks[-amount])
+        corner_mask = (1 << 0) | (1 << (n - 1)) | (1 << (n * (n - 1))) | (1 << (n * n - 1))
+        _MASKS[dimension] = (full, corner_mask, shift_masks, edges)
+    return _MASKS[dimension]
+
+def neighbours(bits, full, shift_masks):
+    """Squares next to a square of bits, in any direction"""
+    around = 0
+    for amount, mask in shift_masks.items():
+        around |= shift(bits, amount, mask)
+    return around & full
+
+def stable_discs(board, own, opp):
+    """
+    Discs of own that can no longer be flipped: along each of the 4 lines
+    through the disc, the line is full or a neighbour on the line is the
+    edge of the board or another such disc of own. This finds the discs
+    anchored to the corners and the edges; some stable discs in the middle
+    of the board are missed, none is counted wrongly.
+    """
+    n = board.dimension
+    full, _, shift_masks, edges = masks(n)
+    filled = own | opp
+    axes = []
+    for amount in (1, n, n + 1, n - 1):
+        #filled squares from which the line is filled up to the edge, on either side
+        ahead = behind = filled
+        for _ in range(n - 1):
+            ahead &= shift(ahead, -amount, shift_masks[-amount]) | edges[amount]
+            behind &= shift(behind, amount, shift_masks[amount]) | edges[-amount]
+        axes.append((amount, (ahead & behind) | edges[amount] | edges[-amount]))
+    stable = 0
+    while True:
+        new_stable = own
+        for amount, safe in axes:
+            new_stable &= safe | shift(stable, -amount, shift_masks[-amount]) | shift(stable, amount, shift_masks[amount])
+        if new_stable == stable:
+            return stable
+        stable = new_stable
+
+def features(board, player, wanted = FEATURES):
+    """{feature: value} of the wanted features of player on board (a BitBoard or a tuple board)"""
+    if not isinstance(board, BitBoard):
+        board = from_tuple(board)
+    own, opp = board.discs(player)
+    full, corner_mask, shift_masks, _ = masks(board.dimension)
+    empty = full & ~(own | opp)
+    values = {}
+    if 'parity' in wanted:
+        values['parity'] = popcount(own) - popcount(opp)
+    if 'mobility' in wanted:
+        values['mobility'] = popcount(move_mask(board, player))
+    if 'potential_mobility' in wanted or 'frontier' in wanted:
+        near_empty = neighbours(empty, full, shift_masks)
+        if 'potential_mobility' in wanted:
+            values['potential_mobility'] = popcount(empty & neighbours(opp, full, shift_masks)) - popcount(empty & neighbours(own, full, shift_masks))
+        if 'frontier' in wanted:
+            values['frontier'] = popcount(own & near_empty) - popcount(opp & near_empty)
+    if 'stability' in wanted:
+        values['stability'] = popcount(stable_discs(board, own, opp)) - popcount(stable_discs(board, opp, own))
+    if 'corners' in wanted:
+        values['corners'] = popcount(own & corner_mask)
+    return values
+
+class Evaluator(object):
+    """A weighted sum of the features, weights given as {feature: weight}"""
+
+    def __init__(self, weights = None):
+        self.weights = dict(DEFAULT_WEIGHTS)
+        if weights is not None:
+            for name in weights:
+                if name not in FEATURES:
+                    raise ValueError("Unknown evaluation feature: {}".format(name))
+            self.weights.update(weights)
+        self.wanted = [name for name in FEATURES if self.weights[name] != 0]
+
+    def evaluate(self, board, player):
+        """Value of board for player"""
+        weights = self.weights
+        return sum(weights[name] * value for name, value in features(board, player, self.wanted).items())
+
+    def evaluate_batch(self, boards, player):
+        """Values for player of the boards of a stacked array (see stack), as an array"""
+        weights = self.weights
+        values = numpy.zeros(len(boards), dtype=numpy.int64)
+        for name, feature in batch_features(boards, player, self.wanted).items():
+            values += weights[name] * feature
+        return values
+
+############ BATCHES OF BOARDS ###############################
+# In a stacked array boards[k, j, i] is square (i,j) of the k-th board, as in
+# a tuple board: 0 empty, 1 dark, 2 light.
+
+def stack(boards):
+    """The N x dimension x dimension array of a list of tuple boards or BitBoards"""
+    if not isinstance(boards[0], BitBoard):
+        return numpy.array(boards, dtype=numpy.int8)
+    n = boards[0].dimension
+    size = (n * n + 7) // 8
+    data = b"".join(board.dark.to_bytes(size, 'little') + board.light.to_bytes(size, 'little') for board in boards)
+    #bit i*n + j of a mask is square (i,j): unpacked, the masks are [k, side, i, j]
+    bits = numpy.unpackbits(numpy.frombuffer(data, dtype=numpy.uint8).reshape(len(boards), 2, size), axis=2, bitorder='little')
+    bits = bits[:, :, :n * n].reshape(len(boards), 2, n, n).astype(numpy.int8)
+    return (bits[:, 0] + 2 * bits[:, 1]).transpose(0, 2, 1)
+
+def moved(a, dj, di):
+    """a with the squares of each board moved dj rows down and di columns right, emptying the squares left behind"""
+    n = a.shape[1]
+    result = numpy.zeros_like(a)
+    result[:, max(dj, 0):n + min(dj, 0), max(di, 0):n + min(di, 0)] = a[:, max(-dj, 0):n + min(-dj, 0), max(-di, 0):n + min(-di, 0)]
+    return result
+
+DIRECTIONS = [(dj, di) for dj in (-1, 0, 1) for di in (-1, 0, 1) if (dj, di) != (0, 0)]
+
+def batch_neighbours(a):
+    around = numpy.zeros_like(a)
+    for dj, di in DIRECTIONS:
+        around |= moved(a, dj, di)
+    return around
+
+def batch_stable_discs(own, opp):
+    """stable_discs of own, for each board of the batch"""
+    n = own.shape[1]
+    filled = own | opp
+    ones = numpy.ones_like(own)
+    axes = []
+    for dj, di in ((0, 1), (1, 0), (1, 1), (1, -1)):
+        edge_ahead = ~moved(ones, -dj, -di)  #no neighbour at +(dj, di)
+        edge_behind = ~moved(ones, dj, di)
+        ahead = behind = filled
+        for _ in range(n - 1):
+            ahead = ahead & (moved(ahead, -dj, -di) | edge_ahead)
+            behind = behind & (moved(behind, dj, di) | edge_behind)
+        axes.append((dj, di, (ahead & behind) | edge_ahead | edge_behind))
+    stable = numpy.zeros_like(own)
+    while True:
+        new_stable = own.copy()
+        for dj, di, safe in axes:
+            new_stable &= safe | moved(stable, dj, di) | moved(stable, -dj, -di)
+        if numpy.array_equal(new_stable, stable):
+            return stable
+        stable = new_stable
+
+def batch_features(boards, player, wanted = FEATURES):
+    """{feature: array of the values of the boards} of player, for a stacked array of boards"""
+    n = boards.shape[1]
+    own = boards == player
+    opp = boards == 3 - player
+    empty = boards == 0
+    values = {}
+    count = lambda a: a.sum(axis=(1, 2), dtype=numpy.int64)
+    if 'parity' in wanted:
+        values['parity'] = count(own) - count(opp)
+    if 'mobility' in wanted:
+        moves = numpy.zeros_like(own)
+        for dj, di in DIRECTIONS:
+            x = moved(own, dj, di) & opp
+            for _ in range(n - 3):
+                x |= moved(x, dj, di) & opp
+            moves |= moved(x, dj, di) & empty
+        values['mobility'] = count(moves)
+    if 'potential_mobility' in wanted or 'frontier' in wanted:
+        near_empty = batch_neighbours(empty)
+        if 'potential_mobility' in wanted:
+            values['potential_mobility'] = count(empty & batch_neighbours(opp)) - count(empty & batch_neighbours(own))
+        if 'frontier' in wanted:
+            values['frontier'] = count(own & near_empty) - count(opp & near_empty)
+    if 'stability' in wanted:
+        values['stability'] = count(batch_stable_discs(own, opp)) - count(batch_stable_discs(opp, own))
+    if 'corners' in wanted:
+        values['corners'] = own[:, [0, 0, n - 1, n - 1], [0, n - 1, 0, n - 1]].sum(axis=1, dtype=numpy.int64)
+    return values
@@ -10,6 +10,7 @@ import sys
 import subprocess
 from threading import Timer
 from othello_shared import find_lines, get_possible_moves, play_move, get_score
+from othello_bitboard import EVAL_PROTOCOL, BITBOARD_PROTOCOL, encode_board, from_tuple
 
 class InvalidMoveError(RuntimeError):
     pass
@@ -31,7 +32,7 @@ class AiPlayerInterface(Player):
 
     TIMEOUT = 10 
 
-    def __init__(self, filename, color, limit, minimax = False, caching = False, ordering = False):
+    def __init__(self, filename, color, limit, minimax = False, caching = False, ordering = False, protocol = EVAL_PROTOCOL):
         
         #convert params to numbers 
         m = 0 
@@ -42,11 +43,12 @@ class AiPlayerInterface(Player):
         if ordering == True: o = 1
 
         self.color = color
+        self.protocol = protocol #how the board is sent, see othello_bitboard
         self.process = subprocess.Popen(['python3',filename], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
         name = self.process.stdout.readline().decode("ASCII").strip()
         print("AI introduced itself as: {}".format(name))
         self.name = name
-        self.process.stdin.write((str(color) + "," + str(limit) + "," + str(m) + "," + str(c) + "," + str(o) + "\n").encode("ASCII"))
+        self.process.stdin.write((str(color) + "," + str(limit) + "," + str(m) + "," + str(c) + "," + str(o) + "," + str(protocol) + "\n").encode("ASCII"))
         self.process.stdin.flush()
 
     def timeout(self): 
@@ -59,7 +61,11 @@ class AiPlayerInterface(Player):
         print((white_score, dark_score))
         self.process.stdin.write("SCORE {} {}\n".format(white_score, dark_score).encode("ASCII"))
         self.process.stdin.flush()
-        self.process.stdin.write("{}\n".format(str(manager.board)).encode("ASCII"))
+        if self.protocol == BITBOARD_PROTOCOL:
+            board_s = encode_board(from_tuple(manager.board), manager.current_player)
+        else:
+            board_s = str(manager.board)
+        self.process.stdin.write("{}\n".format(board_s).encode("ASCII"))
         self.process.stdin.flush()
 
         timer = Timer(AiPlayerInterface.TIMEOUT, lambda: self.timeout())
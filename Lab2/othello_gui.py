@@ -134,15 +134,17 @@ def main(argv):
     minimax = False        
     agent1 = None
     agent2 = None
+    protocol = 0
 
     try:
-        opts, args = getopt.getopt(argv,"hcmol:d:a:b:",["limit=","dimension=","agent1=","agent2="])
+        opts, args = getopt.getopt(argv,"hcmol:d:a:b:p:",["limit=","dimension=","agent1=","agent2=","protocol="])
     except getopt.GetoptError:
-        print('othello_gui.py -d <dimension> [-a <agentA> -b <agentB> -l <depth-limit> -c -o -m]')
+        print('othello_gui.py -d <dimension> [-a <agentA> -b <agentB> -l <depth-limit> -c -o -m -p <protocol>]')
         sys.exit(2)
     for opt, arg in opts:
         if opt == '-h':
-            print('othello_gui.py -d <dimension> -a <agentA> [-b <agentB> -l <depth-limit> -c -o]')
+            print('othello_gui.py -d <dimension> -a <agentA> [-b <agentB> -l <depth-limit> -c -o -p <protocol>]')
+            print('-p 0 sends the AIs the board as Python rows, read with eval; -p 1 as a hex bitboard line')
             sys.exit()
         elif opt in ("-d", "--dimension"):
             size = int(arg)
@@ -158,18 +160,20 @@ def main(argv):
             ordering = True   
         elif opt in ("-l", "--limit"):
             limit = int(arg)  
+        elif opt in ("-p", "--protocol"):
+            protocol = int(arg)
 
     if size <= 0: #if no dimension provided
         print('Please provide a board size.')
-        print('othello_gui.py -d <dimension> [-a <agentA> -b <agentB> -l <depth-limit> -c -o]')
+        print('othello_gui.py -d <dimension> [-a <agentA> -b <agentB> -l <depth-limit> -c -o -p <protocol>]')
         sys.exit(2)  
 
     if agent1 != None and agent2 != None and size > 0:
-        p1 = AiPlayerInterface(agent1,1,limit,minimax,caching,ordering)
-        p2 = AiPlayerInterface(agent2,2,limit,minimax,caching,ordering)        
+        p1 = AiPlayerInterface(agent1,1,limit,minimax,caching,ordering,protocol)
+        p2 = AiPlayerInterface(agent2,2,limit,minimax,caching,ordering,protocol)        
     elif agent1 != None and size > 0:
         p1 = Player(1)
-        p2 = AiPlayerInterface(agent1,2,limit,minimax,caching,ordering)
+        p2 = AiPlayerInterface(agent1,2,limit,minimax,caching,ordering,protocol)
     else: 
         p1 = Player(1)
         p2 = Player(2)
@@ -14,6 +14,7 @@ import time
 
 # You can also use the functions in othello_shared to write your AI 
 from othello_shared import find_lines, get_possible_moves
+import othello_bitboard
 
 def select_move(board, color):
     """
@@ -24,7 +25,10 @@ def select_move(board, color):
 
     # We just get a list of all permitted moves in this state and 
     # select a random one!
-    moves = get_possible_moves(board, color) # returns a list of (column, row) tuples.
+    if isinstance(board, othello_bitboard.BitBoard):
+        moves = othello_bitboard.get_possible_moves(board, color) # the same moves, from the disc masks
+    else:
+        moves = get_possible_moves(board, color) # returns a list of (column, row) tuples.
     
     i,j = random.choice(moves)
 
@@ -48,6 +52,7 @@ def run_ai():
     minimax = int(arguments[2]) #minimax or alpha beta?
     caching = int(arguments[3]) #caching or no?
     ordering = int(arguments[4]) #node-ordering (for alpha-beta) or no?
+    protocol = int(arguments[5]) if len(arguments) > 5 else othello_bitboard.EVAL_PROTOCOL #how the board is sent
     
     while True: # This is the main loop 
         # Read in the current game status, for example:
@@ -61,12 +66,15 @@ def run_ai():
         if status == "FINAL": # Game is over. 
             print 
         else: 
-            board = eval(input()) # Read in the input and turn it into a Python
-                                  # object. The format is a list of rows. The 
-                                  # squares in each row are represented by 
-                                  # 0 : empty square
-                                  # 1 : dark disk (player 1)
-                                  # 2 : light disk (player 2)
+            if protocol == othello_bitboard.BITBOARD_PROTOCOL:
+                board, _ = othello_bitboard.decode_board(input()) # a BitBoard, see othello_bitboard
+            else:
+                board = eval(input()) # Read in the input and turn it into a Python
+                                      # object. The format is a list of rows. The 
+                                      # squares in each row are represented by 
+                                      # 0 : empty square
+                                      # 1 : dark disk (player 1)
+                                      # 2 : light disk (player 2)
                     
             # Select the move and send it to the manager 
             movei, movej = select_move(board, color)
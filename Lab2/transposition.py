@@ -0,0 +1,163 @@
+"""
+Zobrist hashing and a fixed-size transposition table for the Othello search.
+
+Every (square, color) pair gets a random 64-bit number and the key of a
+board is the xor of the numbers of its discs. Playing a move changes the
+key by the numbers of the squares that changed, so the key of a child is
+found from the key of its parent without looking at the rest of the board
+(see Zobrist.child_key); a MutableBitBoard given the Zobrist numbers keeps its
+own key up to date.
+
+The table has a fixed number of slots, a power of 2, kept in parallel
+arrays. A key goes to slot key & (size - 1). Each entry holds the key,
+the depth searched below the position, the bound type of its value
+(EXACT, LOWER or UPPER, as alpha-beta returns fail-high and fail-low
+values), the value and the best move. When two keys compete for a slot,
+the deeper search is kept, unless the entry in the slot is from an older
+search (see TranspositionTable.new_search).
+"""
+import random
+from array import array
+
+from othello_bitboard import BitBoard, MutableBitBoard, squares
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+NO_MOVE = 0xFFFF
+
+#xor-ed into a board key to tell apart positions searched as different node
+#types, e.g., SALTS[2 * node + color - 1] for a min (0) or max (1) node of color
+SALTS = [random.Random(384 + salt).getrandbits(64) for salt in range(4)]
+
+class Zobrist(object):
+    """Random numbers of the squares of a dimension x dimension board"""
+
+    def __init__(self, dimension, seed = 384):
+        rng = random.Random(seed + dimension)
+        self.dimension = dimension
+        self.dark = [rng.getrandbits(64) for _ in range(dimension * dimension)]
+        self.light = [rng.getrandbits(64) for _ in range(dimension * dimension)]
+        self.numbers = [[0] * (dimension * dimension), self.dark, self.light] #by square value
+        #the numbers to give a MutableBitBoard
+        self.board_numbers = (self.dark, self.light, [d ^ l for d, l in zip(self.dark, self.light)])
+
+    def key(self, board):
+        """Key of a tuple board or a BitBoard"""
+        if isinstance(board, MutableBitBoard) and board.numbers is self.board_numbers:
+            return board.key
+        key = 0
+        n = self.dimension
+        if isinstance(board, BitBoard):
+            for square in squares(board.dark):
+                key ^= self.dark[square]
+            for square in squares(board.light):
+                key ^= self.light[square]
+            return key
+        for j in range(n):
+            row = board[j]
+            for i in range(n):
+                if row[i] == 1:
+                    key ^= self.dark[i * n + j]
+                elif row[i] == 2:
+                    key ^= self.light[i * n + j]
+        return key
+
+    def child_key(self, key, board, child):
+        """Key of child, a board one move away from board, whose key is key"""
+        if isinstance(child, MutableBitBoard) and child.numbers is self.board_numbers:
+            return child.key #kept up to date by make_move
+        if not isinstance(board, BitBoard):
+            #only the rows the move changed are looked at
+            n = self.dimension
+            numbers = self.numbers
+            for j in range(n):
+                row = board[j]
+                new_row = child[j]
+                if row != new_row:
+                    for i in range(n):
+                        if row[i] != new_row[i]:
+                            key ^= numbers[row[i]][i * n + j] ^ numbers[new_row[i]][i * n + j]
+            return key
+        for square in squares(board.dark ^ child.dark):
+            key ^= self.dark[square]
+        for square in squares(board.light ^ child.light):
+            key ^= self.light[square]
+        return key
+
+_ZOBRIST = {}
+
+def zobrist(dimension):
+    """The Zobrist numbers shared by all boards of a dimension"""
+    if dimension not in _ZOBRIST:
+        _ZOBRIST[dimension] = Zobrist(dimension)
+    return _ZOBRIST[dimension]
+
+class TranspositionTable(object):
+    """A transposition table of 2**bits entries"""
+
+    def __init__(self, bits = 18):
+        self.size = 1 << bits
+        self.mask = self.size - 1
+        self.keys = array('Q', bytes(8 * self.size))
+        self.depths = array('b', [-1]) * self.size #-1 marks an empty slot
+        self.flags = array('B', bytes(self.size))
+        self.values = array('d', bytes(8 * self.size))
+        self.moves = array('H', [NO_MOVE]) * self.size
+        self.generations = array('B', bytes(self.size))
+        self.generation = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.probes = 0
+        self.hits = 0
+        self.cutoffs = 0 #hits whose entry was deep enough to be used as is
+        self.stores = 0
+        self.replacements = 0
+
+    def new_search(self):
+        """Age the entries of the previous searches, so they are replaced first"""
+        self.generation = (self.generation + 1) & 0xFF
+
+    def clear(self):
+        self.depths = array('b', [-1]) * self.size
+        self.reset_stats()
+
+    def probe(self, key):
+        """(depth, flag, value, move) of key, or None if key is not in the table"""
+        self.probes += 1
+        slot = key & self.mask
+        if self.depths[slot] < 0 or self.keys[slot] != key:
+            return None
+        self.hits += 1
+        move = self.moves[slot]
+        return (self.depths[slot], self.flags[slot], self.values[slot],
+                None if move == NO_MOVE else (move >> 8, move & 0xFF))
+
+    def store(self, key, depth, flag, value, move):
+        slot = key & self.mask
+        old_depth = self.depths[slot]
+        if old_depth >= 0 and self.keys[slot] != key:
+            if self.generations[slot] == self.generation and depth < old_depth:
+                return #depth-preferred: keep the deeper entry of this search
+            self.replacements += 1
+        self.stores += 1
+        self.keys[slot] = key
+        self.depths[slot] = min(depth, 127)
+        self.flags[slot] = flag
+        self.values[slot] = value
+        self.moves[slot] = NO_MOVE if move is None else (move[0] << 8) | move[1]
+        self.generations[slot] = self.generation
+
+    def hit_rate(self):
+        return self.hits / self.probes if self.probes else 0.0
+
+    def filled(self):
+        return self.size - self.depths.count(-1)
+
+    def nbytes(self):
+        """Bytes taken by the entries"""
+        return sum(len(a) * a.itemsize for a in (self.keys, self.depths, self.flags, self.values, self.moves, self.generations))
+
+    def report(self):
+        return "{} probes, hit rate {:.1%}, {} cutoffs, {} stores ({} replacements), {} of {} slots used, {:.1f} MB".format(
+            self.probes, self.hit_rate(), self.cutoffs, self.stores, self.replacements, self.filled(), self.size, self.nbytes() / 2**20)